@@ -1,66 +1,22 @@
 
+import asyncio
 import json
 import os
-import subprocess
-import time
-from datetime import datetime
-from typing_extensions import TypedDict
-import google.generativeai as genai
-
-class Agent3Response(TypedDict):
-    response: str  # "yes" or "no"
-    explanation: str  # Detailed explanation
-
-# Generation configurations
-generation_config_normal = {
-    "temperature": 0.7,
-    "top_p": 0.95,
-    "top_k": 64,
-    "max_output_tokens": 65536,
-    "response_mime_type": "text/plain",
-}
-generation_config_structured = {
-    "temperature": 0.7,
-    "top_p": 0.95,
-    "top_k": 64,
-    "max_output_tokens": 65536,
-    "response_mime_type": "application/json",
-    "response_schema": Agent3Response
-}
-
-def create_agent(model_name, config):
-    """Creates a chat session using the specified model and configuration."""
-    model = genai.GenerativeModel(
-        model_name=model_name,
-        generation_config=config,
-    )
-    return model.start_chat(history=[])
-
-def execute_code(language, filepath):
-    """Executes a code file written in the specified language."""
-    print(f"Executing {language} code in file: {filepath}")
-
-    command = {
-        "python": ["python", filepath],
-        "c": ["gcc", filepath, "-o", "./a.out"],
-        "js": ["node", filepath]
-    }.get(language)
-
-    if language == "c":
-        try:
-            subprocess.run(command, check=True)
-            command = ["./a.out"]
-        except subprocess.CalledProcessError as e:
-            return "", f"Compilation Error:\n{e.stderr.strip()}"
-
-    try:
-        result = subprocess.run(command, text=True, capture_output=True, check=True)
-        return result.stdout.strip(), result.stderr.strip()
-    except subprocess.CalledProcessError as e:
-        return "", e.stderr.strip()
-    finally:
-        if language == "c" and os.path.exists("./a.out"):
-            os.remove("./a.out")
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common import aio, cli
+from common.agents import create_agent, generation_config_normal
+from common.execution import execute_code_async
+from common.memo import execution_key, recall_execution, remember_execution
+from common.results import deterministic_verdict
+from common.samples import sample_result
+from common.stages import Stage
+from common.static_checks import static_check
+from common.summary import summarize_samples
+from common.trace import traced
+from common.workflow import SampleWorkflow
+from common.workspace import in_workspace, workspace_file
 
 def parse_code(raw_code):
     """Parses and extracts valid code from raw response."""
@@ -68,221 +24,153 @@ def parse_code(raw_code):
         return "\n".join(raw_code.splitlines()[1:-1])
     return raw_code.strip()
 
-def get_timestamp():
-    """Returns the current time as a formatted string."""
-    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-
-
-
-def host(prompt, language, samples, max_iterations=3,agents=None):
-    if len(agents)==4:
-        # Initialize agents
-        agent_1 = create_agent(agents[0], generation_config_normal)  
-        agent_2 = create_agent(agents[1], generation_config_normal)  
-        agent_3 = create_agent(agents[2], generation_config_structured)  
-        agent_4 = create_agent(agents[3], generation_config_normal)  
-  
-    else:
-        # Initialize agents
-        agent_1 = create_agent("gemini-2.0-flash-thinking-exp-01-21", generation_config_normal)  
-        agent_2 = create_agent("gemini-2.0-flash-thinking-exp-01-21", generation_config_normal)  
-        agent_3 = create_agent("gemini-2.0-flash-exp", generation_config_structured)  
-        agent_4 = create_agent("gemini-2.0-flash-thinking-exp-01-21", generation_config_normal)     
-    """Manages the workflow: generates, validates, and refines code while testing samples."""
-    conversation_log = []
-    iteration = 1
-    file_extension = {"python": "py", "c": "c", "js": "js", "nvcc": "cu"}.get(language, "txt")
-    filename = f"task.{file_extension}"
-
-    while iteration <= max_iterations or max_iterations==-1:
-        print(f"\n=== Iteration {iteration}: Agent 1 generates/refines a code snippet ===")
-        
-        if iteration % 2 == 0:
-            print("\n--- Sleeping for rate limiting ---")
-            time.sleep(30)
-
-        timestamp = get_timestamp()
 
-        # Step 1: Agent 1 generates/refines the code 
-        while True:
-          try:
-              agent_1_response = agent_1.send_message(
-                  f"Write {language} code for the following task. Only return the code:\n{prompt}"
-              )
-              raw_code = agent_1_response.text.strip()
-              break
-          except Exception as e:
-              if '429' in str(e):  # Check for Too Many Requests directly in the error message
-                  print("Rate limit exceeded when calling Agent 1. Retrying...")
-                  time.sleep(30)  # Wait before retrying
-                  continue  # Retry this iteration
-              else:
-                  print(f"Unexpected error when calling Agent 1: {e}")
-                  return "no", "", "Error communicating with Agent 1."
+async def process_sample_async(i, sample, language, refined_code, file_extension, agent_4_model, prefix="task"):
+    """Runs the Agent 4 rewrite and execution chain for one sample.
 
-        refined_code = parse_code(raw_code)
-        print("Agent 1 Output (Refined Code):\n", refined_code)
-        conversation_log.append(f"{timestamp} | Iteration {iteration} | Agent 1 -> Host:\n{refined_code}")
+    The sample's program is written to <prefix>_sample_<n>/sample.<extension> and runs
+    there. A sample that was already run on the same code gets its cached result instead.
+    """
+    sample_input = sample["input"]
+    key = execution_key(language, refined_code, sample)
+    recalled = recall_execution(key, i)
+    if recalled is not None:
+        print(f"Sample {i + 1} was already run on the same code")
+        return recalled
+    try:
+        # Every sample gets its own chat so concurrent rewrites don't share history
+        agent_4 = create_agent(agent_4_model, generation_config_normal, "Agent 4")
+        agent_4_response = await agent_4.send_code_async(
+            f"Modify the following {language} code so that it directly uses the sample input: {sample_input}\n"
+            f"Here is the code:\n{refined_code}"
+            "Don't add no other words and no comments"
+        )
+        modified_code = parse_code(agent_4_response.text.strip())
+        modified_code = modified_code.replace("```python", "").replace("```", "").strip()
+
+        sample_filename = workspace_file(f"{prefix}_sample_{i + 1}", f"sample.{file_extension}")
+        with open(sample_filename, "w") as sample_file:
+            sample_file.write(modified_code)
+
+        print(f"Modified Code for Sample {i + 1} saved to {sample_filename}")
+
+        terminal_output, terminal_error = await execute_code_async(language, sample_filename, sample["expected_output"])
+        result = sample_result(i, sample, terminal_output, terminal_error)
+        remember_execution(key, result)
+        return result
+
+    except Exception as e:
+        # Rate limits were already retried by the agent, so record the failure and move on
+        print(f"Error processing sample {i + 1}: {e}")
+        return sample_result(i, sample, error=str(e), passed=False)
+
+class AlphaWorkflow(SampleWorkflow):
+    """Agent 1 writes the code and Agent 2 validates it; Agent 4 adapts it to every sample, the
+    programs are run and Agent 3 judges the results unless they are clear-cut."""
+
+    def iteration_stages(self, attempt):
+        agent_1, agent_2, agent_3 = attempt.agents
+        label = attempt.label
+
+        # Step 1: Agent 1 generates/refines the code
+        async def generate(results):
+            agent_1_response = await agent_1.send_code_async(attempt.request)
+            refined_code = await self.refined_code(
+                attempt, agent_1_response.text.strip(), parse_code, agent_1.send_code_async
+            )
+            print(f"{label}Agent 1 Output (Refined Code):\n", refined_code)
+            return refined_code
+
+        # Local static checks reject broken code without spending an Agent 2 call
+        async def check(results):
+            return await asyncio.to_thread(static_check, self.language, results["generate"])
 
         # Step 2: Agent 2 validates the code
-        print(f"\n=== Iteration {iteration}: Agent 2 validates the refined code ===")
-        while True:
-          try:
-              agent_2_response = agent_2.send_message(
-                  f"Validate if the following {language} code is error-free and handles the task properly.\n"
-                  f"Respond 'Yes' or 'No'.\n\n{refined_code}"
-              )
-              break
-          except Exception as e:
-              if '429' in str(e):
-                  print("Rate limit exceeded when calling Agent 2. Retrying...")
-                  time.sleep(30)  # Wait before retrying
-                  continue  # Retry this iteration
-              else:
-                  print(f"Unexpected error when calling Agent 2: {e}")
-                  return "no", "", "Error communicating with Agent 2."
-
-        
-        validation_decision = agent_2_response.text.strip().lower()
-        print("Agent 2 Decision:", validation_decision)
-
-        if "yes" not in validation_decision:
-            print("\n=== Code validation failed. Retry with Agent 1 ===")
-            conversation_log.append(f"{get_timestamp()} | Iteration {iteration} | Validation failed. Retrying...")
-            iteration += 1
-            continue
+        async def validate(results):
+            print(f"\n=== Iteration {attempt.iteration}: {label}Agent 2 validates the refined code ===")
+            agent_2_response = await agent_2.send_message_async(
+                f"Validate if the following {self.language} code is error-free and handles the task properly.\n"
+                f"Respond 'Yes' or 'No'.\n\n{results['generate']}"
+            )
+            validation_decision = agent_2_response.text.strip().lower()
+            print(f"{label}Agent 2 Decision:", validation_decision)
+            return validation_decision
 
         # Save the validated code
-        with open(filename, "w") as code_file:
-            code_file.write(refined_code)
-        print(f"\n=== Code saved to {filename} ===")
-        conversation_log.append(f"{timestamp} | Iteration {iteration} | Validated code saved to file.")
-
-        # Step 3: Agent 4 creates customized code for each sample
-        print(f"\n=== Iteration {iteration}: Agent 4 modifies code for testing ===")
+        async def save(results):
+            with open(attempt.filename, "w") as code_file:
+                code_file.write(results["generate"])
+            print(f"\n=== Code saved to {attempt.filename} ===")
 
-        sample_results = []
-        for i, sample in enumerate(samples):
-            sample_input = sample["input"]
-            expected_output = sample["expected_output"]
-            while True:
-              try:
-                  # Ask Agent 4 to create a version of the code with sample input hardcoded
-                  agent_4_response = agent_4.send_message(
-                      f"Modify the following {language} code so that it directly uses the sample input: {sample_input}\n"
-                      f"Here is the code:\n{refined_code}"
-                      "Don't add no other words and no comments"
-                  )
-                  modified_code = parse_code(agent_4_response.text.strip())
-                  modified_code = modified_code.replace("```python", "").replace("```", "").strip()
-                  
-                  # Save the modified code to a sample-specific file
-                  sample_filename = f"task_sample_{i + 1}.{file_extension}"
-                  with open(sample_filename, "w") as sample_file:
-                      sample_file.write(modified_code)
-
-                  print(f"Modified Code for Sample {i + 1} saved to {sample_filename}")
+        # Step 3: Agent 4 creates customized code for each sample, and the samples are run
+        async def test_samples(results):
+            refined_code = results["generate"]
 
-                  # Execute the modified code and capture its output
-                  terminal_output, terminal_error = execute_code(language, sample_filename)
+            async def process(i, sample):
+                return await process_sample_async(
+                    i, sample, self.language, refined_code, self.file_extension, self.models[3], attempt.prefix
+                )
 
-                  # Collect sample execution results
-                  sample_results.append({
-                      "sample_index": i + 1,
-                      "input": sample_input,
-                      "expected_output": expected_output,
-                      "actual_output": terminal_output.strip(),
-                      "error": terminal_error.strip(),
-                      "passed": terminal_output.strip() == expected_output
-                  })
-                  break
-
-              except Exception as e:
-                  print(f"Error processing sample {i + 1}: {e}")
-                  sample_results.append({
-                      "sample_index": i + 1,
-                      "input": sample_input,
-                      "expected_output": expected_output,
-                      "actual_output": "",
-                      "error": str(e),
-                      "passed": False
-                  })
-                  time.sleep(30)
-                  continue
+            return await self.run_samples(attempt, refined_code, process)
 
         # Step 4: Agent 3 analyzes test results
-        print("\n=== Iteration {iteration}: Agent 3 analyzes test results ===")
-        test_summary = {
-            "sample_results": sample_results,
-            "total_samples": len(samples),
-            "passed_tests": sum(1 for result in sample_results if result["passed"]),
-            "failed_tests": sum(1 for result in sample_results if not result["passed"]),
-        }
-        while True:
-          try:
-              agent_3_response = agent_3.send_message(
-                  f"The following test results were obtained by executing code on the provided samples:\n\n"
-                  f"{json.dumps(test_summary, indent=2)}\n\n"
-                  "Does the code achieve the desired task? Respond in JSON format with:\n"
-                  "'response': 'yes' or 'no', and 'explanation': A detailed explanation."
-              )
-              
-              agent_3_output = json.loads(agent_3_response.text.strip())
-              decision = agent_3_output.get("response", "no").lower()
-              explanation = agent_3_output.get("explanation", "")
-              
-              print("Agent 3 Decision:", decision)
-              print("Agent 3 Explanation:", explanation)
-
-              if "yes" in decision:
-                  print("\n=== Workflow Complete: Code works as expected ===")
-                  return "yes", refined_code, explanation
-              break    
-                  
-          except json.JSONDecodeError as e:
-              print("Error decoding Agent 3 response:", e)
-              print("Raw Agent 3 Response:", agent_3_response.text.strip())
-              explanation = "Failed to parse Agent 3 response."
-
-          except Exception as e:
-              if '429' in str(e):
-                  print("Rate limit exceeded when calling Agent 3. Retrying...")
-                  time.sleep(30)  # Wait before retrying
-                  continue  # Retry this agent
-              else:
-                  print(f"Unexpected error when calling Agent 3: {e}")
-                  return "no", "", "Error communicating with Agent 3.",
-        
-        # Retry with new refinement
-        iteration += 1
-        print("\n--- Refining Code ---")
+        async def judge(results):
+            print(f"\n=== Iteration {attempt.iteration}: {label}Agent 3 analyzes test results ===")
+            sample_results = results["samples"]
+            # Clear-cut results are decided here; only ambiguous ones go to Agent 3
+            verdict = deterministic_verdict(sample_results, len(self.samples))
+            if verdict is not None:
+                print(f"{label}Decision (no Agent 3 call needed):", verdict[0])
+                print(f"{label}Explanation:", verdict[1])
+                return verdict
+            summary = summarize_samples(self.samples, sample_results)
+            while True:
+                agent_3_response = await agent_3.send_message_async(
+                    f"The following test results were obtained by executing code on the provided samples:\n\n"
+                    f"{summary}\n\n"
+                    "Does the code achieve the desired task? Respond in JSON format with:\n"
+                    "'response': 'yes' or 'no', and 'explanation': A detailed explanation."
+                )
+                try:
+                    agent_3_output = json.loads(agent_3_response.text.strip())
+                    break
+                except json.JSONDecodeError as e:
+                    print("Error decoding Agent 3 response:", e)
+                    print("Raw Agent 3 Response:", agent_3_response.text.strip())
+            decision = agent_3_output.get("response", "no").lower()
+            explanation = agent_3_output.get("explanation", "")
+            print(f"{label}Agent 3 Decision:", decision)
+            print(f"{label}Agent 3 Explanation:", explanation)
+            return decision, explanation
+
+        return [
+            Stage("generate", generate),
+            self.repeat_stage(attempt),
+            Stage("static_check", check, after=["repeat"], accept=lambda diagnostics: not diagnostics),
+            Stage("validate", validate, after=["static_check"], accept=lambda decision: "yes" in decision),
+            Stage("save", save, after=["validate"]),
+            # The samples run while Agent 2 validates the code, and are cancelled if it rejects it
+            Stage("samples", test_samples, **self.samples_after()),
+            Stage("judge", judge, after=["samples"], accept=lambda verdict: "yes" in verdict[0]),
+        ]
+
+@traced("run")
+@in_workspace
+def host(prompt, language, samples, max_iterations=3, agents=None, concurrency=1,
+         harness=False, entry_point=None, candidates=1, workspace=None):
+    """Manages the workflow: generates, validates, and refines code while testing samples."""
+    workflow = AlphaWorkflow(
+        prompt, language, samples, agents, candidates, concurrency, harness, entry_point, workspace
+    )
+    return aio.run(workflow.run(max_iterations))
 
-    return "no", refined_code, "Maximum iterations reached without achieving success."
 
+# Config fields that make up a task, passed to host() by name
+TASK_FIELDS = ("prompt", "language", "samples", "max_iterations", "agents", "concurrency", "harness", "entry_point",
+               "candidates")
 
 def main():
-    config_file = 'config.json'
-    
-    # Load configuration from file
-    with open(config_file, 'r') as file:
-        config = json.load(file)
-
-    # Set the API key
-    genai.configure(api_key=config['apikey'])
-
-    final_status, final_code, final_explanation = host(
-        config['prompt'], 
-        language=config['language'],
-        samples=config['samples'], 
-        max_iterations=config['max_iterations'],
-        agents=config['agents']
-    )
-    
-    print("\n=== Final Status ===")
-    print("Status:", final_status)
-    print("Refined Code:\n", final_code)
-    print("Explanation:", final_explanation)
+    cli.main(host, TASK_FIELDS)
 
 if __name__ == "__main__":
     main()
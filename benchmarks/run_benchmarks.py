@@ -0,0 +1,220 @@
+"""End-to-end benchmarks of the stable, alpha and beta host() flows on the fake model backend.
+
+Every scenario runs a variant's host() offline with scripted agent replies, so the timings
+measure the orchestration itself: prompting, history handling, file writes, compiling and
+running the samples. For each scenario the median of several runs is reported as:
+
+- wall: total time of a host() call
+- overhead: wall time minus the latency injected into the fake model calls
+- samples/s and calls/s: throughput of samples executed and model calls made
+- peak MB: peak Python memory allocated during the run (tracemalloc)
+
+Usage:
+    python benchmarks/run_benchmarks.py [--variants alpha beta] [--repeat 5] [--latency 0.01]
+        [--save baseline.json] [--compare baseline.json]
+
+With --compare, scenarios whose median overhead grew by more than --threshold (default 20%)
+over the saved results are listed as regressions and the script exits with status 1.
+"""
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from common.backends import configure_backend, fake_stats
+from common.cache import configure_cache
+from common.memo import execution_memo
+from common.ratelimit import configure_rate_limits
+
+# Scripted replies for each language: an identity program, and the same function called
+# with the sample input. "{input}" is replaced by the fake backend.
+SOLUTIONS = {
+    "python": (
+        "```python\ndef solve(value):\n    return value\n```",
+        "```python\ndef solve(value):\n    return value\n\nprint(solve({input}))\n```",
+    ),
+    "js": (
+        "```javascript\nfunction solve(value) {\n    return value;\n}\n```",
+        "```javascript\nfunction solve(value) {\n    return value;\n}\n\nconsole.log(solve({input}));\n```",
+    ),
+    "c": (
+        "```c\n#include <stdio.h>\n\nint solve(int value) {\n    return value;\n}\n\n"
+        "int main(void) {\n    int value;\n    scanf(\"%d\", &value);\n    printf(\"%d\\n\", solve(value));\n"
+        "    return 0;\n}\n```",
+        "```c\n#include <stdio.h>\n\nint solve(int value) {\n    return value;\n}\n\n"
+        "int main(void) {\n    printf(\"%d\\n\", solve({input}));\n    return 0;\n}\n```",
+    ),
+}
+# A line that makes each iteration's program different, so it is not rejected as a repeat
+ATTEMPT_LINES = {"python": "ATTEMPT = {n}", "js": "const ATTEMPT = {n};", "c": "enum {{ ATTEMPT = {n} }};"}
+RUNTIMES = {"python": sys.executable, "js": "node", "c": "gcc"}
+AGENT_COUNTS = {"stable": 3, "alpha": 4, "beta": 5}
+
+def load_variant(variant):
+    """Imports <variant>/script.py as a module without running main()."""
+    name = f"{variant}_script"
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, variant, "script.py"))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+def scenarios(variants, languages):
+    """Yields (variant, language, sample count, iterations) for every benchmarked combination."""
+    for variant in variants:
+        for language in languages:
+            for sample_count in (1, 4, 16):
+                yield variant, language, sample_count, 1
+            yield variant, language, 4, 3
+
+def configure(language, iterations, latency):
+    """Points a variant at the fake backend, scripted to succeed on the given iteration."""
+    code, sample_code = SOLUTIONS[language]
+    verdict = '{"response": "yes", "explanation": "The output matches the expected output."}'
+    configure_rate_limits(
+        {"default": {"requests_per_minute": 10 ** 6, "tokens_per_minute": 10 ** 9}},
+        {"base_delay": 0, "max_delay": 0},
+    )
+    configure_cache({"mode": "off"})
+    # Sample results memoized by an earlier run would skip the work being measured
+    execution_memo.clear()
+    configure_backend({
+        "name": "fake",
+        "latency": latency,
+        "failure_rate": 0.0,
+        "responses": {
+            "Agent 1": [
+                code.replace("\n", "\n" + ATTEMPT_LINES[language].format(n=n) + "\n", 1)
+                for n in range(1, iterations + 1)
+            ],
+            # Agent 2 rejects the code until the last iteration
+            "Agent 2": ["No"] * (iterations - 1) + ["Yes"],
+            "Agent 3": [verdict],
+            "Agent 4": [sample_code],
+            "Agent 5": ["Yes"],
+        },
+    })
+
+def run_once(module, variant, language, sample_count, iterations, latency):
+    """Runs host() once in a scratch directory and returns its measurements."""
+    configure(language, iterations, latency)
+    samples = [{"input": str(n), "expected_output": str(n)} for n in range(sample_count)]
+    models = [f"fake-{variant}"] * AGENT_COUNTS[variant]
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    tracemalloc.start()
+    try:
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            status, _, explanation = module.host(
+                "Return the input unchanged.", language, samples,
+                max_iterations=iterations, agents=models,
+            )
+        wall = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    if status != "yes":
+        raise RuntimeError(f"{variant}/{language} did not succeed: {explanation}")
+    return {
+        "wall": wall,
+        "overhead": wall - fake_stats["latency"],
+        "calls": fake_stats["calls"],
+        "peak_mb": peak / 2 ** 20,
+    }
+
+def run_scenario(module, variant, language, sample_count, iterations, latency, repeat):
+    """Runs a scenario `repeat` times and returns the median of every measurement."""
+    runs = [run_once(module, variant, language, sample_count, iterations, latency) for _ in range(repeat)]
+    wall = statistics.median(run["wall"] for run in runs)
+    calls = runs[0]["calls"]
+    return {
+        "scenario": f"{variant}/{language}/{sample_count} samples/{iterations} it",
+        "wall": wall,
+        "overhead": statistics.median(run["overhead"] for run in runs),
+        # stable never executes the samples
+        "samples_per_s": sample_count / wall if variant != "stable" else None,
+        "calls_per_s": calls / wall,
+        "calls": calls,
+        "peak_mb": max(run["peak_mb"] for run in runs),
+    }
+
+def print_results(results):
+    print(f"{'scenario':<36}{'wall s':>9}{'overhead s':>12}{'samples/s':>11}{'calls/s':>10}{'calls':>7}{'peak MB':>9}")
+    for result in results:
+        print(
+            f"{result['scenario']:<36}{result['wall']:>9.3f}{result['overhead']:>12.3f}"
+            f"{'-' if result['samples_per_s'] is None else format(result['samples_per_s'], '.1f'):>11}"
+            f"{result['calls_per_s']:>10.1f}{result['calls']:>7}"
+            f"{result['peak_mb']:>9.2f}"
+        )
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    print(f"\nMax resident set size: {own:.1f} MB (benchmark process), {children:.1f} MB (largest sample process)")
+
+def compare(results, baseline_path, threshold):
+    """Prints the scenarios whose overhead grew by more than `threshold` and returns how many there were."""
+    with open(baseline_path) as baseline_file:
+        baseline = {result["scenario"]: result for result in json.load(baseline_file)}
+    regressions = 0
+    for result in results:
+        before = baseline.get(result["scenario"])
+        if before is None or before["overhead"] <= 0:
+            continue
+        change = result["overhead"] / before["overhead"] - 1
+        if change > threshold:
+            regressions += 1
+            print(
+                f"REGRESSION {result['scenario']}: overhead {before['overhead']:.3f}s -> "
+                f"{result['overhead']:.3f}s (+{change:.0%})"
+            )
+    print(f"{regressions} regression(s) against {baseline_path}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the host() flows on the fake model backend.")
+    parser.add_argument("--variants", nargs="+", default=["stable", "alpha", "beta"])
+    parser.add_argument("--languages", nargs="+", default=list(SOLUTIONS), choices=list(SOLUTIONS))
+    parser.add_argument("--repeat", type=int, default=3, help="runs per scenario; the median is reported")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every fake model call")
+    parser.add_argument("--save", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="overhead growth reported as a regression")
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    languages = [language for language in args.languages if shutil.which(RUNTIMES[language])]
+    for language in sorted(set(args.languages) - set(languages)):
+        print(f"Skipping {language}: {RUNTIMES[language]} not found")
+
+    modules = {variant: load_variant(variant) for variant in args.variants}
+    results = []
+    for variant, language, sample_count, iterations in scenarios(args.variants, languages):
+        results.append(run_scenario(
+            modules[variant], variant, language, sample_count, iterations, args.latency, args.repeat
+        ))
+    print_results(results)
+
+    if args.save:
+        with open(args.save, "w") as results_file:
+            json.dump(results, results_file, indent=2)
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,65 +1,24 @@
+import asyncio
 import json
 import os
-import subprocess
-import time
+import sys
 from datetime import datetime
-from typing_extensions import TypedDict
-import google.generativeai as genai
-
-class Agent3Response(TypedDict):
-    response: str  # "yes" or "no"
-    explanation: str  # Detailed explanation
-
-# Generation configurations
-generation_config_normal = {
-    "temperature": 0.7,
-    "top_p": 0.95,
-    "top_k": 64,
-    "max_output_tokens": 65536,
-    "response_mime_type": "text/plain",
-}
-generation_config_structured = {
-    "temperature": 0.7,
-    "top_p": 0.95,
-    "top_k": 64,
-    "max_output_tokens": 65536,
-    "response_mime_type": "application/json",
-    "response_schema": Agent3Response
-}
-
-def create_agent(model_name, config):
-    """Creates a chat session using the specified model and configuration."""
-    model = genai.GenerativeModel(
-        model_name=model_name,
-        generation_config=config,
-    )
-    return model.start_chat(history=[])
-
-def execute_code(language, filepath):
-    """Executes a code file written in the specified language."""
-    print(f"Executing {language} code in file: {filepath}")
 
-    command = {
-        "python": ["python", filepath],
-        "c": ["gcc", filepath, "-o", "./a.out"],
-        "js": ["node", filepath]
-    }.get(language)
-
-    if language == "c":
-        try:
-            subprocess.run(command, check=True)
-            command = ["./a.out"]
-        except subprocess.CalledProcessError as e:
-            return "", f"Compilation Error:\n{e.stderr.strip()}"
-
-    try:
-        result = subprocess.run(command, text=True, capture_output=True, check=True)
-        return result.stdout.strip(), result.stderr.strip()
-    except subprocess.CalledProcessError as e:
-        return "", e.stderr.strip()
-    finally:
-        if language == "c" and os.path.exists("./a.out"):
-            os.remove("./a.out")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common import aio, cli
+from common.agents import create_agent, generation_config_normal
+from common.context import ConversationLog, context_budget
+from common.execution import execute_code_async
+from common.memo import execution_key, recall_execution, remember_execution
+from common.results import deterministic_verdict
+from common.runstore import run_store_settings
+from common.samples import sample_result, test_summary
+from common.stages import Stage, StageFailed, run_stages
+from common.static_checks import static_check
+from common.summary import summarize_samples
+from common.trace import traced
+from common.workflow import SampleWorkflow
+from common.workspace import in_workspace, workspace_file
 
 def parse_code(raw_code):
     """Parses and extracts valid code from raw response."""
@@ -71,265 +30,270 @@ def get_timestamp():
     """Returns the current time as a formatted string."""
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-def host(prompt, language, samples, max_iterations=3, agents=None):
-    """Manages the workflow: generates, validates, and refines code while testing samples."""
-    
-    conversation_log = []
-    iteration = 1
-    file_extension = {"python": "py", "c": "c", "js": "js", "nvcc": "cu"}.get(language, "txt")
-    filename = f"task.{file_extension}"
-    if len(agents)==4:
-        # Initialize agents
-        agent_1 = create_agent(agents[0], generation_config_normal)  
-        agent_2 = create_agent(agents[1], generation_config_normal)  
-        agent_3 = create_agent(agents[2], generation_config_structured)  
-        agent_4 = create_agent(agents[3], generation_config_normal)  
-        agent_5= create_agent(agents[4], generation_config_normal)  
-    else:
-        # Initialize agents
-        agent_1 = create_agent("gemini-2.0-flash-thinking-exp-01-21", generation_config_normal)  
-        agent_2 = create_agent("gemini-2.0-flash-thinking-exp-01-21", generation_config_normal)  
-        agent_3 = create_agent("gemini-2.0-flash-exp", generation_config_structured)  
-        agent_4 = create_agent("gemini-2.0-flash-thinking-exp-01-21", generation_config_normal) 
-        agent_5 = create_agent("gemini-2.0-flash-thinking-exp-01-21", generation_config_normal)  
-
-    while iteration <= max_iterations or max_iterations == -1:
-        print(f"\n=== Iteration {iteration}: Agent 1 generates/refines a code snippet ===")
-        
-        if iteration % 2 == 0:
-            print("\n--- Sleeping for rate limiting ---")
-            time.sleep(10)
-
+async def process_sample_async(i, sample, language, refined_code, file_extension, models, conversation_log, iteration,
+                               prefix="task"):
+    """Runs the Agent 4 rewrite, Agent 5 check and execution chain for one sample.
+
+    Each attempt is a small stage graph: the rewritten program already runs while Agent 5
+    checks it, and is killed if Agent 5 rejects it. The chain works on its own copy of the
+    conversation log and returns the entries it added, so the host can merge them back in
+    sample order. The sample's program is written to <prefix>_sample_<n>/sample.<extension>
+    and runs there. A sample that was already run on the same code gets its cached result,
+    and no entries.
+    """
+    sample_input = sample["input"]
+    sample_filename = workspace_file(f"{prefix}_sample_{i + 1}", f"sample.{file_extension}")
+    key = execution_key(language, refined_code, sample)
+    recalled = recall_execution(key, i)
+    if recalled is not None:
+        print(f"Sample {i + 1} was already run on the same code")
+        return recalled, []
+    log = conversation_log.copy()
+    start = len(log.entries)
+    # Every sample gets its own chats so concurrent chains don't share history
+    agent_4 = create_agent(models[3], generation_config_normal, "Agent 4")
+    agent_5 = create_agent(models[4], generation_config_normal, "Agent 5")
+
+    async def rewrite(results):
         timestamp = get_timestamp()
-
-        # Step 1: Agent 1 generates/refines the code 
-        while True:
-            try:
-                conversation_log.append(f"""{get_timestamp()} | Iteration {iteration} |       host:
-                    Write {language} code for the following task. Only return the code:\n{prompt}"""           
-                                                        )
-                agent_1_response = agent_1.send_message(conversation_log)
-                
-                raw_code = agent_1_response.text.strip()
-                break
-            except Exception as e:
-                if '429' in str(e):
-                    print("Rate limit exceeded when calling Agent 1. Retrying...")
-                    time.sleep(30)
-                    continue
-                else:
-                    print(f"Unexpected error when calling Agent 1: {e}")
-                    return "no", "", "Error communicating with Agent 1."
-
-        refined_code = parse_code(raw_code)
-
-        print("Agent 1 Output (Refined Code):\n", refined_code)
-        conversation_log.append(f"{timestamp} | Iteration {iteration} | Agent 1 -> Agent 2 :\n{refined_code}")
-
-        # Step 2: Agent 2 validates the code
-        print(f"\n=== Iteration {iteration}: Agent 2 validates the refined code ===")
-        while True:
-            try:
-                conversation_log.append(f"""{get_timestamp()} | Iteration {iteration} |       host:
-                    Validate if the following {language} code is error-free and handles the task properly.\n
-                    Respond 'Yes' or 'No'.\n\n{refined_code}"""           
-                                                        )
-                agent_2_response = agent_2.send_message(conversation_log)
-                conversation_log.append(f"{timestamp} | Iteration {iteration} | Agent 2 -> Agent 1:\n{agent_2_response.text.strip()}")
-
-                
-                break
-            except Exception as e:
-                if '429' in str(e):
-                    print("Rate limit exceeded when calling Agent 2. Retrying...")
-                    time.sleep(30)
-                    continue
-                else:
-                    print(f"Unexpected error when calling Agent 2: {e}")
-                    return "no", "", "Error communicating with Agent 2."
-
-        validation_decision = agent_2_response.text.strip().lower()
-        print("Agent 2 Decision:", validation_decision)
-
-        if "yes" not in validation_decision:
-            print("\n=== Code validation failed. Retry with Agent 1 ===")
-            conversation_log.append(f"{get_timestamp()} | Iteration {iteration} | Validation failed. Retrying...")
-            
-            continue
-
-        with open(filename, "w") as code_file:
-            code_file.write(refined_code)
-        print(f"\n=== Code saved to {filename} ===")
-        conversation_log.append(f"{timestamp} | Iteration {iteration} |Agent 2 -> agent1: Validated code saved to file.")
-        
-        # Step 3: Agent 4 creates customized code for each sample
-        print(f"\n=== Iteration {iteration}: Agent 4 modifies code for testing ===")
-
-        sample_results = []
-        for i, sample in enumerate(samples):
-            sample_input = sample["input"]
-            expected_output = sample["expected_output"]
-            counter=3
-            while True and counter>0:
-                try:
-
-                    conversation_log.append(f"""{get_timestamp()} | Iteration {iteration} |    host:
+        log.append(f"""{timestamp} | Iteration {iteration} |    host:
                         Modify the following Python code so it directly uses the sample input: {sample_input}.
 Only write the modified code below. Avoid outputting explanations or additional comments.
 Code:
-{refined_code}"""           
-                                                        )
-                    agent_4_response = agent_4.send_message(conversation_log)
-
-                    conversation_log.append(f"{timestamp} | Iteration {iteration} | Agent 4 -> Agent5:\n{agent_4_response.text.strip()}")
-                    modified_code = parse_code(agent_4_response.text.strip())
-                                        # Save the modified code to a sample-specific file
-                    sample_filename = f"task_sample_{i + 1}.{file_extension}"
-                    with open(sample_filename, "w") as sample_file:
-                        sample_file.write(modified_code)
-
-                    print(f"Modified Code for Sample {i + 1} saved to {sample_filename}")
-                    # Step 4: Agent 5 validates the code
-                    print(f"\n=== Iteration {iteration}: Agent 5 validates the refined sample code ===")
-                    while True and counter>0:
-                        try:
-                            
-                            conversation_log.append(f"""{get_timestamp()} | Iteration {iteration} | host:Validate the functionality of this adapted Python code. It should:
+{refined_code}""", iteration, {4}, sample=i
+        )
+        agent_4_response = await agent_4.send_code_async(log.for_agent(4, sample=i))
+        log.append(f"{timestamp} | Iteration {iteration} | Agent 4 -> Agent5:\n{agent_4_response.text.strip()}", iteration, {4, 5}, sample=i)
+        modified_code = parse_code(agent_4_response.text.strip())
+
+        with open(sample_filename, "w") as sample_file:
+            sample_file.write(modified_code)
+        print(f"Modified Code for Sample {i + 1} saved to {sample_filename}")
+        return modified_code
+
+    async def check(results):
+        print(f"\n=== Iteration {iteration}: Agent 5 validates the refined sample code {i + 1} ===")
+        log.append(f"""{get_timestamp()} | Iteration {iteration} | host:Validate the functionality of this adapted Python code. It should:
 1. Pass sample input `{sample_input}` correctly.
 2. Retain the task's functionality.
 3. Be free of syntax issues. 
 4. if it fails, provide a detailed suggestions
 Modified code:
-{modified_code}
-
-"""              
-                                    )
-                            agent_5_response = agent_5.send_message(conversation_log)
-
-
-                            validation_decision = agent_5_response.text.strip().lower()
-                            print("Agent 5 Decision:", validation_decision)
-
-                            if "yes" not in validation_decision:
-                                print("\n=== Code validation failed. Retry with Agent 4 ===")
-                                conversation_log.append(f"{get_timestamp()} | Iteration {iteration} | Agent 5 -> Agent 4  : Validation failed. {validation_decision}")
-                                counter-=1
-                                continue
-                            break
-                        
-                        except Exception as e:
-                            if '429' in str(e):
-                                print("Rate limit exceeded when calling Agent 2. Retrying...")
-                                time.sleep(30)  # Wait before retrying
-                                continue  # Retry this iteration
-                            else:
-                                print(f"Unexpected error when calling Agent 2: {e}")
-                                return "no", "", "Error communicating with Agent 2."
-
-                        
-
-
-
-
-                    terminal_output, terminal_error = execute_code(language, sample_filename)
-
-                    sample_results.append({
-                        "sample_index": i + 1,
-                        "input": sample_input,
-                        "expected_output": expected_output,
-                        "actual_output": terminal_output.strip(),
-                        "error": terminal_error.strip(),
-                        "passed": terminal_output.strip() == expected_output
-                    })
-                    break
-
-                except Exception as e:
-                    print(f"Error processing sample {i + 1}: {e}")
-                    sample_results.append({
-                        "sample_index": i + 1,
-                        "input": sample_input,
-                        "expected_output": expected_output,
-                        "actual_output": "",
-                        "error": str(e),
-                        "passed": False
-                    })
-                    time.sleep(30)
-                    continue
+{results["rewrite"]}
+
+""", iteration, {5}, sample=i
+        )
+        agent_5_response = await agent_5.send_message_async(log.for_agent(5, sample=i))
+        validation_decision = agent_5_response.text.strip().lower()
+        print(f"Agent 5 Decision (sample {i + 1}):", validation_decision)
+        return validation_decision
+
+    async def execute(results):
+        return await execute_code_async(language, sample_filename, sample["expected_output"])
+
+    counter = 3
+    while True:
+        counter -= 1
+        stages = [
+            Stage("rewrite", rewrite),
+            # The last attempt is executed whatever Agent 5 says
+            Stage("check", check, after=["rewrite"], accept=lambda decision: "yes" in decision or counter == 0),
+            # The program runs while Agent 5 checks it, and is killed if Agent 5 rejects it
+            Stage("execute", execute, after=["rewrite"], guard="check"),
+        ]
+        try:
+            results, rejected = await run_stages(stages)
+        except StageFailed as e:
+            # Rate limits were already retried by the agents, so record the failure and move on
+            print(f"Error processing sample {i + 1}: {e.error}")
+            return sample_result(i, sample, error=str(e.error), passed=False), log.entries[start:]
+
+        if rejected:
+            print(f"\n=== Sample {i + 1} validation failed. Retry with Agent 4 ===")
+            log.append(f"{get_timestamp()} | Iteration {iteration} | Agent 5 -> Agent 4  : Validation failed. {results['check']}", iteration, {4, 5}, sample=i)
+            continue
+
+        terminal_output, terminal_error = results["execute"]
+        result = sample_result(i, sample, terminal_output, terminal_error)
+        remember_execution(key, result)
+        return result, log.entries[start:]
+
+class BetaWorkflow(SampleWorkflow):
+    """The alpha pipeline with Agent 5 checking every sample program, and a conversation log
+    shared by the agents in place of their own chat histories.
+
+    The log keeps the entries of the last `memory_iterations` iterations (see run_store);
+    older ones are only in the run store, and their summaries stand in for them.
+    """
+
+    agent_count = 5
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.conversation_log = ConversationLog(context_budget["log_tokens"])
+
+    async def run_attempt(self, attempt):
+        # Every attempt works on its own copy of the log; record() merges the finished ones back
+        attempt.log = self.conversation_log.copy()
+        attempt.log_start = len(attempt.log.entries)
+        return await super().run_attempt(attempt)
+
+    def record(self, attempt):
+        log = attempt.log
+        iteration = attempt.iteration
+        if attempt.rejected == "validate":
+            log.append(f"{get_timestamp()} | Iteration {iteration} | Validation failed. Retrying...", iteration, {1})
+        self.conversation_log.extend(log.entries[attempt.log_start:])
+        self.conversation_log.forget_before(iteration - run_store_settings["memory_iterations"] + 1)
+        if attempt.passed:
+            return
+        if attempt.rejected == "static_check":
+            summary = f"Static checks rejected the code: {attempt.feedback[:200]}"
+        elif attempt.rejected == "judge":
+            decision, explanation, judge = attempt.results["judge"]
+            results = test_summary(self.samples, attempt.results["samples"])
+            summary = (
+                f"{results['passed_tests']}/{results['total_samples']} samples passed; "
+                f"{judge} said {decision}: {explanation[:300]}"
+            )
+        else:
+            summary = attempt.feedback[:300]
+        self.conversation_log.summarize(iteration, f"{attempt.label}{summary}")
+
+    def events(self, attempt):
+        # The entries the attempt added to the log, under the agents they are sent to
+        return [
+            (",".join(f"Agent {agent}" for agent in sorted(entry["agents"])), entry["text"])
+            for entry in attempt.log.entries[attempt.log_start:]
+        ]
+
+    def checkpoint_state(self, iteration, code):
+        return {**super().checkpoint_state(iteration, code), "log": self.conversation_log.state()}
+
+    def restore(self, state):
+        self.conversation_log.restore(state["log"])
+        return super().restore(state)
+
+    def iteration_stages(self, attempt):
+        agent_1, agent_2, agent_3 = attempt.agents
+        label = attempt.label
+        iteration = attempt.iteration
+        log = attempt.log
+        timestamp = get_timestamp()
+
+        # Agent 1 is asked again through the log when its diff does not apply
+        async def ask_again(request):
+            log.append(f"{get_timestamp()} | Iteration {iteration} |       host:\n                    {request}", iteration, {1})
+            return await agent_1.send_code_async(log.for_agent(1))
+
+        # Step 1: Agent 1 generates/refines the code
+        async def generate(results):
+            log.append(f"""{get_timestamp()} | Iteration {iteration} |       host:
+                    {attempt.request}""", iteration, {1, 2, 3}
+            )
+            agent_1_response = await agent_1.send_code_async(log.for_agent(1))
+            refined_code = await self.refined_code(attempt, agent_1_response.text.strip(), parse_code, ask_again)
+            print(f"{label}Agent 1 Output (Refined Code):\n", refined_code)
+            log.append(f"{timestamp} | Iteration {iteration} | {label}Agent 1 -> Agent 2 :\n{refined_code}", iteration, {1, 2})
+            return refined_code
+
+        # Local static checks reject broken code without spending an Agent 2 call
+        async def check(results):
+            return await asyncio.to_thread(static_check, self.language, results["generate"])
+
+        # Step 2: Agent 2 validates the code
+        async def validate(results):
+            print(f"\n=== Iteration {iteration}: {label}Agent 2 validates the refined code ===")
+            log.append(f"""{get_timestamp()} | Iteration {iteration} |       host:
+                    Validate if the following {self.language} code is error-free and handles the task properly.\n
+                    Respond 'Yes' or 'No'.\n\n{results["generate"]}""", iteration, {2}
+            )
+            agent_2_response = await agent_2.send_message_async(log.for_agent(2))
+            log.append(f"{timestamp} | Iteration {iteration} | {label}Agent 2 -> Agent 1:\n{agent_2_response.text.strip()}", iteration, {1, 2})
+            validation_decision = agent_2_response.text.strip().lower()
+            print(f"{label}Agent 2 Decision:", validation_decision)
+            return validation_decision
+
+        async def save(results):
+            with open(attempt.filename, "w") as code_file:
+                code_file.write(results["generate"])
+            print(f"\n=== Code saved to {attempt.filename} ===")
+            log.append(f"{timestamp} | Iteration {iteration} |Agent 2 -> agent1: Validated code saved to file.", iteration, {1})
+
+        # Step 3: Agent 4 creates customized code for each sample and Agent 5 checks it
+        async def test_samples(results):
+            refined_code = results["generate"]
+            entries = {}
+
+            async def process(i, sample):
+                result, entries[i] = await process_sample_async(
+                    i, sample, self.language, refined_code, self.file_extension, self.models, log, iteration,
+                    attempt.prefix
+                )
+                return result
+
+            sample_results = await self.run_samples(attempt, refined_code, process)
+            if attempt.entry_point:
+                log.append(f"{get_timestamp()} | Iteration {iteration} | host: Ran the samples through {attempt.entry_point}().", iteration, {3})
+            for i in sorted(entries):
+                log.extend(entries[i])
+            return sample_results
 
         # Step 4: Agent 3 analyzes test results
-        print("\n=== Iteration {}: Agent 3 analyzes test results ===".format(iteration))
-        test_summary = {
-            "sample_results": sample_results,
-            "total_samples": len(samples),
-            "passed_tests": sum(1 for result in sample_results if result["passed"]),
-            "failed_tests": sum(1 for result in sample_results if not result["passed"]),
-        }
-        while True:
-            try:
-                conversation_log.append(f"""{get_timestamp()} | Iteration {iteration} | host -> agent 3:The following test results were obtained by executing code on the provided samples:
-                    {json.dumps(test_summary, indent=2)}
+        async def judge(results):
+            print(f"\n=== Iteration {iteration}: {label}Agent 3 analyzes test results ===")
+            sample_results = results["samples"]
+            summary = summarize_samples(self.samples, sample_results)
+            # Clear-cut results are decided here; only ambiguous ones go to Agent 3
+            verdict = deterministic_verdict(sample_results, len(self.samples))
+            judge = "Agent 3" if verdict is None else "Sample check"
+            while verdict is None:
+                log.append(f"""{get_timestamp()} | Iteration {iteration} | host -> agent 3:The following test results were obtained by executing code on the provided samples:
+                    {summary}
                     Does the code achieve the desired task? Respond in JSON format with:\n
                     if no samples exist, check the code itself and respond accordingly\n"
-                    'response': 'yes' or 'no', and 'explanation': A detailed explanation.") """                   
+                    'response': 'yes' or 'no', and 'explanation': A detailed explanation.") """, iteration, {3}
                 )
-                agent_3_response = agent_3.send_message(conversation_log)
-
-                
-                agent_3_output = json.loads(agent_3_response.text.strip())
-                decision = agent_3_output.get("response", "no").lower()
-                explanation = agent_3_output.get("explanation", "")
-                break
-                
-                  
-            except json.JSONDecodeError as e:
-                print("Error decoding Agent 3 response:", e)
-                print("Raw Agent 3 Response:", agent_3_response.text.strip())
-                explanation = "Failed to parse Agent 3 response."
-
-            except Exception as e:
-                if '429' in str(e):
-                    print("Rate limit exceeded when calling Agent 3. Retrying...")
-                    time.sleep(30)
-                    continue
-                else:
-                    print(f"Unexpected error when calling Agent 3: {e}")
-                    return "no", "", "Error communicating with Agent 3."
-        print("Agent 3 Decision:", decision)
-        print("Agent 3 Explanation:", explanation)
-
-        if "yes" in decision:
-            print("\n=== Workflow Complete: Code works as expected ===")
-            
-            return "yes", refined_code, explanation
-        conversation_log.append(f"{timestamp} | Iteration {iteration} | Agent 3 -> Host:\n{decision}, {explanation}")         
-        iteration += 1
-        print("\n--- Refining Code ---")
-        
-
-    return "no", refined_code, "Maximum iterations reached without achieving success."
+                agent_3_response = await agent_3.send_message_async(log.for_agent(3))
+                try:
+                    agent_3_output = json.loads(agent_3_response.text.strip())
+                    verdict = agent_3_output.get("response", "no").lower(), agent_3_output.get("explanation", "")
+                except json.JSONDecodeError as e:
+                    print("Error decoding Agent 3 response:", e)
+                    print("Raw Agent 3 Response:", agent_3_response.text.strip())
+            decision, explanation = verdict
+            print(f"{label}{judge} Decision:", decision)
+            print(f"{label}{judge} Explanation:", explanation)
+            log.append(f"{timestamp} | Iteration {iteration} | {label}{judge} -> Host:\n{decision}, {explanation}", iteration, {1, 3})
+            return decision, explanation, judge
+
+        return [
+            Stage("generate", generate),
+            self.repeat_stage(attempt),
+            Stage("static_check", check, after=["repeat"], accept=lambda diagnostics: not diagnostics),
+            Stage("validate", validate, after=["static_check"], accept=lambda decision: "yes" in decision),
+            Stage("save", save, after=["validate"]),
+            # The samples run while Agent 2 validates the code, and are cancelled if it rejects it
+            Stage("samples", test_samples, **self.samples_after()),
+            Stage("judge", judge, after=["samples"], accept=lambda verdict: "yes" in verdict[0]),
+        ]
+
+@traced("run")
+@in_workspace
+def host(prompt, language, samples, max_iterations=3, agents=None, concurrency=1,
+         harness=False, entry_point=None, candidates=1, workspace=None):
+    """Manages the workflow: generates, validates, and refines code while testing samples."""
+    workflow = BetaWorkflow(
+        prompt, language, samples, agents, candidates, concurrency, harness, entry_point, workspace
+    )
+    return aio.run(workflow.run(max_iterations))
+
+# Config fields that make up a task, passed to host() by name
+TASK_FIELDS = ("prompt", "language", "samples", "max_iterations", "agents", "concurrency", "harness", "entry_point",
+               "candidates")
 
 def main():
-    config_file = 'config.json'
-    
-    # Load configuration from file
-    with open(config_file, 'r') as file:
-        config = json.load(file)
-
-    # Set the API key
-    genai.configure(api_key=config['apikey'])
-
-    final_status, final_code, final_explanation = host(
-        config['prompt'], 
-        language=config['language'],
-        samples=config['samples'], 
-        max_iterations=config['max_iterations'],
-        agents=config['agents']
-    )
-    
-    print("\n=== Final Status ===")
-    print("Status:", final_status)
-    print("Refined Code:\n", final_code)
-    print("Explanation:", final_explanation)
+    cli.main(host, TASK_FIELDS)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1 @@
+"""Code shared by the stable, alpha and beta pipelines."""
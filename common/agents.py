@@ -0,0 +1,227 @@
+"""The chat agents of the pipelines and their generation settings."""
+import asyncio
+import time
+
+from typing_extensions import TypedDict
+
+from common import cache
+from common.backends import create_model
+from common.cascade import record_latency
+from common.context import context_budget, history_to_drop
+from common.ratelimit import (
+    RateLimitExceeded, estimate_tokens, get_rate_limiter, retry_delay, retry_policy, retryable_errors, used_tokens,
+)
+from common.streaming import CODE_BLOCK, StreamedResponse, read_code_stream, read_code_stream_async, streaming
+from common.trace import tracer
+
+class Agent3Response(TypedDict):
+    response: str  # "yes" or "no"
+    explanation: str  # Detailed explanation
+
+# Generation configurations
+generation_config_normal = {
+    "temperature": 0.7,
+    "top_p": 0.95,
+    "top_k": 64,
+    "max_output_tokens": 65536,
+    "response_mime_type": "text/plain",
+}
+generation_config_structured = {
+    "temperature": 0.7,
+    "top_p": 0.95,
+    "top_k": 64,
+    "max_output_tokens": 65536,
+    "response_mime_type": "application/json",
+    "response_schema": Agent3Response
+}
+
+def history_texts(chat):
+    """Returns the text of every turn in a chat session's history."""
+    return [
+        [getattr(part, "text", "") for part in getattr(content, "parts", [content])]
+        for content in chat.history
+    ]
+
+class Agent:
+    """Chat session wrapper that serves repeated requests from the response cache,
+    throttles calls through the model's rate limiter and retries quota errors."""
+
+    def __init__(self, chat, model_name, generation_config=None, name=None):
+        self.chat = chat
+        self.model_name = model_name
+        self.name = name or model_name
+        self.generation_config = generation_config
+        self.limiter = get_rate_limiter(model_name)
+
+    @property
+    def history(self):
+        return self.chat.history
+
+    def history_state(self):
+        """The chat history as plain role/parts dicts, as saved in checkpoints."""
+        return [
+            {"role": getattr(content, "role", "user"), "parts": parts}
+            for content, parts in zip(self.chat.history, history_texts(self.chat))
+        ]
+
+    def switch_model(self, model_name):
+        """Continues the conversation on another model."""
+        history = list(self.chat.history)
+        self.chat = create_model(model_name, self.generation_config, self.name).start_chat(history=[])
+        self.chat.history = history
+        self.model_name = model_name
+        self.limiter = get_rate_limiter(model_name)
+
+    def trim_history(self):
+        """Drops the oldest exchanges from the chat history until it fits in context_budget["history_tokens"]."""
+        drop = history_to_drop(history_texts(self.chat), context_budget["history_tokens"])
+        if drop:
+            self.chat.history = list(self.chat.history)[drop:]
+
+    def record_usage(self, response, estimate, span):
+        """Prints the prompt size of a call and records its token usage, as reported by the API when available."""
+        usage = getattr(response, "usage_metadata", None)
+        span["prompt_tokens"] = getattr(usage, "prompt_token_count", None) or estimate
+        span["response_tokens"] = getattr(usage, "candidates_token_count", None)
+        print(f"--- {self.model_name}: {span['prompt_tokens']} prompt tokens ---")
+
+    def cache_lookup(self, content):
+        """Returns (cache key, cached response or None) for a message about to be sent."""
+        response_cache = cache.response_cache
+        if response_cache is None:
+            return None, None
+        key = response_cache.key(self.model_name, self.generation_config, history_texts(self.chat), content)
+        text = response_cache.get(key)
+        if text is None:
+            if response_cache.replay:
+                raise cache.CacheMiss(f"No cached response for {self.model_name} in replay mode")
+            return key, None
+        # Keep the chat history as if the call had been made
+        parts = content if isinstance(content, list) else [content]
+        self.chat.history = list(self.chat.history) + [
+            {"role": "user", "parts": parts},
+            {"role": "model", "parts": [text]},
+        ]
+        return key, cache.CachedResponse(text)
+
+    def send_code(self, content):
+        """Sends a message whose reply is expected to be a code block.
+
+        With streaming enabled, the reply is read as it arrives and the stream is stopped as
+        soon as the first code block is complete; only that block is returned and kept in the
+        chat history.
+        """
+        if streaming["enabled"]:
+            return self.send_message(content, stream=True)
+        return self.send_message(content)
+
+    async def send_code_async(self, content):
+        """Async version of send_code()."""
+        if streaming["enabled"]:
+            return await self.send_message_async(content, stream=True)
+        return await self.send_message_async(content)
+
+    def finish_stream(self, text, stopped_early, history, content, span):
+        """Records what was read from a stream as the reply to `content` and returns it.
+
+        Replacing the chat history also drops the chat's reference to the stopped stream.
+        """
+        span["stopped_early"] = stopped_early
+        if stopped_early:
+            text = CODE_BLOCK.search(text).group(0)
+        parts = content if isinstance(content, list) else [content]
+        self.chat.history = history + [
+            {"role": "user", "parts": parts},
+            {"role": "model", "parts": [text]},
+        ]
+        return StreamedResponse(text)
+
+    def send_message(self, content, **kwargs):
+        with tracer.span("llm_call", agent=self.name, model=self.model_name) as span:
+            self.trim_history()
+            key, cached = self.cache_lookup(content)
+            span["cached"] = cached is not None
+            if cached is not None:
+                return cached
+            estimate = estimate_tokens(history_texts(self.chat), content)
+            for attempt in range(retry_policy["max_retries"] + 1):
+                self.limiter.acquire(estimate)
+                started = time.perf_counter()
+                try:
+                    history = list(self.chat.history) if kwargs.get("stream") else None
+                    response = self.chat.send_message(content, **kwargs)
+                    if history is not None:
+                        response = self.finish_stream(*read_code_stream(response), history, content, span)
+                except retryable_errors() as e:
+                    delay = retry_delay(e, attempt)
+                    span["retries"] = attempt + 1
+                    print(f"Rate limit exceeded for {self.model_name}. Retrying in {delay:.1f}s...")
+                    with tracer.span("retry_backoff", model=self.model_name):
+                        time.sleep(delay)
+                    continue
+                record_latency(self.model_name, time.perf_counter() - started)
+                self.limiter.settle(estimate, used_tokens(response, estimate))
+                self.record_usage(response, estimate, span)
+                if key is not None:
+                    cache.response_cache.put(key, response.text)
+                return response
+            raise RateLimitExceeded(
+                f"{self.model_name} still rate limited after {retry_policy['max_retries']} retries"
+            )
+
+    async def send_message_async(self, content, **kwargs):
+        """Async version of send_message().
+
+        A cancelled call leaves the chat history as it was, so a speculative call whose result
+        is thrown away is forgotten by the agent as well.
+        """
+        history = list(self.chat.history)
+        try:
+            return await self._send_message_async(content, **kwargs)
+        except asyncio.CancelledError:
+            self.chat.history = history
+            raise
+
+    async def _send_message_async(self, content, **kwargs):
+        with tracer.span("llm_call", agent=self.name, model=self.model_name) as span:
+            self.trim_history()
+            key, cached = self.cache_lookup(content)
+            span["cached"] = cached is not None
+            if cached is not None:
+                return cached
+            estimate = estimate_tokens(history_texts(self.chat), content)
+            for attempt in range(retry_policy["max_retries"] + 1):
+                await self.limiter.acquire_async(estimate)
+                started = time.perf_counter()
+                try:
+                    history = list(self.chat.history) if kwargs.get("stream") else None
+                    response = await self.chat.send_message_async(content, **kwargs)
+                    if history is not None:
+                        response = self.finish_stream(
+                            *await read_code_stream_async(response), history, content, span
+                        )
+                except retryable_errors() as e:
+                    delay = retry_delay(e, attempt)
+                    span["retries"] = attempt + 1
+                    print(f"Rate limit exceeded for {self.model_name}. Retrying in {delay:.1f}s...")
+                    with tracer.span("retry_backoff", model=self.model_name):
+                        await asyncio.sleep(delay)
+                    continue
+                record_latency(self.model_name, time.perf_counter() - started)
+                self.limiter.settle(estimate, used_tokens(response, estimate))
+                self.record_usage(response, estimate, span)
+                if key is not None:
+                    cache.response_cache.put(key, response.text)
+                return response
+            raise RateLimitExceeded(
+                f"{self.model_name} still rate limited after {retry_policy['max_retries']} retries"
+            )
+
+def create_agent(model_name, config, name=None):
+    """Creates a cached, rate-limited chat session using the specified model and configuration
+    on the configured backend.
+
+    `name` (e.g. "Agent 1") labels the agent's calls in the trace.
+    """
+    model = create_model(model_name, config, name)
+    return Agent(model.start_chat(history=[]), model_name, config, name)
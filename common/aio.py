@@ -0,0 +1,47 @@
+"""The event loop that every async part of a pipeline runs on."""
+import asyncio
+import os
+import threading
+
+# One loop per process, running in a daemon thread and started on first use. Clients such as
+# the Gemini async client stay bound to the loop they were first used in, so every call of
+# every run goes through this loop instead of a new one per asyncio.run().
+_loop = None
+_loop_lock = threading.Lock()
+
+def _forget_loop():
+    """A forked child has no loop thread; it starts its own loop when it needs one."""
+    global _loop, _loop_lock
+    _loop = None
+    _loop_lock = threading.Lock()
+
+os.register_at_fork(after_in_child=_forget_loop)
+
+def loop():
+    """Returns the process's event loop, starting it on first use."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="event-loop", daemon=True).start()
+        return _loop
+
+def run(coroutine):
+    """Runs a coroutine on the shared event loop and returns its result.
+
+    Blocks the calling thread, so it must not be called from a coroutine running on the loop.
+    If the caller is interrupted, the coroutine is cancelled.
+    """
+    target = loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is target:
+        raise RuntimeError("aio.run() was called from the shared event loop")
+    future = asyncio.run_coroutine_threadsafe(coroutine, target)
+    try:
+        return future.result()
+    except BaseException:
+        future.cancel()
+        raise
@@ -0,0 +1,197 @@
+"""Model backends that create_agent() builds its chat sessions on."""
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+import types
+
+from common.ratelimit import estimate_tokens
+
+# Model backends, chosen by the "backend" section of config.json. "gemini" calls the API;
+# "fake" answers every agent offline from scripted replies, with optional latency and
+# injected rate-limit failures, for benchmarking and testing without an API key.
+model_backend = {"name": "gemini", "latency": 0.0, "failure_rate": 0.0, "seed": 0, "responses": {}}
+
+# Default fake replies per agent: a Python identity function that passes any sample whose
+# expected output is its input. "{input}" is replaced with the sample input from the prompt.
+# Agent 1 writes it differently when asked again, so a refined program is not a repeat.
+FAKE_RESPONSES = {
+    "Agent 1": [
+        "```python\ndef solve(value):\n    return value\n```",
+        "```python\ndef solve(value):\n    result = value\n    return result\n```",
+        "```python\ndef solve(value):\n    values = [value]\n    return values[0]\n```",
+    ],
+    "Agent 2": ["Yes"],
+    "Agent 3": ['{"response": "yes", "explanation": "The output matches the expected output."}'],
+    "Agent 4": ["```python\ndef solve(value):\n    return value\n\nprint(solve({input}))\n```"],
+    "Agent 5": ["Yes"],
+}
+
+# Calls made by the fake backend, for benchmarks; reset by configure_backend()
+fake_stats = {"calls": 0, "failures": 0, "latency": 0.0}
+fake_stats_lock = threading.Lock()
+
+# Characters per chunk when the fake backend streams a reply
+FAKE_CHUNK_SIZE = 32
+
+class FakeResponse:
+    def __init__(self, text, prompt_tokens):
+        self.text = text
+        self.usage_metadata = types.SimpleNamespace(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=len(text) // 4,
+            total_token_count=prompt_tokens + len(text) // 4,
+        )
+
+class FakeChat:
+    """Offline stand-in for a Gemini chat session that replies from a script.
+
+    Each agent's replies are used in order and the last one repeats, so a script such as
+    ["No", "Yes"] for Agent 2 rejects the first iteration only. A script under
+    "<agent>@<model>" is used instead while the agent runs on that model.
+    """
+
+    def __init__(self, name, model_name=None):
+        self.name = name
+        responses = model_backend["responses"]
+        self.replies = (
+            responses.get(f"{name}@{model_name}") or responses.get(name) or FAKE_RESPONSES.get(name) or ["Yes"]
+        )
+        self.turn = 0
+        self.random = random.Random(f"{model_backend['seed']}:{name}")
+        self._history = []
+
+    @property
+    def history(self):
+        return self._history
+
+    @history.setter
+    def history(self, history):
+        self._history = [
+            types.SimpleNamespace(
+                role=content["role"],
+                parts=[types.SimpleNamespace(text=part) for part in content["parts"]],
+            ) if isinstance(content, dict) else content
+            for content in history
+        ]
+
+    def reply(self, content):
+        """Returns the next scripted reply, or raises ResourceExhausted at the configured failure rate."""
+        with fake_stats_lock:
+            fake_stats["calls"] += 1
+            if self.random.random() < model_backend["failure_rate"]:
+                fake_stats["failures"] += 1
+                from google.api_core import exceptions as google_exceptions
+                raise google_exceptions.ResourceExhausted("Fake backend: quota exhausted")
+        parts = content if isinstance(content, list) else [content]
+        prompt = "\n".join(str(part) for part in parts)
+        text = self.replies[min(self.turn, len(self.replies) - 1)]
+        self.turn += 1
+        # The last sample input mentioned in the prompt is the one being worked on
+        sample_inputs = re.findall(r"sample input:? `?(.*?)`?\.?\n", prompt)
+        if sample_inputs:
+            text = text.replace("{input}", sample_inputs[-1])
+        self.history = self._history + [
+            {"role": "user", "parts": parts},
+            {"role": "model", "parts": [text]},
+        ]
+        return FakeResponse(text, estimate_tokens(prompt))
+
+    def chunks(self, text):
+        """Splits a reply into the chunks of a fake stream, each taking its share of the latency."""
+        pieces = [text[start:start + FAKE_CHUNK_SIZE] for start in range(0, len(text), FAKE_CHUNK_SIZE)] or [""]
+        return pieces, model_backend["latency"] / len(pieces)
+
+    def wait(self, seconds):
+        with fake_stats_lock:
+            fake_stats["latency"] += seconds
+        time.sleep(seconds)
+
+    def stream(self, text):
+        pieces, delay = self.chunks(text)
+        for piece in pieces:
+            self.wait(delay)
+            yield types.SimpleNamespace(text=piece)
+
+    def send_message(self, content, stream=False, **kwargs):
+        response = self.reply(content)
+        if stream:
+            return self.stream(response.text)
+        self.wait(model_backend["latency"])
+        return response
+
+    async def wait_async(self, seconds):
+        with fake_stats_lock:
+            fake_stats["latency"] += seconds
+        await asyncio.sleep(seconds)
+
+    async def stream_async(self, text):
+        pieces, delay = self.chunks(text)
+        for piece in pieces:
+            await self.wait_async(delay)
+            yield types.SimpleNamespace(text=piece)
+
+    async def send_message_async(self, content, stream=False, **kwargs):
+        response = self.reply(content)
+        if stream:
+            return self.stream_async(response.text)
+        await self.wait_async(model_backend["latency"])
+        return response
+
+class FakeModel:
+    def __init__(self, name, model_name=None):
+        self.name = name
+        self.model_name = model_name
+
+    def start_chat(self, history=None):
+        return FakeChat(self.name, self.model_name)
+
+# google.generativeai takes about a second to import, so it is only imported when the first
+# Gemini model is created; the fake backend and the daemon client never pay for it. Models are
+# kept per name and generation config, so a long-lived process reuses them and their connections.
+genai = None
+gemini_settings = {"api_key": None}
+gemini_models = {}
+gemini_models_lock = threading.Lock()
+
+def configure_api_key(api_key):
+    """Sets the Gemini API key, now if google.generativeai is loaded or else when it is."""
+    gemini_settings["api_key"] = api_key
+    if genai is not None:
+        genai.configure(api_key=api_key)
+
+def load_genai():
+    """Imports and configures google.generativeai on first use."""
+    global genai
+    if genai is None:
+        import google.generativeai
+        google.generativeai.configure(api_key=gemini_settings["api_key"])
+        genai = google.generativeai
+    return genai
+
+def gemini_model(model_name, config, name):
+    key = (model_name, json.dumps(config, sort_keys=True, default=str))
+    with gemini_models_lock:
+        if key not in gemini_models:
+            gemini_models[key] = load_genai().GenerativeModel(model_name=model_name, generation_config=config)
+        return gemini_models[key]
+
+def fake_model(model_name, config, name):
+    return FakeModel(name or model_name, model_name)
+
+BACKENDS = {"gemini": gemini_model, "fake": fake_model}
+
+def configure_backend(settings=None):
+    """Applies the "backend" section of config.json and resets the fake backend's counters."""
+    if settings:
+        if settings.get("name", "gemini") not in BACKENDS:
+            raise ValueError(f"Unknown model backend: {settings['name']}")
+        model_backend.update(settings)
+    with fake_stats_lock:
+        fake_stats.update(calls=0, failures=0, latency=0.0)
+
+def create_model(model_name, config, name=None):
+    """Returns a model of the configured backend to start a chat session with."""
+    return BACKENDS[model_backend["name"]](model_name, config, name)
@@ -0,0 +1,98 @@
+"""Runs JSONL files of tasks through a pipeline's host() on a pool of worker processes."""
+import concurrent.futures
+import contextlib
+import json
+import os
+import re
+import time
+
+from common.config import configure
+
+def init_worker(config, workers):
+    """Configures the API key, rate limits and the other settings inside a worker process."""
+    # Each worker has its own limiters, so it only gets its share of every quota
+    configure(config, workers)
+
+def task_arguments(task, config, fields):
+    """The host() arguments of a task: each of `fields` from the task, or else from config.json."""
+    return {field: task.get(field, config.get(field)) for field in fields if field in task or field in config}
+
+def run_task(host, fields, task, config, workdir):
+    """Runs one batch task through host() inside its own working directory."""
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    started = time.time()
+    with open("host.log", "w") as log_file, contextlib.redirect_stdout(log_file):
+        try:
+            status, code, explanation = host(**task_arguments(task, config, fields))
+        except Exception as e:
+            status, code, explanation = "error", "", str(e)
+    return {
+        "id": task["id"],
+        "status": status,
+        "code": code,
+        "explanation": explanation,
+        "elapsed": round(time.time() - started, 3),
+    }
+
+def read_tasks(tasks_path):
+    """Yields the tasks of a JSONL file one at a time; tasks without an id get one from their line number."""
+    with open(tasks_path) as file:
+        for line_number, line in enumerate(file, 1):
+            if line.strip():
+                task = json.loads(line)
+                task.setdefault("id", f"line-{line_number}")
+                yield task
+
+def finished_tasks(results_path):
+    """Ids of the tasks that already have a result other than "error" in the results file."""
+    done = set()
+    if os.path.exists(results_path):
+        with open(results_path) as file:
+            for line in file:
+                if line.strip():
+                    result = json.loads(line)
+                    if result["status"] != "error":
+                        done.add(str(result["id"]))
+    return done
+
+def task_directory(workdir, task_id):
+    """The working directory of a task, named after its id."""
+    return os.path.join(workdir, re.sub(r"[^\w.-]", "_", str(task_id)))
+
+def write_results(results_file, futures):
+    """Appends the results of finished batch tasks to the results file."""
+    for future in futures:
+        result = future.result()
+        results_file.write(json.dumps(result) + "\n")
+        results_file.flush()
+        print(f"Task {result['id']}: {result['status']} ({result['elapsed']}s)")
+
+def run_batch(host, fields, config, tasks_path, results_path, workdir, workers):
+    """Runs every task of a JSONL file through host() on a pool of worker processes.
+
+    Each task may set any of the host() arguments named in `fields`; anything missing comes
+    from config.json. Results are appended to `results_path` as tasks finish. Tasks that
+    already have a result there (other than "error") are skipped, so an interrupted batch
+    resumes when the same command is run again.
+    """
+    done = finished_tasks(results_path)
+    workdir = os.path.abspath(workdir)
+    pending = set()
+    with open(results_path, "a") as results_file, concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers, initializer=init_worker, initargs=(config, workers)
+    ) as pool:
+        for task in read_tasks(tasks_path):
+            if str(task["id"]) in done:
+                print(f"Task {task['id']}: already done, skipping")
+                continue
+            pending.add(pool.submit(run_task, host, fields, task, config, task_directory(workdir, task["id"])))
+
+            # Only keep a few tasks queued per worker so large files are streamed, not loaded
+            if len(pending) >= workers * 2:
+                finished, pending = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                write_results(results_file, finished)
+
+        write_results(results_file, concurrent.futures.as_completed(pending))
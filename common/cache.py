@@ -0,0 +1,119 @@
+"""On-disk cache of model responses."""
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+
+from common.state import state_path
+
+# Response cache, set up from the "cache" section of config.json by configure_cache()
+response_cache = None
+
+class CacheMiss(Exception):
+    """Raised in replay mode when a call has no cached response."""
+
+class CachedResponse:
+    """Stands in for a model response that was served from the cache."""
+
+    def __init__(self, text):
+        self.text = text
+        self.usage_metadata = None
+
+class ResponseCache:
+    """On-disk SQLite cache of model responses, keyed by a hash of everything that was sent.
+
+    The key covers the model name, generation config, the chat history and the new message,
+    so a hit is only possible when the model would have seen exactly the same request.
+    """
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024, max_age_days=30, replay=False):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age_days * 24 * 3600
+        self.replay = replay
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT, size INTEGER, created REAL, accessed REAL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self.connection.commit()
+
+    @staticmethod
+    def key(model_name, generation_config, history, content):
+        """Hashes a request into a cache key."""
+        payload = json.dumps(
+            [model_name, generation_config, history, content],
+            sort_keys=True,
+            default=lambda value: getattr(value, "__name__", repr(value)),
+        )
+        # Log timestamps embedded in prompts don't change what is being asked
+        payload = re.sub(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}", "", payload)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key):
+        """Returns the cached response text for `key`, or None on a miss."""
+        now = time.time()
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT response FROM responses WHERE key = ? AND created >= ?",
+                (key, now - self.max_age),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            if not self.replay:
+                self.connection.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                self.connection.commit()
+            return row[0]
+
+    def put(self, key, text):
+        """Stores a response and evicts expired and least recently used entries."""
+        if self.replay:
+            return
+        now = time.time()
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, text, len(text.encode()), now, now),
+            )
+            self.connection.execute("DELETE FROM responses WHERE created < ?", (now - self.max_age,))
+            total = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_bytes:
+                rows = self.connection.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall()
+                for old_key, size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    self.connection.execute("DELETE FROM responses WHERE key = ?", (old_key,))
+                    total -= size
+            self.connection.commit()
+
+def configure_cache(settings=None):
+    """Opens the response cache described by the "cache" section of config.json.
+
+    `mode` is "off" (default), "readwrite", or "replay" (serve only cached responses and fail
+    on a miss). A relative `path` is kept in the state directory.
+    """
+    global response_cache
+    settings = settings or {}
+    mode = settings.get("mode", "off")
+    if mode == "off":
+        response_cache = None
+        return
+    response_cache = ResponseCache(
+        state_path(settings.get("path", "responses.sqlite")),
+        max_bytes=settings.get("max_bytes", 256 * 1024 * 1024),
+        max_age_days=settings.get("max_age_days", 30),
+        replay=mode == "replay",
+    )
+
+def print_cache_stats():
+    """Prints the hit and miss counts of the response cache, if it is on."""
+    if response_cache is not None:
+        print(f"Response cache: {response_cache.hits} hits, {response_cache.misses} misses")
@@ -0,0 +1,146 @@
+"""Model cascades: an agent slot starts on a fast model and moves to a stronger one when it fails."""
+import json
+import math
+import os
+import threading
+
+from common.state import locked, state_path
+
+# Model cascades, set up from the "cascade" section of config.json by configure_cascade().
+# An agent slot in config.json may list several models, cheapest first. A run starts every
+# slot on the fastest model that has proven itself there (at least `min_runs` attempts, at
+# least `min_success_rate` of them without a failure blamed on the slot), skipping models that
+# proved unreliable. A slot moves one model up once `escalate_after` failures on its current
+# model were blamed on it. The statistics are kept per slot in the `stats` file, a relative
+# path being kept in the state directory; set it to "" to keep them in memory only.
+cascade_settings = {"stats": ".model_stats.json", "min_runs": 3, "min_success_rate": 0.6, "escalate_after": 2}
+
+# Seconds spent in successful model calls, per model, since the process started
+model_timings = {}
+model_timings_lock = threading.Lock()
+
+def configure_cascade(settings=None):
+    """Applies the "cascade" section of config.json."""
+    if settings:
+        if settings.get("escalate_after", 1) < 1:
+            raise ValueError("cascade escalate_after must be at least 1")
+        cascade_settings.update(settings)
+
+def record_latency(model_name, seconds):
+    """Adds a successful call of `model_name` that took `seconds` to the process's timings."""
+    with model_timings_lock:
+        calls, total = model_timings.get(model_name, (0, 0.0))
+        model_timings[model_name] = calls + 1, total + seconds
+
+def hedged(decision):
+    """Whether an Agent 2 decision is something other than a plain yes or no."""
+    return not decision.strip().lower().startswith(("yes", "no"))
+
+class ModelRouter:
+    """Chooses the model of every agent slot from its cascade and records how each model did."""
+
+    def __init__(self, slots):
+        # One cascade per slot; a plain model name is a cascade of one
+        self.cascades = {
+            f"Agent {n + 1}": list(slot) if isinstance(slot, list) else [slot] for n, slot in enumerate(slots)
+        }
+        self.path = state_path(cascade_settings["stats"]) if cascade_settings["stats"] else None
+        self.stats = self.load()
+        self.tiers = {name: self.first_tier(name) for name in self.cascades}
+        # Failures blamed on each slot since it last changed models
+        self.failures = {name: 0 for name in self.cascades}
+        with model_timings_lock:
+            self.timings = dict(model_timings)
+
+    def load(self):
+        if self.path and os.path.exists(self.path):
+            with open(self.path) as file:
+                return json.load(file)
+        return {"models": {}, "slots": {}}
+
+    def first_tier(self, name):
+        """The fastest proven model of a slot, else its first model that has not proven unreliable."""
+        cascade = self.cascades[name]
+        proven, untried = [], []
+        for tier, model in enumerate(cascade):
+            record = self.stats["slots"].get(name, {}).get(model, {"attempts": 0, "passed": 0})
+            if record["attempts"] < cascade_settings["min_runs"]:
+                untried.append(tier)
+            elif record["passed"] / record["attempts"] >= cascade_settings["min_success_rate"]:
+                proven.append(tier)
+        if proven:
+            return min(proven, key=lambda tier: self.latency(cascade[tier]))
+        return untried[0] if untried else len(cascade) - 1
+
+    def latency(self, model):
+        """Mean seconds per call of `model` across runs."""
+        timing = self.stats["models"].get(model, {"calls": 0, "seconds": 0.0})
+        return timing["seconds"] / timing["calls"] if timing["calls"] else math.inf
+
+    def model(self, name):
+        return self.cascades[name][self.tiers[name]]
+
+    def models(self):
+        """The current model of every slot, in slot order."""
+        return [self.model(name) for name in self.cascades]
+
+    def escalate(self, name):
+        """Moves a slot to the next model of its cascade; returns whether there was one."""
+        if self.tiers[name] + 1 >= len(self.cascades[name]):
+            return False
+        self.tiers[name] += 1
+        self.failures[name] = 0
+        print(f"--- {name} escalates to {self.model(name)} ---")
+        return True
+
+    def record(self, outcomes):
+        """Records an attempt and escalates the slots it blamed often enough.
+
+        `outcomes` maps the slots that had a clear share in the attempt's outcome to whether
+        they did their part; the others are left out of the statistics.
+        """
+        with model_timings_lock:
+            timings = {
+                model: (calls - self.timings.get(model, (0, 0))[0], seconds - self.timings.get(model, (0, 0.0))[1])
+                for model, (calls, seconds) in model_timings.items()
+            }
+            self.timings = dict(model_timings)
+        self.save(outcomes, timings)
+        for name, passed in outcomes.items():
+            if not passed:
+                self.failures[name] += 1
+                if self.failures[name] >= cascade_settings["escalate_after"]:
+                    self.escalate(name)
+
+    def save(self, outcomes, timings):
+        """Adds an attempt to the statistics file.
+
+        The file is re-read and replaced while holding a lock on `<stats>.lock`, so runs in
+        other processes never drop each other's attempts.
+        """
+        with locked(self.path):
+            self.stats = self.load()
+            for name, passed in outcomes.items():
+                record = self.stats["slots"].setdefault(name, {}).setdefault(
+                    self.model(name), {"attempts": 0, "passed": 0}
+                )
+                record["attempts"] += 1
+                record["passed"] += int(passed)
+            for model, (calls, seconds) in timings.items():
+                timing = self.stats["models"].setdefault(model, {"calls": 0, "seconds": 0.0})
+                timing["calls"] += calls
+                timing["seconds"] += seconds
+            if not self.path:
+                return
+            temporary = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temporary, "w") as file:
+                json.dump(self.stats, file, indent=2)
+            os.replace(temporary, self.path)
+
+    def state(self):
+        """Where every slot is in its cascade, as saved in checkpoints."""
+        return {"tiers": self.tiers, "failures": self.failures}
+
+    def restore(self, state):
+        self.tiers.update(state["tiers"])
+        self.failures.update(state["failures"])
@@ -0,0 +1,57 @@
+"""Checkpoints of a run's loop state, so an interrupted run can be resumed."""
+import hashlib
+import json
+import os
+import threading
+
+from common.state import state_path
+
+# Checkpoints, set up from the "checkpoint" section of config.json by configure_checkpoint() and
+# turned on by --resume. {key} in the path is replaced by the start of the task's hash, so runs of
+# different tasks keep separate checkpoints; a relative path is kept in the state directory.
+checkpointing = {"enabled": False, "path": "checkpoints/{key}.json", "resume": False}
+
+def configure_checkpoint(settings=None):
+    """Applies the "checkpoint" section of config.json."""
+    if settings:
+        checkpointing.update(settings)
+
+class Checkpoint:
+    """A run's loop state, saved after every iteration that did not pass.
+
+    A hash of the task ties the file to the run it was made for. The file is replaced
+    atomically, but without an fsync: losing the last checkpoint to a power cut only costs
+    an iteration. It is removed once the run succeeds.
+    """
+
+    def __init__(self, task):
+        self.key = hashlib.sha256(json.dumps(task, sort_keys=True, default=str).encode()).hexdigest()
+        self.path = None
+        if checkpointing["enabled"] or checkpointing["resume"]:
+            self.path = state_path(checkpointing["path"].replace("{key}", self.key[:12]))
+
+    def load(self):
+        """Returns the saved state when resuming and it belongs to this task, otherwise None."""
+        if not (self.path and checkpointing["resume"] and os.path.exists(self.path)):
+            return None
+        with open(self.path) as file:
+            state = json.load(file)
+        if state.get("key") != self.key:
+            print(f"--- {self.path} was saved for another task; starting over ---")
+            return None
+        print(f"--- Resuming from {self.path} at iteration {state['iteration']} ---")
+        return state
+
+    def save(self, state):
+        """Replaces the checkpoint with `state`."""
+        if not self.path:
+            return
+        # Runs of the same task may save at the same time; each writes its own temporary file
+        temporary = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary, "w") as file:
+            json.dump({**state, "key": self.key}, file, default=str)
+        os.replace(temporary, self.path)
+
+    def remove(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
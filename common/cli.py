@@ -0,0 +1,84 @@
+"""The command line shared by the stable, alpha and beta scripts."""
+import argparse
+import json
+
+from common.batch import run_batch, task_arguments
+from common.cache import print_cache_stats
+from common.config import configure
+from common.daemon import send_request, serve, settings_for
+from common.runstore import configure_run_store, print_run_stats
+from common.state import configure_state
+from common.static_checks import print_static_check_stats
+from common.summary import print_summary_stats
+from common.trace import tracer
+
+def main(host, fields):
+    """Runs the task in config.json, or a batch of tasks, through `host`.
+
+    `fields` are the config.json entries that make up a task, passed to host() by name.
+    """
+    parser = argparse.ArgumentParser(description="Generate, validate and refine code with Gemini agents.")
+    parser.add_argument("--config", default="config.json", help="configuration file")
+    parser.add_argument("--batch", help="JSONL file of tasks to run instead of the prompt in the config")
+    parser.add_argument("--results", default="results.jsonl", help="file that batch results are appended to")
+    parser.add_argument("--workdir", default="batch_runs", help="directory holding one working directory per batch task")
+    parser.add_argument("--workers", type=int, default=4, help="number of batch worker processes")
+    parser.add_argument("--serve", action="store_true", help="run as a daemon that takes tasks over a Unix socket")
+    parser.add_argument("--submit", action="store_true", help="send the task in the config to the daemon and wait for its result")
+    parser.add_argument("--no-wait", action="store_true", help="with --submit, return once the task is queued")
+    parser.add_argument("--status", metavar="TASK_ID", help="print the status of a task sent to the daemon")
+    parser.add_argument("--resume", action="store_true", help="continue an interrupted run from its checkpoint")
+    parser.add_argument("--run-stats", action="store_true", help="print the median iterations to success per model")
+    args = parser.parse_args()
+
+    # Load configuration from file
+    with open(args.config, 'r') as file:
+        config = json.load(file)
+    if args.resume:
+        config.setdefault("checkpoint", {})["resume"] = True
+
+    if args.run_stats:
+        configure_state(config.get('state_dir'))
+        configure_run_store(config.get('run_store'))
+        print_run_stats()
+        return
+
+    if args.batch:
+        run_batch(host, fields, config, args.batch, args.results, args.workdir, args.workers)
+        return
+
+    if args.serve:
+        serve(host, fields, config)
+        return
+
+    # Daemon client: nothing is configured, the request just goes to the socket
+    socket_path = settings_for(config)["socket"]
+    if args.status:
+        print(json.dumps(send_request(socket_path, {"action": "status", "id": args.status}), indent=2))
+        return
+    if args.submit:
+        reply = send_request(socket_path, {"action": "submit", "task": task_arguments({}, config, fields)})
+        print(f"Task {reply['id']} queued, logging to {reply['workdir']}/host.log")
+        if args.no_wait:
+            return
+        result = send_request(socket_path, {"action": "wait", "id": reply["id"]})["result"]
+        print("\n=== Final Status ===")
+        print("Status:", result["status"])
+        print("Refined Code:\n", result["code"])
+        print("Explanation:", result["explanation"])
+        print(f"Elapsed: {result['elapsed']}s")
+        return
+
+    # Set the API key, rate limits and the other optional sections
+    configure(config)
+
+    final_status, final_code, final_explanation = host(**task_arguments({}, config, fields))
+
+    print("\n=== Final Status ===")
+    print("Status:", final_status)
+    print("Refined Code:\n", final_code)
+    print("Explanation:", final_explanation)
+    print_cache_stats()
+    print_static_check_stats()
+    print_summary_stats()
+    tracer.print_summary()
@@ -0,0 +1,54 @@
+"""Applies the sections of config.json to the shared modules."""
+from common.backends import configure_api_key, configure_backend
+from common.cache import configure_cache
+from common.cascade import configure_cascade
+from common.checkpoint import configure_checkpoint
+from common.context import configure_context
+from common.execution import configure_build_cache, configure_interpreter_pool
+from common.limits import configure_execution
+from common.memo import configure_memoization
+from common.ratelimit import configure_rate_limits, rate_limits
+from common.refinement import configure_refinement
+from common.results import configure_compare
+from common.runstore import configure_run_store
+from common.samples import configure_sample_execution
+from common.stages import configure_pipeline
+from common.state import configure_state
+from common.static_checks import configure_static_checks
+from common.streaming import configure_streaming
+from common.summary import configure_summary
+from common.trace import configure_trace
+from common.workspace import configure_workspace
+
+def configure(config, workers=1):
+    """Sets the API key and applies every optional section of `config`.
+
+    A process that is one of `workers` running at the same time gets that share of every
+    rate limit.
+    """
+    configure_api_key(config.get('apikey'))
+    configure_state(config.get('state_dir'))
+    limits = {
+        model: {name: value / workers for name, value in model_limits.items()}
+        for model, model_limits in {**rate_limits, **config.get('rate_limits', {})}.items()
+    }
+    configure_rate_limits(limits, config.get('retry'))
+    configure_cache(config.get('cache'))
+    configure_run_store(config.get('run_store'))
+    configure_context(config.get('context'))
+    configure_build_cache(config.get('build_cache'))
+    configure_trace(config.get('trace'))
+    configure_backend(config.get('backend'))
+    configure_streaming(config.get('streaming'))
+    configure_static_checks(config.get('static_checks'))
+    configure_summary(config.get('summary'))
+    configure_refinement(config.get('refinement'))
+    configure_memoization(config.get('memoization'))
+    configure_execution(config.get('execution'))
+    configure_compare(config.get('compare'))
+    configure_interpreter_pool(config.get('interpreter_pool'))
+    configure_sample_execution(config.get('sample_execution'))
+    configure_pipeline(config.get('pipeline'))
+    configure_cascade(config.get('cascade'))
+    configure_checkpoint(config.get('checkpoint'))
+    configure_workspace(config.get('workspace'))
@@ -0,0 +1,98 @@
+"""Token budgets that keep the prompts sent to the agents from growing with every iteration."""
+from common.ratelimit import estimate_tokens
+
+# Context budgets in estimated tokens, overridden by the "context" section of config.json.
+# history_tokens caps the chat history each agent resends with every call; log_tokens caps
+# the part of beta's conversation log sent to an agent.
+context_budget = {"history_tokens": 32000, "log_tokens": 16000}
+
+def configure_context(settings=None):
+    """Applies the "context" section of config.json."""
+    if settings:
+        context_budget.update(settings)
+
+def history_to_drop(turn_texts, budget):
+    """Returns how many of the oldest turns to drop, a user/model exchange at a time, so the
+    rest of a chat history fits in `budget` tokens."""
+    if not budget:
+        return 0
+    sizes = [estimate_tokens(turn) for turn in turn_texts]
+    total = sum(sizes)
+    drop = 0
+    while total > budget and drop < len(sizes):
+        total -= sum(sizes[drop:drop + 2])
+        drop += 2
+    return drop
+
+class ConversationLog:
+    """Conversation shared by the agents, sent to each agent within a token budget.
+
+    Every entry records its iteration, the agents it matters to and, for Agent 4/5 traffic,
+    the sample it belongs to. for_agent() sends an agent only its relevant entries, newest
+    first until the budget is used, and replaces earlier iterations with one-line summaries.
+    """
+
+    def __init__(self, budget_tokens):
+        self.budget_tokens = budget_tokens
+        self.entries = []
+        self.summaries = {}
+
+    def append(self, text, iteration, agents, sample=None):
+        self.entries.append({"text": text, "iteration": iteration, "agents": agents, "sample": sample})
+
+    def extend(self, entries):
+        self.entries.extend(entries)
+
+    def forget_before(self, iteration):
+        """Drops the entries of the iterations before `iteration`; their summaries stand in for them."""
+        self.entries = [entry for entry in self.entries if entry["iteration"] >= iteration]
+
+    def summarize(self, iteration, text):
+        """Adds a line to the summary that stands in for `iteration` once it leaves the window."""
+        self.summaries.setdefault(iteration, []).append(text)
+
+    def state(self):
+        """The log as plain JSON data, as saved in checkpoints."""
+        return {
+            "entries": [{**entry, "agents": sorted(entry["agents"])} for entry in self.entries],
+            "summaries": self.summaries,
+        }
+
+    def restore(self, state):
+        """Puts back a log saved with state()."""
+        self.entries = [{**entry, "agents": set(entry["agents"])} for entry in state["entries"]]
+        self.summaries = {int(iteration): lines for iteration, lines in state["summaries"].items()}
+
+    def copy(self):
+        log = ConversationLog(self.budget_tokens)
+        log.entries = list(self.entries)
+        log.summaries = {iteration: list(lines) for iteration, lines in self.summaries.items()}
+        return log
+
+    def for_agent(self, agent, sample=None):
+        """Returns the entries to send to `agent` (1-5), preceded by summaries of older iterations."""
+        window = []
+        used = 0
+        for entry in reversed(self.entries):
+            if agent not in entry["agents"] or entry["sample"] not in (None, sample):
+                continue
+            cost = estimate_tokens(entry["text"])
+            # The newest entry holds the actual request, so it is always sent
+            if window and used + cost > self.budget_tokens:
+                break
+            window.append(entry)
+            used += cost
+        window.reverse()
+
+        first_iteration = window[0]["iteration"] if window else None
+        summaries = []
+        summary_tokens = 0
+        for iteration in sorted(self.summaries, reverse=True):
+            if first_iteration is not None and iteration >= first_iteration:
+                continue
+            summary = f"Iteration {iteration} summary: {' '.join(self.summaries[iteration])}"
+            summary_tokens += estimate_tokens(summary)
+            if summary_tokens > self.budget_tokens // 4:
+                break
+            summaries.insert(0, summary)
+        return summaries + [entry["text"] for entry in window]
@@ -0,0 +1,147 @@
+"""Daemon mode: a long-lived process with warm workers that runs the tasks clients send it.
+
+The daemon listens on a Unix socket. Requests and replies are JSON lines, such as
+{"action": "submit", "task": {...}}, {"action": "status", "id": ...} or {"action": "wait", "id": ...}.
+The client side (send_request) only needs sockets and JSON, so --submit and --status start
+without loading the Gemini libraries.
+"""
+import concurrent.futures
+import json
+import os
+import socket
+import socketserver
+import threading
+
+from common.agents import generation_config_normal, generation_config_structured
+from common.backends import gemini_model, model_backend
+from common.batch import init_worker, run_task, task_directory
+from common.state import state
+
+# Set up from the "daemon" section of config.json; relative paths are kept in the state directory
+daemon_settings = {"socket": "codegen.sock", "workers": 1, "workdir": "daemon_runs"}
+
+def settings_for(config):
+    """The daemon settings of `config`, with the socket and workdir resolved in the state directory."""
+    settings = {**daemon_settings, **config.get("daemon", {})}
+    directory = os.path.abspath(config.get("state_dir") or state["dir"])
+    for name in ("socket", "workdir"):
+        settings[name] = os.path.join(directory, settings[name])
+    return settings
+
+def send_request(path, request):
+    """Sends one request to the daemon listening on `path` and returns its reply; exits on errors."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        try:
+            connection.connect(path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            raise SystemExit(f"No daemon is listening on {path}; start one with --serve")
+        connection.sendall((json.dumps(request) + "\n").encode())
+        with connection.makefile() as replies:
+            reply = json.loads(replies.readline())
+    if "error" in reply:
+        raise SystemExit(f"Daemon error: {reply['error']}")
+    return reply
+
+def warm_worker(config, workers):
+    """Initializer of the daemon's workers: configures them, then creates the configured models up front."""
+    init_worker(config, workers)
+    if model_backend["name"] == "gemini":
+        for slot in config.get("agents") or []:
+            # Only the first model of a cascade; stronger ones are created when a task escalates
+            model_name = slot[0] if isinstance(slot, list) else slot
+            gemini_model(model_name, generation_config_normal, None)
+            gemini_model(model_name, generation_config_structured, None)
+
+class TaskQueue:
+    """The daemon's tasks, run in submission order on a pool of warm worker processes."""
+
+    def __init__(self, host, fields, config, workers, workdir):
+        self.host = host
+        self.fields = fields
+        self.config = config
+        self.workdir = workdir
+        self.pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, initializer=warm_worker, initargs=(config, workers)
+        )
+        self.jobs = {}
+        self.lock = threading.Lock()
+        # Start the workers now rather than on the first task
+        concurrent.futures.wait([self.pool.submit(os.getpid) for _ in range(workers)])
+
+    def submit(self, task):
+        """Queues a task (the fields of a batch task) and returns its id and working directory."""
+        with self.lock:
+            task = {**task, "id": str(task.get("id") or f"task-{len(self.jobs) + 1}")}
+            if task["id"] in self.jobs:
+                raise ValueError(f"Task {task['id']} already exists")
+            task_dir = task_directory(self.workdir, task["id"])
+            self.jobs[task["id"]] = self.pool.submit(run_task, self.host, self.fields, task, self.config, task_dir)
+        return {"id": task["id"], "status": "queued", "workdir": task_dir}
+
+    def status(self, task_id, wait=False):
+        """Returns a task's status ("queued", "running" or "done" with its result), waiting for it with `wait`."""
+        future = self.jobs.get(str(task_id))
+        if future is None:
+            raise KeyError(f"Unknown task: {task_id}")
+        if wait or future.done():
+            return {"id": task_id, "status": "done", "result": future.result()}
+        return {"id": task_id, "status": "running" if future.running() else "queued"}
+
+    def handle(self, request):
+        """Answers one request: submit a task, or get a task's status or its result once it is done."""
+        action = request.get("action")
+        if action == "submit":
+            return self.submit(request["task"])
+        if action in ("status", "wait"):
+            return self.status(request["id"], wait=action == "wait")
+        raise ValueError(f"Unknown action: {action}")
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+def handle_connection(tasks, rfile, wfile):
+    """Serves one client connection; every line it sends is a request and gets a reply line."""
+    for line in rfile:
+        if not line.strip():
+            continue
+        try:
+            reply = tasks.handle(json.loads(line))
+        except Exception as e:
+            reply = {"error": f"{type(e).__name__}: {e}"}
+        wfile.write((json.dumps(reply) + "\n").encode())
+        wfile.flush()
+
+def make_server(path, tasks):
+    """Returns a threaded server on the Unix socket `path` that answers requests from `tasks`.
+
+    A socket file left behind by a daemon that did not shut down cleanly is replaced; one a
+    daemon is still listening on is not.
+    """
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            handle_connection(tasks, self.rfile, self.wfile)
+
+    if os.path.exists(path):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            if probe.connect_ex(path) == 0:
+                raise SystemExit(f"A daemon is already listening on {path}")
+        os.remove(path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    server = socketserver.ThreadingUnixStreamServer(path, Handler)
+    server.daemon_threads = True
+    return server
+
+def serve(host, fields, config):
+    """Runs the daemon until it is interrupted."""
+    settings = settings_for(config)
+    tasks = TaskQueue(host, fields, config, settings["workers"], settings["workdir"])
+    server = make_server(settings["socket"], tasks)
+    print(f"--- Daemon listening on {settings['socket']} with {settings['workers']} warm workers ---")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.remove(settings["socket"])
+        tasks.close()
@@ -0,0 +1,244 @@
+"""Runs generated programs and collects their output."""
+import asyncio
+import atexit
+import functools
+import hashlib
+import json
+import os
+import queue
+import subprocess
+import threading
+
+from common import aio
+from common.limits import collect_output, collect_output_async, limited, scaled_limits
+from common.state import state_path
+from common.trace import traced, tracer
+
+# Drivers for pre-started interpreters. Each one blocks until a job arrives on the pipe whose
+# fd is passed as its argument (a JSON header line, then the program source), moves to the
+# job's directory and runs the source as the main program. stdin, stdout and stderr are the
+# process's own pipes, so the program behaves as if it had been started directly.
+PYTHON_POOL_DRIVER = r"""
+import json, os, sys, traceback, types
+with open(int(sys.argv[1])) as job:
+    header = json.loads(job.readline())
+    source = job.read()
+os.chdir(header["cwd"])
+sys.argv = [header["path"]]
+sys.path[0] = os.path.dirname(header["path"])
+main = types.ModuleType("__main__")
+main.__file__ = header["path"]
+sys.modules["__main__"] = main
+try:
+    exec(compile(source, header["path"], "exec"), main.__dict__)
+except SystemExit:
+    raise
+except BaseException as error:
+    traceback.print_exception(type(error), error, error.__traceback__.tb_next)
+    sys.exit(1)
+"""
+NODE_POOL_DRIVER = r"""
+const fs = require("fs"), path = require("path"), Module = require("module");
+const job = fs.readFileSync(Number(process.argv[1]), "utf8");
+const newline = job.indexOf("\n");
+const header = JSON.parse(job.slice(0, newline));
+process.chdir(header.cwd);
+process.argv[1] = header.path;
+const main = new Module(header.path, null);
+main.filename = header.path;
+main.paths = Module._nodeModulePaths(path.dirname(header.path));
+process.mainModule = main;
+main._compile(job.slice(newline + 1), header.path);
+"""
+
+# Interpreter pools, enabled by the "interpreter_pool" section of config.json
+interpreter_pool_size = 0
+interpreter_pools = {}
+interpreter_pools_lock = threading.Lock()
+
+class InterpreterPool:
+    """Keeps interpreters started ahead of time so running a program skips interpreter startup.
+
+    Each interpreter runs exactly one program and is then thrown away, so jobs are as isolated
+    as with a fresh process; a replacement is started in the background straight away.
+    """
+
+    def __init__(self, language, size):
+        self.command = {
+            "python": ["python", "-u", "-c", PYTHON_POOL_DRIVER],
+            "js": ["node", "-e", NODE_POOL_DRIVER],
+        }[language]
+        self.idle = queue.Queue()
+        for _ in range(size):
+            self.idle.put(self.start())
+
+    def start(self):
+        """Starts an interpreter that waits for its job on a dedicated pipe."""
+        job_reader, job_writer = os.pipe()
+        process = subprocess.Popen(
+            limited(self.command + [str(job_reader)]),
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            pass_fds=(job_reader,),
+        )
+        os.close(job_reader)
+        return process, job_writer
+
+    def replace(self):
+        self.idle.put(self.start())
+
+    def run(self, filepath, stdin="", expected_output=None, limits=None):
+        """Runs a program file in a waiting interpreter and returns (stdout, stderr, exit code).
+
+        The run is bounded by the execution limits like any other, see collect_output().
+        """
+        process, job_writer = self.idle.get()
+        threading.Thread(target=self.replace, daemon=True).start()
+
+        with open(filepath) as file:
+            source = file.read()
+        header = {"path": os.path.abspath(filepath), "cwd": os.path.dirname(os.path.abspath(filepath))}
+        with os.fdopen(job_writer, "w") as job:
+            job.write(json.dumps(header) + "\n" + source)
+
+        process.stdin.write(stdin.encode())
+        process.stdin.close()
+        return collect_output(process, expected_output, limits)
+
+    def close(self):
+        """Stops the interpreters that are still waiting for a job."""
+        while not self.idle.empty():
+            process, job_writer = self.idle.get()
+            os.close(job_writer)
+            process.kill()
+            process.wait()
+
+def configure_interpreter_pool(settings=None):
+    """Applies the "interpreter_pool" section of config.json; a size of 0 turns pooling off."""
+    global interpreter_pool_size
+    interpreter_pool_size = (settings or {}).get("size", 0)
+
+def get_interpreter_pool(language):
+    """Returns the interpreter pool for `language`, starting it on first use, or None if pooling is off."""
+    if interpreter_pool_size <= 0 or language not in ("python", "js"):
+        return None
+    with interpreter_pools_lock:
+        if language not in interpreter_pools:
+            interpreter_pools[language] = InterpreterPool(language, interpreter_pool_size)
+        return interpreter_pools[language]
+
+@atexit.register
+def close_interpreter_pools():
+    for pool in interpreter_pools.values():
+        pool.close()
+
+# Compiled C/CUDA binaries are kept in a content-addressed cache, set up from the
+# "build_cache" section of config.json by configure_build_cache(). A relative dir is kept
+# in the state directory.
+build_cache = {"dir": "builds", "max_entries": 64, "flags": {}}
+COMPILERS = {"c": "gcc", "nvcc": "nvcc"}
+
+@functools.lru_cache(maxsize=None)
+def compiler_version(compiler):
+    """Returns the compiler's version banner, so upgrading the compiler invalidates cached binaries."""
+    try:
+        return subprocess.run([compiler, "--version"], text=True, capture_output=True).stdout
+    except OSError:
+        return ""
+
+def configure_build_cache(settings=None):
+    """Applies the "build_cache" section of config.json."""
+    if settings:
+        build_cache.update(settings)
+
+@traced("compile")
+def compile_cached(language, filepath):
+    """Compiles a C or CUDA file and returns the path of the binary.
+
+    Binaries are stored under a hash of the source, compiler and flags, so an unchanged program
+    is never rebuilt, and each distinct program gets its own path. Raises
+    subprocess.CalledProcessError if compilation fails.
+    """
+    compiler = COMPILERS[language]
+    flags = build_cache["flags"].get(language, [])
+    with open(filepath, "rb") as source_file:
+        source = source_file.read()
+    digest = hashlib.sha256(
+        json.dumps([compiler, compiler_version(compiler), flags]).encode() + b"\0" + source
+    ).hexdigest()
+
+    binary = state_path(os.path.join(build_cache["dir"], f"{digest}.out"))
+    if os.path.exists(binary):
+        os.utime(binary)  # Mark as recently used for eviction
+        return binary
+
+    # Build under a unique name and rename, so concurrent builds never see a half-written binary
+    partial = f"{binary}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        subprocess.run([compiler, filepath, *flags, "-o", partial], text=True, capture_output=True, check=True)
+        os.replace(partial, binary)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    evict_build_cache(os.path.dirname(binary))
+    return binary
+
+def evict_build_cache(cache_dir):
+    """Removes the least recently used binaries beyond build_cache["max_entries"]."""
+    binaries = sorted(
+        (entry for entry in os.scandir(cache_dir) if entry.name.endswith(".out")),
+        key=lambda entry: entry.stat().st_mtime,
+    )
+    for entry in binaries[:max(0, len(binaries) - build_cache["max_entries"])]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+@traced("execute")
+async def execute_code_async(language, filepath, expected_output=None, runs=1):
+    """Executes a code file with an asyncio subprocess so several samples can run at once.
+
+    The program runs under the execution limits, scaled by `runs` for a program that does
+    the work of several, and with `expected_output` it is stopped once its output can no
+    longer match it. The program runs in the file's directory.
+    """
+    print(f"Executing {language} code in file: {filepath}")
+    filepath = os.path.abspath(filepath)
+    limits = scaled_limits(runs)
+
+    pool = get_interpreter_pool(language)
+    if pool is not None:
+        stdout, stderr, returncode = await asyncio.to_thread(pool.run, filepath, "", expected_output, limits)
+        tracer.annotate(exit_code=returncode)
+        if returncode != 0:
+            return "", stderr.strip()
+        return stdout.strip(), stderr.strip()
+
+    command = {
+        "python": ["python", "-u", filepath],  # unbuffered, so output is seen as it is printed
+        "js": ["node", filepath]
+    }.get(language)
+
+    if language in COMPILERS:
+        try:
+            command = [await asyncio.to_thread(compile_cached, language, filepath)]
+        except subprocess.CalledProcessError as e:
+            tracer.annotate(compile_error=True)
+            return "", f"Compilation Error:\n{e.stderr.strip()}"
+    elif command is None:
+        raise ValueError(f"Unsupported language: {language}")
+
+    process = await asyncio.create_subprocess_exec(
+        *limited(command, limits), stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, cwd=os.path.dirname(filepath),
+    )
+    # A cancelled candidate's program is killed and reaped before the cancellation propagates
+    stdout, stderr, returncode = await collect_output_async(process, expected_output, limits)
+    tracer.annotate(exit_code=returncode)
+    if returncode != 0:
+        return "", stderr.strip()
+    return stdout.strip(), stderr.strip()
+
+def execute_code(language, filepath, expected_output=None):
+    """Executes a code file from synchronous code, on the shared event loop."""
+    return aio.run(execute_code_async(language, filepath, expected_output))
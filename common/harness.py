@@ -0,0 +1,159 @@
+"""Runs every sample of a Python task through its entry point in a single process."""
+import ast
+import asyncio
+import json
+import math
+import os
+
+from common.execution import execute_code_async
+from common.limits import execution_limits
+from common.memo import execution_key, recall_execution, remember_execution
+from common.samples import failure_order, run_until_failures, sample_execution, sample_result
+from common.workspace import workspace_file
+
+# Harness run in a single Python process: imports the validated task file once, calls the
+# entry point with every sample input and prints one JSON result per sample. Each call is
+# bounded by its own timer and output cap, so one runaway sample cannot take the others down.
+# The constants TASK_PATH, ENTRY_POINT, SAMPLE_INPUTS, SAMPLE_TIMEOUT and MAX_OUTPUT_BYTES
+# are prepended by run_harness().
+HARNESS_SOURCE = r"""
+import contextlib, importlib.util, io, json, signal, traceback
+
+class SampleLimitExceeded(BaseException):
+    pass
+
+def timed_out(signum, frame):
+    raise SampleLimitExceeded(f"Sample timed out after {SAMPLE_TIMEOUT}s")
+
+class CappedOutput(io.StringIO):
+    def write(self, text):
+        if MAX_OUTPUT_BYTES and self.tell() + len(text) > MAX_OUTPUT_BYTES:
+            raise SampleLimitExceeded(f"Sample output exceeded {MAX_OUTPUT_BYTES} bytes")
+        return super().write(text)
+
+signal.signal(signal.SIGALRM, timed_out)
+
+spec = importlib.util.spec_from_file_location("task", TASK_PATH)
+task = importlib.util.module_from_spec(spec)
+with contextlib.redirect_stdout(io.StringIO()):
+    spec.loader.exec_module(task)
+entry = getattr(task, ENTRY_POINT)
+
+results = []
+for sample_input in SAMPLE_INPUTS:
+    captured = CappedOutput()
+    try:
+        # Inputs are Python expressions; a tuple is spread into positional arguments
+        args = eval(sample_input, vars(task))
+        if not isinstance(args, tuple):
+            args = (args,)
+        signal.setitimer(signal.ITIMER_REAL, SAMPLE_TIMEOUT)
+        try:
+            with contextlib.redirect_stdout(captured):
+                value = entry(*args)
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        output = captured.getvalue() if value is None else str(value)
+        results.append({"output": output, "error": ""})
+    except SampleLimitExceeded as error:
+        results.append({"output": captured.getvalue(), "error": f"Execution stopped: {error}."})
+    except BaseException:
+        results.append({"output": captured.getvalue(), "error": traceback.format_exc()})
+print(json.dumps(results))
+"""
+
+def public_functions(code):
+    """Names of the public top-level functions of `code`, or None if it does not parse."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+    return [
+        node.name for node in tree.body
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and not node.name.startswith("_")
+    ]
+
+def find_entry_point(code, sample_input, agent):
+    """Works out which function of the validated code the sample inputs should be passed to.
+
+    A single public top-level function (besides main) is used directly; otherwise `agent` is
+    asked to pick one. Returns None if there is no usable function.
+    """
+    functions = public_functions(code)
+    if not functions:
+        return None
+    candidates = [name for name in functions if name != "main"]
+    if len(candidates) == 1:
+        return candidates[0]
+
+    response = agent.send_message(
+        f"Which function in the following Python code should be called with the sample input {sample_input}?\n"
+        f"Respond with the function name only.\n\n{code}"
+    )
+    name = response.text.strip().strip("`").split("(")[0].strip()
+    return name if name in functions else None
+
+async def run_harness(filename, entry_point, samples, harness_filename="task_harness.py", indices=None):
+    """Runs the samples at `indices` (default: all of them) against the validated task file in one
+    Python process and returns their results.
+
+    Each sample gets the execution timeout and output cap of a program of its own; the
+    process as a whole gets them once per sample, plus once for importing the task file.
+    """
+    if indices is None:
+        indices = range(len(samples))
+    samples_run = [samples[i] for i in indices]
+    with open(harness_filename, "w") as harness_file:
+        harness_file.write(
+            f"TASK_PATH = {json.dumps(os.path.abspath(filename))}\n"
+            f"ENTRY_POINT = {json.dumps(entry_point)}\n"
+            f"SAMPLE_INPUTS = {json.dumps([sample['input'] for sample in samples_run])}\n"
+            f"SAMPLE_TIMEOUT = {execution_limits['timeout']!r}\n"
+            f"MAX_OUTPUT_BYTES = {execution_limits['max_output_bytes']!r}\n"
+            + HARNESS_SOURCE
+        )
+    terminal_output, terminal_error = await execute_code_async("python", harness_filename, runs=len(samples_run) + 1)
+
+    try:
+        outputs = json.loads(terminal_output)
+    except json.JSONDecodeError:
+        # The task file itself failed to load: every sample fails with the same error
+        outputs = [{"output": "", "error": terminal_error or terminal_output}] * len(samples_run)
+
+    return [
+        sample_result(i, samples[i], output["output"], output["error"])
+        for i, output in zip(indices, outputs)
+    ]
+
+async def run_harness_shards(filename, entry_point, samples, prefix="task"):
+    """Runs the samples through the harness in shards on parallel processes and returns their results.
+
+    Samples already run on the same code are taken from the execution cache. The others go
+    into shards, samples that failed before first, and shard n is run by
+    <prefix>_harness_<n>/task_harness.py; see run_until_failures() for stopping early.
+    """
+    with open(filename) as code_file:
+        code = code_file.read()
+    keys = [execution_key("python", code, sample, entry_point) for sample in samples]
+    recalled = {i: recall_execution(key, i) for i, key in enumerate(keys)}
+    recalled = {i: result for i, result in recalled.items() if result is not None}
+    order = [i for i in failure_order(samples) if i not in recalled]
+    workers = sample_execution["workers"] or os.cpu_count() or 1
+    size = sample_execution["shard_size"] or math.ceil(len(order) / workers) or 1
+    shards = [order[start:start + size] for start in range(0, len(order), size)]
+    semaphore = asyncio.Semaphore(workers)
+
+    async def run(n, indices):
+        async with semaphore:
+            harness_filename = workspace_file(f"{prefix}_harness_{n + 1}", "task_harness.py")
+            sample_results = await run_harness(filename, entry_point, samples, harness_filename, indices)
+        for i, result in zip(indices, sample_results):
+            remember_execution(keys[i], result)
+        return sample_results
+
+    async def recall(result):
+        return [result]
+
+    return await run_until_failures(
+        [recall(result) for result in recalled.values()] + [run(n, indices) for n, indices in enumerate(shards)]
+    )
@@ -0,0 +1,168 @@
+"""Limits on running generated programs: timeouts, rlimits, output caps and divergence kills."""
+import asyncio
+import contextlib
+import os
+import selectors
+import time
+
+from common.results import comparison
+
+# Limits on running generated programs, set up from the "execution" section of config.json by
+# configure_execution(). A limit of 0 turns it off.
+execution_limits = {
+    "timeout": 30,                  # wall-clock seconds
+    "cpu_seconds": 30,
+    "memory_mb": 1024,
+    "max_output_bytes": 1024 * 1024,  # per stream; output beyond this kills the program
+    "kill_on_divergence": True,     # stop a sample as soon as its output cannot match any more
+}
+
+def configure_execution(settings=None):
+    """Applies the "execution" section of config.json."""
+    if settings:
+        execution_limits.update(settings)
+
+def scaled_limits(runs=1):
+    """The limits for one process doing the work of `runs` programs, such as the sample harness."""
+    return {
+        **execution_limits,
+        **{name: execution_limits[name] * runs for name in ("timeout", "cpu_seconds", "max_output_bytes")},
+    }
+
+def limited(command, limits=None):
+    """Wraps `command` so it runs under the CPU and memory limits.
+
+    A shell sets the rlimits with ulimit and then execs the program, so the program keeps the
+    shell's pid and killing the process kills the program. This replaces preexec_fn, which is
+    unsafe in a process with threads.
+    """
+    limits = limits or execution_limits
+    settings = []
+    if limits["cpu_seconds"]:
+        settings.append(f"ulimit -t {int(limits['cpu_seconds'])}")
+    if limits["memory_mb"]:
+        # The data segment rather than address space, since V8 reserves far more address space than it uses
+        settings.append(f"ulimit -d {int(limits['memory_mb']) * 1024}")
+    if not settings:
+        return list(command)
+    return ["/bin/sh", "-c", "; ".join(settings) + '; exec "$@"', "sh", *command]
+
+def output_diverged(output, expected_output):
+    """Returns whether a program's output so far can no longer match the expected output.
+
+    Whitespace is ignored. Output that is still a prefix of the expected output may match;
+    when structural normalizers are enabled, output that differs in form (quotes, number
+    formatting, order) may still match, so only output far longer than expected counts.
+    """
+    actual = "".join(output.split())
+    expected = "".join(str(expected_output).split())
+    if expected.startswith(actual):
+        return False
+    if set(comparison["normalizers"]) & {"literal", "float", "unordered"}:
+        return len(actual) > 4 * len(expected) + 64
+    return True
+
+class OutputCollector:
+    """Accumulates a running program's output and decides when it has to be stopped."""
+
+    def __init__(self, expected_output=None, limits=None):
+        self.streams = {"stdout": bytearray(), "stderr": bytearray()}
+        self.expected_output = expected_output
+        self.limits = limits or execution_limits
+        self.reason = None
+
+    def add(self, name, data):
+        """Adds a chunk of output; returns False once the program should be killed."""
+        buffer = self.streams[name]
+        limit = self.limits["max_output_bytes"]
+        if limit and len(buffer) + len(data) > limit:
+            buffer += data[:limit - len(buffer)]
+            self.reason = f"{name} exceeded {limit} bytes"
+            return False
+        buffer += data
+        if (
+            name == "stdout"
+            and self.expected_output is not None
+            and self.limits["kill_on_divergence"]
+            and output_diverged(buffer.decode(errors="replace"), self.expected_output)
+        ):
+            self.reason = "output can no longer match the expected output"
+            return False
+        return True
+
+    def result(self, returncode):
+        """Returns (stdout, stderr, exit code), noting on stderr why the program was killed."""
+        stdout, stderr = (self.streams[name].decode(errors="replace") for name in ("stdout", "stderr"))
+        if self.reason:
+            stderr += f"\nExecution stopped: {self.reason}."
+        return stdout, stderr, returncode
+
+def collect_output(process, expected_output=None, limits=None):
+    """Reads a program's stdout and stderr as they arrive, under the execution limits.
+
+    The program is killed when it runs past the timeout or prints too much or, with
+    kill_on_divergence, prints output that can no longer match `expected_output`.
+    Returns (stdout, stderr, exit code).
+    """
+    collector = OutputCollector(expected_output, limits)
+    timeout = collector.limits["timeout"]
+    deadline = time.monotonic() + timeout if timeout else None
+    with selectors.DefaultSelector() as selector:
+        selector.register(process.stdout, selectors.EVENT_READ, "stdout")
+        selector.register(process.stderr, selectors.EVENT_READ, "stderr")
+        while selector.get_map() and collector.reason is None:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                collector.reason = f"timed out after {timeout}s"
+                break
+            for key, _ in selector.select(remaining):
+                data = os.read(key.fileobj.fileno(), 65536)
+                if not data:
+                    selector.unregister(key.fileobj)
+                elif not collector.add(key.data, data):
+                    break
+    if collector.reason:
+        process.kill()
+    process.wait()
+    process.stdout.close()
+    process.stderr.close()
+    return collector.result(process.returncode)
+
+async def collect_output_async(process, expected_output=None, limits=None):
+    """Async version of collect_output() for asyncio subprocesses.
+
+    A cancelled caller kills and reaps the program before the cancellation propagates.
+    """
+    collector = OutputCollector(expected_output, limits)
+
+    def kill():
+        if process.returncode is None:
+            with contextlib.suppress(ProcessLookupError):
+                process.kill()
+
+    async def pump(stream, name):
+        while True:
+            data = await stream.read(65536)
+            if not data:
+                return
+            if not collector.add(name, data):
+                kill()
+                return
+
+    timeout = collector.limits["timeout"]
+    pumps = asyncio.gather(pump(process.stdout, "stdout"), pump(process.stderr, "stderr"))
+    try:
+        await asyncio.wait_for(pumps, timeout or None)
+    except asyncio.TimeoutError:
+        collector.reason = f"timed out after {timeout}s"
+        kill()
+    except asyncio.CancelledError:
+        kill()
+        await process.wait()
+        raise
+    finally:
+        # Cancelled pumps leave a CancelledError in the gather that asyncio would report as lost
+        if pumps.done() and not pumps.cancelled():
+            pumps.exception()
+    await process.wait()
+    return collector.result(process.returncode)
@@ -0,0 +1,65 @@
+"""Memoization of verdicts and sample results by a hash of the normalized code."""
+import ast
+import hashlib
+import threading
+
+# Memoization, set up from the "memoization" section of config.json by configure_memoization().
+# Models often send the same program again. A workflow remembers why every program it rejected
+# failed, by a hash of the normalized code, and answers a repeat with that verdict instead of
+# validating it and running the samples again. Sample results are also kept, in a cache of up
+# to `max_executions` entries per process keyed by the code hash, the sample and the language,
+# so code that comes back in another candidate or task is not run again.
+memoization = {"enabled": True, "max_executions": 4096}
+execution_memo = {}
+execution_memo_lock = threading.Lock()
+
+def configure_memoization(settings=None):
+    """Applies the "memoization" section of config.json."""
+    if settings:
+        memoization.update(settings)
+
+def code_key(language, code):
+    """Hash of `code` that ignores formatting.
+
+    Python code is compared by its syntax tree, so comments and layout do not count; other
+    languages with trailing whitespace and blank lines removed.
+    """
+    normalized = None
+    if language == "python":
+        try:
+            normalized = ast.dump(ast.parse(code))
+        except (SyntaxError, ValueError):
+            pass
+    if normalized is None:
+        normalized = "\n".join(line.rstrip() for line in code.strip().splitlines() if line.strip())
+    return hashlib.sha256(f"{language}\0{normalized}".encode()).hexdigest()
+
+def duplicate_feedback(verdict):
+    """Feedback for Agent 1 when it sent code it had already sent, with the earlier `verdict`."""
+    return (
+        "Your code is a duplicate of code you already sent, which was rejected:\n"
+        f"{verdict}\nWrite a different solution."
+    )
+
+def execution_key(language, code, sample, entry_point=None):
+    """Key of a sample's result in the execution cache; `entry_point` is set for harness runs."""
+    # The expected output is part of the key because divergence kills depend on it
+    return code_key(language, code), str(sample["input"]), str(sample["expected_output"]), entry_point
+
+def recall_execution(key, i):
+    """Returns the cached result of a sample run as the result of sample `i`, or None."""
+    if not memoization["enabled"]:
+        return None
+    with execution_memo_lock:
+        result = execution_memo.get(key)
+    return None if result is None else {**result, "sample_index": i + 1}
+
+def remember_execution(key, result):
+    """Caches a sample's result, dropping the oldest entries beyond `max_executions`."""
+    if not memoization["enabled"]:
+        return
+    with execution_memo_lock:
+        execution_memo.pop(key, None)
+        execution_memo[key] = result
+        while len(execution_memo) > memoization["max_executions"]:
+            del execution_memo[next(iter(execution_memo))]
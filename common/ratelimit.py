@@ -0,0 +1,121 @@
+"""Per-model rate limiting and retries of quota errors."""
+import asyncio
+import json
+import random
+import threading
+import time
+
+from common.trace import tracer
+
+# Rate limiting: one token bucket per model, shared by every agent created for that model.
+# Overridden from the "rate_limits" and "retry" sections of config.json.
+rate_limits = {
+    "default": {"requests_per_minute": 10, "tokens_per_minute": 250000},
+}
+retry_policy = {"max_retries": 6, "base_delay": 2, "max_delay": 60}
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+class RateLimitExceeded(Exception):
+    """Raised when a call is still being rejected after the retry budget is spent."""
+
+class RateLimiter:
+    """Token bucket enforcing requests per minute and tokens per minute for one model."""
+
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.request_capacity = requests_per_minute
+        self.token_capacity = tokens_per_minute
+        self.requests = float(requests_per_minute)
+        self.tokens = float(tokens_per_minute)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self, tokens):
+        """Takes one request and `tokens` tokens from the buckets; returns the seconds to wait before sending."""
+        with self.lock:
+            now = time.monotonic()
+            elapsed = now - self.updated
+            self.updated = now
+            self.requests = min(self.request_capacity, self.requests + elapsed * self.request_capacity / 60)
+            self.tokens = min(self.token_capacity, self.tokens + elapsed * self.token_capacity / 60)
+
+            # Buckets may go negative; the debt is what the caller has to wait off
+            self.requests -= 1
+            self.tokens -= min(tokens, self.token_capacity)
+            return max(
+                0.0,
+                -self.requests * 60 / self.request_capacity,
+                -self.tokens * 60 / self.token_capacity,
+            )
+
+    def settle(self, estimated, actual):
+        """Corrects the token bucket once the real token usage of a call is known."""
+        with self.lock:
+            self.tokens += estimated - actual
+
+    def acquire(self, tokens):
+        wait = self.reserve(tokens)
+        if wait > 0:
+            print(f"--- Rate limiter: waiting {wait:.1f}s ---")
+            with tracer.span("rate_limit_wait"):
+                time.sleep(wait)
+
+    async def acquire_async(self, tokens):
+        wait = self.reserve(tokens)
+        if wait > 0:
+            print(f"--- Rate limiter: waiting {wait:.1f}s ---")
+            with tracer.span("rate_limit_wait"):
+                await asyncio.sleep(wait)
+
+def configure_rate_limits(limits=None, retry=None):
+    """Applies the rate limit and retry settings from config.json."""
+    if limits:
+        rate_limits.update(limits)
+    if retry:
+        retry_policy.update(retry)
+    with _rate_limiters_lock:
+        _rate_limiters.clear()
+
+def get_rate_limiter(model_name):
+    """Returns the limiter shared by all agents using `model_name`."""
+    with _rate_limiters_lock:
+        if model_name not in _rate_limiters:
+            limits = rate_limits.get(model_name, rate_limits["default"])
+            _rate_limiters[model_name] = RateLimiter(
+                limits["requests_per_minute"], limits["tokens_per_minute"]
+            )
+        return _rate_limiters[model_name]
+
+def retryable_errors():
+    """Errors that mean "slow down and try again" (HTTP 429 / RESOURCE_EXHAUSTED and 503).
+
+    google.api_core is only imported once an error has to be matched, so processes that never
+    call a model, such as the daemon client, don't load it.
+    """
+    from google.api_core import exceptions as google_exceptions
+    return google_exceptions.TooManyRequests, google_exceptions.ServiceUnavailable
+
+def retry_delay(error, attempt):
+    """Returns how long to wait before retrying: the server's hint if present, else exponential backoff with jitter."""
+    for detail in getattr(error, "details", None) or []:
+        delay = getattr(detail, "retry_delay", None)
+        if delay is not None:
+            return delay.seconds + delay.nanos / 1e9 + random.uniform(0, 1)
+    response = getattr(error, "response", None)
+    if response is not None:
+        try:
+            return float(response.headers["Retry-After"]) + random.uniform(0, 1)
+        except (AttributeError, KeyError, TypeError, ValueError):
+            pass
+    backoff = min(retry_policy["max_delay"], retry_policy["base_delay"] * 2 ** attempt)
+    return random.uniform(backoff / 2, backoff)
+
+def estimate_tokens(*payloads):
+    """Roughly estimates the size of a prompt in tokens (about four characters per token)."""
+    return sum(len(json.dumps(payload, default=str)) for payload in payloads) // 4 + 1
+
+def used_tokens(response, default):
+    """Returns the total token count reported for a response, or `default` if it has none."""
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "total_token_count", None) or default
@@ -0,0 +1,97 @@
+"""Refinement: after a failed iteration Agent 1 fixes its previous code, given why it failed."""
+import re
+
+# Refinement, set up from the "refinement" section of config.json by configure_refinement().
+# With `diffs` on Agent 1 answers with a unified diff against its previous code, which is
+# applied here instead of rewriting the whole program. Feedback is cut to `max_feedback_chars`.
+refinement = {"diffs": True, "max_feedback_chars": 2000}
+
+DIFF_HUNK = re.compile(r"^@@ -(\d+)(?:,\d+)? \+\d+(?:,\d+)? @@")
+
+def configure_refinement(settings=None):
+    """Applies the "refinement" section of config.json."""
+    if settings:
+        refinement.update(settings)
+
+def refinement_request(language, prompt, previous_code="", feedback=""):
+    """Agent 1's request: the task itself, or a fix of `previous_code` given `feedback`."""
+    if not previous_code:
+        return f"Write {language} code for the following task. Only return the code:\n{prompt}"
+    request = (
+        f"Your {language} code for the following task failed:\n{prompt}\n\n"
+        f"Failures:\n{feedback[:refinement['max_feedback_chars']]}\n\n"
+        f"Your code:\n```{language}\n{previous_code}\n```\n"
+    )
+    if refinement["diffs"]:
+        return request + "Fix it. Only return a unified diff against your code, in a ```diff block."
+    return request + "Fix it. Only return the complete corrected code."
+
+def extract_diff(text):
+    """Returns the unified diff in an Agent 1 reply, or None if the reply is not a diff."""
+    lines = text.strip().splitlines()
+    if not any(line.startswith("@@") for line in lines):
+        return None
+    if lines[0].startswith("```") and lines[-1] == "```":
+        lines = lines[1:-1]
+    return "\n".join(lines)
+
+def find_block(lines, block, hint):
+    """Returns where `block` occurs in `lines`, searching outward from line `hint`, or None."""
+    block = [line.rstrip() for line in block]
+    hint = min(max(hint, 0), len(lines))
+    if not block:
+        return hint
+    for distance in range(len(lines) + 1):
+        for position in (hint - distance, hint + distance) if distance else (hint,):
+            if 0 <= position <= len(lines) - len(block) and [
+                line.rstrip() for line in lines[position:position + len(block)]
+            ] == block:
+                return position
+    return None
+
+def apply_diff(code, diff):
+    """Applies a unified diff to `code` and returns the patched code.
+
+    Hunks are placed by their context and removed lines, searching outward from the line
+    number they state, so diffs with stale line numbers still apply. Raises ValueError when
+    the diff has no hunks or a hunk does not match the code.
+    """
+    hunks = []
+    diff_lines = diff.splitlines()
+    # File headers only come before the first hunk of a file, so inside a hunk "---x" is a
+    # removed "--x" and "+++x" an added "++x", unless they start the next file's header
+    header = True
+    for i, line in enumerate(diff_lines):
+        following = diff_lines[i + 1:i + 3]
+        if line.startswith("diff ") or (
+            line.startswith("---") and len(following) == 2
+            and following[0].startswith("+++") and following[1].startswith("@@")
+        ):
+            header = True
+        if line.startswith("\\") or header and line.startswith(("---", "+++", "diff ", "index ")):
+            continue
+        match = DIFF_HUNK.match(line)
+        if line.startswith("@@"):
+            header = False
+            hunks.append((int(match.group(1)) if match else 1, [], []))
+        elif not hunks:
+            raise ValueError(f"unexpected line before the first hunk: {line!r}")
+        elif line.startswith("-"):
+            hunks[-1][1].append(line[1:])
+        elif line.startswith("+"):
+            hunks[-1][2].append(line[1:])
+        else:
+            # Context line; replies often drop the space in front of empty lines
+            hunks[-1][1].append(line[1:])
+            hunks[-1][2].append(line[1:])
+    if not hunks:
+        raise ValueError("the diff has no hunks")
+    lines = code.splitlines()
+    offset = 0
+    for start, old, new in hunks:
+        position = find_block(lines, old, start - 1 + offset)
+        if position is None:
+            raise ValueError(f"the hunk at line {start} does not match the code")
+        lines[position:position + len(old)] = new
+        offset += len(new) - len(old)
+    return "\n".join(lines)
@@ -0,0 +1,117 @@
+"""Comparing sample outputs with the expected output and deciding clear-cut results."""
+import ast
+import json
+import math
+
+# Output comparison, set up from the "compare" section of config.json by configure_compare().
+# A sample passes when its output equals the expected output exactly or under any of the
+# enabled normalizers; skip_agent_3 lets clear-cut results be decided without Agent 3.
+comparison = {"normalizers": ["whitespace", "literal", "float"], "float_tolerance": 1e-6, "skip_agent_3": True}
+
+def parse_output(text):
+    """Parses printed output as a Python literal or, failing that, as JSON."""
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+        return json.loads(text)
+
+def canonical(value, unordered=False):
+    """Turns tuples into lists, and with `unordered` sorts lists and sets, so equal structures compare equal."""
+    if isinstance(value, dict):
+        return {key: canonical(item, unordered) for key, item in value.items()}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [canonical(item, unordered) for item in value]
+        if unordered or isinstance(value, (set, frozenset)):
+            items.sort(key=repr)
+        return items
+    return value
+
+def values_close(actual, expected, tolerance):
+    """Compares two canonical values, allowing numbers to differ by `tolerance`."""
+    if isinstance(actual, bool) or isinstance(expected, bool):
+        return type(actual) is type(expected) and actual == expected
+    if isinstance(actual, (int, float)) and isinstance(expected, (int, float)):
+        return math.isclose(actual, expected, rel_tol=tolerance, abs_tol=tolerance)
+    if isinstance(actual, list) and isinstance(expected, list):
+        return len(actual) == len(expected) and all(
+            values_close(a, e, tolerance) for a, e in zip(actual, expected)
+        )
+    if isinstance(actual, dict) and isinstance(expected, dict):
+        return actual.keys() == expected.keys() and all(
+            values_close(actual[key], expected[key], tolerance) for key in actual
+        )
+    return actual == expected
+
+def compare_whitespace(actual, expected):
+    return actual.split() == expected.split()
+
+def compare_literal(actual, expected):
+    return values_close(canonical(parse_output(actual)), canonical(parse_output(expected)), 0.0)
+
+def compare_float(actual, expected):
+    return values_close(
+        canonical(parse_output(actual)), canonical(parse_output(expected)), comparison["float_tolerance"]
+    )
+
+def compare_unordered(actual, expected):
+    return values_close(
+        canonical(parse_output(actual), unordered=True), canonical(parse_output(expected), unordered=True), 0.0
+    )
+
+# Normalizers by name; each takes (actual, expected) output text and returns whether they match.
+# Add an entry here and list its name in comparison["normalizers"] to plug in another one.
+COMPARATORS = {
+    "whitespace": compare_whitespace,
+    "literal": compare_literal,
+    "float": compare_float,
+    "unordered": compare_unordered,
+}
+
+def configure_compare(settings=None):
+    """Applies the "compare" section of config.json."""
+    if settings:
+        unknown = set(settings.get("normalizers", [])) - set(COMPARATORS)
+        if unknown:
+            raise ValueError(f"Unknown output normalizers: {', '.join(sorted(unknown))}")
+        comparison.update(settings)
+
+def outputs_match(actual, expected):
+    """Returns whether a sample's output matches the expected output under the enabled normalizers."""
+    actual, expected = actual.strip(), str(expected).strip()
+    if actual == expected:
+        return True
+    for name in comparison["normalizers"]:
+        try:
+            if COMPARATORS[name](actual, expected):
+                return True
+        except (ValueError, SyntaxError, TypeError, RecursionError):
+            # Output that a normalizer cannot parse simply doesn't match under it
+            continue
+    return False
+
+def skipped_note(skipped):
+    """Says how many samples were not run because too many had already failed."""
+    return f" {skipped} samples were skipped after the failure limit was reached." if skipped else ""
+
+def deterministic_verdict(sample_results, total=None):
+    """Decides sample results without Agent 3 when the outcome is clear.
+
+    `total` is the number of samples of the task, when execution stopped before running all
+    of them. Returns ("yes" or "no", explanation), or None when Agent 3 has to judge:
+    skip_agent_3 is off, there are no samples, or a failed sample printed nothing and
+    reported no error.
+    """
+    if not comparison["skip_agent_3"] or not sample_results:
+        return None
+    total = max(total or 0, len(sample_results))
+    failed = [result for result in sample_results if not result["passed"]]
+    if any(not result["actual_output"] and not result["error"] for result in failed):
+        return None
+    if not failed:
+        return "yes", f"All {len(sample_results)} samples produced the expected output."
+    details = "; ".join(
+        f"sample {result['sample_index']}: expected {result['expected_output']!r}, got {result['actual_output']!r}"
+        + (f" (error: {result['error'][-300:]})" if result["error"] else "")
+        for result in failed[:5]
+    )
+    return "no", f"{len(failed)} of {total} samples failed.{skipped_note(total - len(sample_results))} {details}"
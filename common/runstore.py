@@ -0,0 +1,116 @@
+"""Append-only SQLite store of runs, their conversation events and their results."""
+import json
+import sqlite3
+import statistics
+import threading
+import time
+
+from common.state import state_path
+
+# Run store, opened from the "run_store" section of config.json by configure_run_store().
+# Every run and every event of its conversation is appended to an SQLite database as it
+# happens, so past runs can be analyzed; a run keeps only the conversation of its last
+# `memory_iterations` iterations in memory. A relative path is kept in the state directory;
+# an empty one turns the store off.
+run_store = None
+run_store_settings = {"path": "runs.sqlite", "memory_iterations": 3}
+
+class RunStore:
+    """Runs, their events and their results, in tables that rows are only ever inserted into.
+
+    The database is in WAL mode, so batch and daemon workers can write to it at the same
+    time while it is being queried.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            "id INTEGER PRIMARY KEY, started REAL, workflow TEXT, prompt TEXT, language TEXT, models TEXT);"
+            "CREATE TABLE IF NOT EXISTS events ("
+            "id INTEGER PRIMARY KEY, run INTEGER, iteration INTEGER, candidate INTEGER, agent TEXT, created REAL, "
+            "text TEXT);"
+            "CREATE TABLE IF NOT EXISTS results ("
+            "run INTEGER PRIMARY KEY, finished REAL, status TEXT, iterations INTEGER, model TEXT);"
+            "CREATE INDEX IF NOT EXISTS events_run ON events (run, iteration);"
+            "CREATE INDEX IF NOT EXISTS events_agent ON events (agent);"
+            "CREATE INDEX IF NOT EXISTS results_model ON results (model, status);"
+        )
+        self.connection.commit()
+
+    def insert(self, sql, values):
+        with self.lock:
+            cursor = self.connection.execute(sql, values)
+            self.connection.commit()
+            return cursor.lastrowid
+
+    def start_run(self, workflow, prompt, language, models):
+        """Records a new run and returns its id."""
+        return self.insert(
+            "INSERT INTO runs (started, workflow, prompt, language, models) VALUES (?, ?, ?, ?, ?)",
+            (time.time(), workflow, prompt, language, json.dumps(models)),
+        )
+
+    def append(self, run, iteration, candidate, agent, text):
+        self.insert(
+            "INSERT INTO events (run, iteration, candidate, agent, created, text) VALUES (?, ?, ?, ?, ?, ?)",
+            (run, iteration, candidate, agent, time.time(), text),
+        )
+
+    def finish_run(self, run, status, iterations, model):
+        """Records how a run ended; `model` is the model Agent 1 finished on."""
+        self.insert(
+            "INSERT OR IGNORE INTO results (run, finished, status, iterations, model) VALUES (?, ?, ?, ?, ?)",
+            (run, time.time(), status, iterations, model),
+        )
+
+    def median_iterations(self):
+        """Returns {model: (successful runs, median iterations to success)} over every stored run."""
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT model, iterations FROM results WHERE status = 'yes' ORDER BY model, iterations"
+            ).fetchall()
+        iterations = {}
+        for model, count in rows:
+            iterations.setdefault(model, []).append(count)
+        return {model: (len(counts), statistics.median(counts)) for model, counts in iterations.items()}
+
+def configure_run_store(settings=None):
+    """Opens the run store described by the "run_store" section of config.json."""
+    global run_store
+    if settings:
+        run_store_settings.update(settings)
+    path = run_store_settings["path"]
+    run_store = RunStore(state_path(path)) if path else None
+
+class RunLog:
+    """One run's record in the run store; the run is started with its first event."""
+
+    def __init__(self, workflow, prompt, language, models):
+        self.task = workflow, prompt, language, models
+        self.run = None  # id in the run store
+
+    def run_id(self):
+        if self.run is None:
+            self.run = run_store.start_run(*self.task)
+        return self.run
+
+    def append(self, iteration, candidate, agent, text):
+        if run_store is not None:
+            run_store.append(self.run_id(), iteration, candidate, agent, text)
+
+    def finish(self, status, iterations, model):
+        if run_store is not None:
+            run_store.finish_run(self.run_id(), status, iterations, model)
+
+def print_run_stats():
+    """Prints the median iterations to success per model, as --run-stats does."""
+    if run_store is None:
+        print("The run store is turned off.")
+        return
+    for model, (runs, median) in sorted(run_store.median_iterations().items()):
+        print(f"{model}: {runs} successful runs, median {median} iterations")
@@ -0,0 +1,115 @@
+"""Runs a program's samples and collects their results for Agent 3."""
+import asyncio
+import hashlib
+import json
+import os
+import threading
+
+from common.results import outputs_match
+from common.state import locked, state_path
+
+# Sample execution, set up from the "sample_execution" section of config.json by
+# configure_sample_execution(). Samples that failed before run first. With `max_failures` set,
+# execution stops as soon as that many samples have failed, and the samples not run are left
+# out of the results. Harness runs are split into shards of `shard_size` samples (0: one shard
+# per worker), each in its own process, at most `workers` at a time (0: one per CPU). Failure
+# counts per sample are kept in the `history` file, in the state directory, across runs.
+sample_execution = {"workers": 0, "shard_size": 0, "max_failures": 0, "history": ".sample_history.json"}
+
+def configure_sample_execution(settings=None):
+    """Applies the "sample_execution" section of config.json."""
+    if settings:
+        sample_execution.update(settings)
+
+def sample_result(i, sample, output="", error="", passed=None):
+    """The result of sample `i` as Agent 3 sees it; `passed` defaults to comparing the output
+    with outputs_match()."""
+    return {
+        "sample_index": i + 1,
+        "input": sample["input"],
+        "expected_output": sample["expected_output"],
+        "actual_output": output.strip(),
+        "error": error.strip(),
+        "passed": outputs_match(output, sample["expected_output"]) if passed is None else passed,
+    }
+
+def test_summary(samples, sample_results):
+    """The test results that Agent 3 judges."""
+    return {
+        "sample_results": sample_results,
+        "total_samples": len(samples),
+        "passed_tests": sum(1 for result in sample_results if result["passed"]),
+        "failed_tests": sum(1 for result in sample_results if not result["passed"]),
+        "skipped_tests": len(samples) - len(sample_results),
+    }
+
+def sample_key(sample):
+    return hashlib.sha256(json.dumps([sample["input"], sample["expected_output"]]).encode()).hexdigest()[:24]
+
+def history_path():
+    return state_path(sample_execution["history"]) if sample_execution["history"] else None
+
+def load_sample_history(path):
+    if path and os.path.exists(path):
+        with open(path) as file:
+            return json.load(file)
+    return {}
+
+def failure_order(samples):
+    """Indices of `samples`, the ones that failed most often before first."""
+    history = load_sample_history(history_path())
+    failures = [history.get(sample_key(sample), {}).get("failures", 0) for sample in samples]
+    return sorted(range(len(samples)), key=lambda i: -failures[i])
+
+def record_sample_history(sample_results):
+    """Adds the outcome of every sample run to the history file, under a lock shared with other runs."""
+    path = history_path()
+    if not path or not sample_results:
+        return
+    with locked(path):
+        history = load_sample_history(path)
+        for result in sample_results:
+            record = history.setdefault(sample_key(result), {"runs": 0, "failures": 0})
+            record["runs"] += 1
+            record["failures"] += int(not result["passed"])
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary, "w") as file:
+            json.dump(history, file)
+        os.replace(temporary, path)
+
+async def run_until_failures(jobs):
+    """Runs coroutines that each return a list of sample results, all at once.
+
+    Once `max_failures` samples have failed, the jobs still waiting or running are cancelled.
+    Returns the results gathered so far, in sample order.
+    """
+    tasks = [asyncio.ensure_future(job) for job in jobs]
+    sample_results = []
+    try:
+        for finished in asyncio.as_completed(tasks):
+            sample_results.extend(await finished)
+            failed = sum(1 for result in sample_results if not result["passed"])
+            if sample_execution["max_failures"] and failed >= sample_execution["max_failures"]:
+                if any(not task.done() for task in tasks):
+                    print(f"--- {failed} samples failed; the samples still to run are skipped ---")
+                break
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        record_sample_history(sample_results)
+    return sorted(sample_results, key=lambda result: result["sample_index"])
+
+async def run_samples_async(samples, process, concurrency):
+    """Runs the coroutine function process(i, sample) for every sample, at most `concurrency`
+    at a time, and returns what each call returned in sample order.
+
+    Samples that failed before start first; see run_until_failures() for stopping early.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(i):
+        async with semaphore:
+            return [await process(i, samples[i])]
+
+    return await run_until_failures(run(i) for i in failure_order(samples))
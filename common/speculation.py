@@ -0,0 +1,36 @@
+"""Speculative generation: several candidates are checked at once and the first to pass wins."""
+import asyncio
+
+from common.refinement import refinement_request
+
+async def first_passing(coroutines):
+    """Runs the coroutines concurrently and returns the first result whose first item is true.
+
+    Every coroutine returns a tuple such as (passed, code, explanation). As soon as one has
+    passed, the others are cancelled and awaited, so nothing keeps running in the background.
+    Returns (winning result or None, results of every coroutine that finished, in the order
+    they finished).
+    """
+    tasks = [asyncio.ensure_future(coroutine) for coroutine in coroutines]
+    finished = []
+    try:
+        for next_finished in asyncio.as_completed(tasks):
+            result = await next_finished
+            finished.append(result)
+            if result[0]:
+                return result, finished
+        return None, finished
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+def candidate_request(language, prompt, c, candidates, previous_code="", feedback=""):
+    """Agent 1's request for candidate `c` of `candidates`.
+
+    A candidate that already failed an iteration is asked to fix its previous code, given
+    the feedback it failed with; otherwise it is asked for a solution of its own.
+    """
+    if previous_code:
+        return refinement_request(language, prompt, previous_code, feedback)
+    return refinement_request(language, prompt) + f"\n(Candidate {c + 1} of {candidates}: write your own solution.)"
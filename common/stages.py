@@ -0,0 +1,91 @@
+"""The stage-graph scheduler that every pipeline's iterations run on."""
+import asyncio
+
+# Stage scheduling, set up from the "pipeline" section of config.json by configure_pipeline().
+# With speculative on, a guarded stage starts before its guard's verdict is known and is
+# cancelled if the verdict is negative; with it off, it waits for the verdict.
+pipeline = {"speculative": True}
+
+def configure_pipeline(settings=None):
+    """Applies the "pipeline" section of config.json."""
+    if settings:
+        pipeline.update(settings)
+
+class Stage:
+    """One step of a stage graph.
+
+    `run` is a coroutine function called with the results of the stages finished so far, by
+    name. The stage starts once every stage in `after` has been accepted. `accept(result)`
+    decides whether its result lets the rest of the graph go on. A stage with a `guard` also
+    needs the guard stage accepted before its own result counts, but with speculative
+    pipelining it starts without waiting for it. If the guard rejects after the stage has
+    finished, its result is passed to `discard` so the stage can undo what it did.
+    """
+
+    def __init__(self, name, run, after=(), guard=None, accept=None, discard=None):
+        self.name = name
+        self.run = run
+        self.after = tuple(after)
+        self.guard = guard
+        self.accept = accept or (lambda result: True)
+        self.discard = discard
+
+    def dependencies(self):
+        """Stages that have to be accepted before this one may start."""
+        if self.guard and not pipeline["speculative"]:
+            return self.after + (self.guard,)
+        return self.after
+
+class StageFailed(Exception):
+    """A stage raised `error`; the rest of its graph was cancelled."""
+
+    def __init__(self, stage, error):
+        super().__init__(f"Stage {stage} failed: {error}")
+        self.stage = stage
+        self.error = error
+
+async def run_stages(stages):
+    """Runs a stage graph, starting every stage as soon as its dependencies allow.
+
+    Returns (results by stage name, name of the stage whose result was rejected or None).
+    A rejection cancels every stage still running, without waiting for them to get anywhere,
+    and starts no more. Raises StageFailed if a stage raises.
+    """
+    results = {}
+    accepted = set()
+    finished = []  # stages whose result waits for their guard
+    waiting = list(stages)
+    running = {}
+    try:
+        while True:
+            for stage in [stage for stage in waiting if accepted.issuperset(stage.dependencies())]:
+                waiting.remove(stage)
+                running[asyncio.ensure_future(stage.run(results))] = stage
+            if not running:
+                return results, None
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                stage = running.pop(task)
+                try:
+                    results[stage.name] = task.result()
+                except Exception as e:
+                    raise StageFailed(stage.name, e) from e
+                finished.append(stage)
+            settled = True
+            while settled:
+                settled = False
+                for stage in [stage for stage in finished if not stage.guard or stage.guard in accepted]:
+                    finished.remove(stage)
+                    if not stage.accept(results[stage.name]):
+                        return results, stage.name
+                    accepted.add(stage.name)
+                    settled = True
+    finally:
+        # Cancelled stages clean up after themselves (agents roll back their chat, programs are
+        # killed); finished ones that were never accepted are handed to their discard hook
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+        for stage in finished:
+            if stage.discard is not None:
+                stage.discard(results[stage.name])
@@ -0,0 +1,39 @@
+"""The directory that the files a run leaves behind are kept in."""
+import contextlib
+import fcntl
+import os
+
+# The response cache and the other files that outlive a run are kept under one directory,
+# set by the "state_dir" entry of config.json. Relative paths in the sections that name such
+# files are resolved inside it.
+state = {"dir": ".codegen"}
+
+def configure_state(directory=None):
+    """Sets the state directory.
+
+    It is made absolute here, so batch and daemon workers that change into directories of
+    their own keep sharing it.
+    """
+    state["dir"] = os.path.abspath(directory or state["dir"])
+
+def state_path(name):
+    """Returns the path of a state file, creating the directory it goes in.
+
+    A relative `name` is resolved inside the state directory; an absolute one is kept.
+    """
+    path = os.path.join(os.path.abspath(state["dir"]), name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+@contextlib.contextmanager
+def locked(path):
+    """Holds an exclusive lock on `<path>.lock`, shared with other processes; does nothing without a path."""
+    if not path:
+        yield
+        return
+    with open(f"{path}.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
@@ -0,0 +1,129 @@
+"""Local checks that reject broken code before Agent 2 is asked to validate it."""
+import ast
+import builtins
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+
+from common.execution import COMPILERS
+from common.trace import traced, tracer
+
+# Local static checks run on Agent 1's code before Agent 2 sees it, set up from the
+# "static_checks" section of config.json by configure_static_checks()
+static_checks = {"enabled": True, "timeout": 30}
+
+# Checks run and model calls saved by rejecting code locally, printed at the end of a run
+static_check_stats = {"checked": 0, "rejected": 0, "calls_saved": 0}
+static_check_lock = threading.Lock()
+
+def configure_static_checks(settings=None):
+    """Applies the "static_checks" section of config.json."""
+    if settings:
+        static_checks.update(settings)
+
+# Names every module has without binding them, plus the __class__ cell of methods
+MODULE_NAMES = {
+    "__name__", "__doc__", "__file__", "__cached__", "__loader__", "__spec__", "__package__", "__path__",
+    "__builtins__", "__annotations__", "__class__",
+}
+
+def undefined_names(tree):
+    """Returns (line, name) for every name that is read but bound nowhere in the module.
+
+    Scopes are ignored, so only names that cannot resolve anywhere are reported, such as typos
+    and missing imports; modules using `from x import *` are not checked.
+    """
+    bound = set(dir(builtins)) | MODULE_NAMES
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load):
+            bound.add(node.id)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            bound.add(node.name)
+        elif isinstance(node, ast.arg):
+            bound.add(node.arg)
+        elif isinstance(node, ast.alias):
+            if node.name == "*":
+                return []
+            bound.add((node.asname or node.name).split(".")[0])
+        elif isinstance(node, (ast.Global, ast.Nonlocal)):
+            bound.update(node.names)
+        elif getattr(node, "name", None) and isinstance(node, (ast.ExceptHandler, ast.MatchAs, ast.MatchStar)):
+            bound.add(node.name)
+        elif isinstance(node, ast.MatchMapping) and node.rest:
+            bound.add(node.rest)
+    return sorted({
+        (node.lineno, node.id)
+        for node in ast.walk(tree)
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load) and node.id not in bound
+    })
+
+def check_python(code):
+    try:
+        tree = ast.parse(code, "task.py")
+        compile(tree, "task.py", "exec")
+    except SyntaxError as e:
+        return [f"task.py:{e.lineno}: {e.msg}"]
+    return [f"task.py:{line}: undefined name '{name}'" for line, name in undefined_names(tree)]
+
+def run_checker(command, code, extension):
+    """Runs a command-line checker on `code` saved as task.<extension> and returns its diagnostics.
+
+    Checkers that are not installed, or that time out, report nothing.
+    """
+    if shutil.which(command[0]) is None:
+        return []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, f"task.{extension}")
+        with open(path, "w") as code_file:
+            code_file.write(code)
+        try:
+            result = subprocess.run(
+                [*command, path], text=True, capture_output=True, timeout=static_checks["timeout"]
+            )
+        except subprocess.TimeoutExpired:
+            return []
+    if result.returncode == 0:
+        return []
+    output = (result.stderr or result.stdout).replace(path, f"task.{extension}")
+    return output.strip().splitlines()
+
+def check_c(code):
+    diagnostics = run_checker([COMPILERS["c"], "-fsyntax-only"], code, "c")
+    if not diagnostics and not re.search(r"\bmain\s*\(", code):
+        diagnostics.append("task.c: no main() function")
+    return diagnostics
+
+def check_js(code):
+    return run_checker(["node", "--check"], code, "js")
+
+# Static checker per language; languages without one are passed on unchecked
+STATIC_CHECKERS = {"python": check_python, "c": check_c, "js": check_js}
+
+@traced("static_check")
+def static_check(language, code):
+    """Checks code locally and returns its diagnostics, or an empty list if it passed.
+
+    A rejection saves the Agent 2 call the code would otherwise have cost.
+    """
+    checker = STATIC_CHECKERS.get(language)
+    if not static_checks["enabled"] or checker is None:
+        return []
+    diagnostics = checker(code)
+    tracer.annotate(language=language, passed=not diagnostics)
+    with static_check_lock:
+        static_check_stats["checked"] += 1
+        if diagnostics:
+            static_check_stats["rejected"] += 1
+            static_check_stats["calls_saved"] += 1
+    return diagnostics
+
+def print_static_check_stats():
+    """Prints how many candidates the static checks rejected, if any were checked."""
+    if static_check_stats["checked"]:
+        print(
+            f"Static checks: {static_check_stats['rejected']} of {static_check_stats['checked']} candidates rejected, "
+            f"{static_check_stats['calls_saved']} Agent 2 calls saved"
+        )
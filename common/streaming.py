@@ -0,0 +1,63 @@
+"""Reading streamed code replies only up to the end of their first code block."""
+import re
+
+# Streaming, set up from the "streaming" section of config.json by configure_streaming().
+# When enabled, code-writing calls stop reading the reply at the end of its first code block.
+streaming = {"enabled": False}
+
+# A complete fenced code block: an opening fence, then a closing fence at the start of a line
+CODE_BLOCK = re.compile(r"```[^\n]*\n.*?^```", re.DOTALL | re.MULTILINE)
+
+def configure_streaming(settings=None):
+    """Applies the "streaming" section of config.json."""
+    if settings:
+        streaming.update(settings)
+
+class StreamedResponse:
+    """The part of a streamed reply that was read before the stream was stopped."""
+
+    def __init__(self, text):
+        self.text = text
+        self.usage_metadata = None
+
+def chunk_text(chunk):
+    """Returns the text of a streamed chunk; chunks carrying only metadata have none."""
+    try:
+        return chunk.text
+    except ValueError:
+        return ""
+
+def read_code_stream(response):
+    """Reads a streamed reply up to the end of its first complete code block.
+
+    Returns the text read and whether the stream was stopped early. Stopping closes the
+    chunk iterator, so no further chunks are requested; the underlying call is cancelled
+    once the caller drops its last reference to `response`.
+    """
+    text = ""
+    chunks = iter(response)
+    try:
+        for chunk in chunks:
+            text += chunk_text(chunk)
+            if CODE_BLOCK.search(text):
+                return text, True
+        return text, False
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+
+async def read_code_stream_async(response):
+    """Async version of read_code_stream()."""
+    text = ""
+    chunks = aiter(response)
+    try:
+        async for chunk in chunks:
+            text += chunk_text(chunk)
+            if CODE_BLOCK.search(text):
+                return text, True
+        return text, False
+    finally:
+        close = getattr(chunks, "aclose", None)
+        if close is not None:
+            await close()
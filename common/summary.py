@@ -0,0 +1,96 @@
+"""Compact, size-capped summaries of sample results for agent prompts."""
+import difflib
+import json
+import threading
+
+from common.results import skipped_note
+from common.samples import test_summary
+
+# Sample summaries, set up from the "summary" section of config.json by configure_summary().
+# Failed samples with the same output and error are grouped, outputs are reduced to their
+# difference from the expected output, stderr to its deduplicated last `error_lines` lines,
+# and the whole summary is cut to `max_tokens` (at about four characters per token).
+summaries = {"max_tokens": 2000, "output_chars": 300, "error_lines": 8, "diff_lines": 12}
+
+# Bytes of the indented JSON the summaries replace, and of the summaries sent instead
+summary_stats = {"summaries": 0, "json_bytes": 0, "summary_bytes": 0}
+summary_stats_lock = threading.Lock()
+
+def configure_summary(settings=None):
+    """Applies the "summary" section of config.json."""
+    if settings:
+        summaries.update(settings)
+
+def clip(text, limit):
+    """Shortens `text` to `limit` characters, keeping its start and end."""
+    if len(text) <= limit:
+        return text
+    half = limit // 2
+    return f"{text[:half]}...[{len(text) - 2 * half} chars]...{text[-half:]}"
+
+def error_excerpt(error):
+    """The last `error_lines` distinct lines of stderr; a line that repeats (deep recursion) is shown once with its count."""
+    counts = {}
+    for line in error.strip().splitlines():
+        counts[line] = counts.get(line, 0) + 1
+    lines = [line if count == 1 else f"{line}  [x{count}]" for line, count in counts.items()]
+    keep = lines[-summaries["error_lines"]:]
+    omitted = f"[{len(lines) - len(keep)} lines omitted]\n" if len(lines) > len(keep) else ""
+    return omitted + "\n".join(clip(line, summaries["output_chars"]) for line in keep)
+
+def output_difference(actual, expected):
+    """Describes how `actual` differs from `expected`: both values when short, else a line diff."""
+    actual, expected = actual.strip(), str(expected).strip()
+    if "\n" not in actual and "\n" not in expected:
+        limit = summaries["output_chars"]
+        return f"expected {clip(expected, limit)!r}, got {clip(actual, limit)!r}"
+    diff = list(difflib.unified_diff(expected.splitlines(), actual.splitlines(), "expected", "actual", n=1, lineterm=""))
+    keep = diff[2:2 + summaries["diff_lines"]]
+    omitted = f"\n[{len(diff) - 2 - len(keep)} diff lines omitted]" if len(diff) - 2 > len(keep) else ""
+    return "output differs (- expected, + actual):\n" + "\n".join(
+        clip(line, summaries["output_chars"]) for line in keep
+    ) + omitted
+
+def summarize_samples(samples, sample_results):
+    """Encodes the results of running `samples` compactly for an agent prompt, within `max_tokens`."""
+    passed = [result["sample_index"] for result in sample_results if result["passed"]]
+    groups = {}
+    for result in sample_results:
+        if not result["passed"]:
+            failure = output_difference(result["actual_output"], result["expected_output"])
+            if result["error"]:
+                failure += "\nstderr:\n" + error_excerpt(result["error"])
+            groups.setdefault(failure, []).append(result)
+    header = f"{len(passed)} of {len(samples)} samples passed."
+    if passed:
+        header += f" Passed: {', '.join(map(str, passed))}."
+    header += skipped_note(len(samples) - len(sample_results))
+    budget = summaries["max_tokens"] * 4
+    sections = [header]
+    for failure, results in groups.items():
+        inputs = "; ".join(
+            f"sample {result['sample_index']} input {clip(str(result['input']), summaries['output_chars'])}"
+            for result in results[:3]
+        )
+        more = f" and {len(results) - 3} more samples" if len(results) > 3 else ""
+        section = f"Failed: {inputs}{more}\n{failure}"
+        if sum(map(len, sections)) + len(section) > budget:
+            sections.append(f"[{len(groups) - len(sections) + 1} more failure groups omitted]")
+            break
+        sections.append(section)
+    summary = clip("\n\n".join(sections), budget)
+    original = json.dumps(test_summary(samples, sample_results), indent=2)
+    with summary_stats_lock:
+        summary_stats["summaries"] += 1
+        summary_stats["json_bytes"] += len(original.encode())
+        summary_stats["summary_bytes"] += len(summary.encode())
+    return summary
+
+def print_summary_stats():
+    """Prints how many bytes the sample summaries saved, if any were sent."""
+    if summary_stats["summaries"]:
+        print(
+            f"Sample summaries: {summary_stats['summaries']} sent, "
+            f"{summary_stats['json_bytes'] - summary_stats['summary_bytes']} bytes saved "
+            f"({summary_stats['summary_bytes']} instead of {summary_stats['json_bytes']})"
+        )
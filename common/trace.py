@@ -0,0 +1,125 @@
+"""Span telemetry for the stages of a run, written as JSONL traces."""
+import contextlib
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from common.state import state_path
+
+class Tracer:
+    """Records timed spans for the stages of a run.
+
+    Each finished span is appended to a JSONL trace file (when one is configured) and added
+    to per-stage and per-agent totals for the end-of-run summary. Attributes set with
+    context() - such as the current iteration - are added to every span started after them.
+    """
+
+    def __init__(self):
+        self.file = None
+        self.lock = threading.Lock()
+        self.context_fields = contextvars.ContextVar("trace_context", default={})
+        self.current = contextvars.ContextVar("trace_span", default=None)
+        self.stages = {}
+        self.agents = {}
+
+    def open(self, directory):
+        """Starts writing spans to a new trace file in `directory` and returns its path.
+
+        A relative `directory` is kept in the state directory.
+        """
+        path = state_path(os.path.join(directory, f"run-{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}.jsonl"))
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+            self.file = open(path, "a")
+        return path
+
+    def context(self, **fields):
+        """Adds fields to every span started from now on in the current thread or task."""
+        self.context_fields.set({**self.context_fields.get(), **fields})
+
+    @contextlib.contextmanager
+    def span(self, stage, **attributes):
+        record = {"stage": stage, **self.context_fields.get(), **attributes, "start": time.time()}
+        token = self.current.set(record)
+        started = time.perf_counter()
+        try:
+            yield record
+        except BaseException as e:
+            record["error"] = repr(e)
+            raise
+        finally:
+            record["duration"] = round(time.perf_counter() - started, 6)
+            self.current.reset(token)
+            self.finish(record)
+
+    def annotate(self, **attributes):
+        """Adds attributes to the innermost open span."""
+        record = self.current.get()
+        if record is not None:
+            record.update(attributes)
+
+    def finish(self, record):
+        with self.lock:
+            stage = self.stages.setdefault(record["stage"], {"count": 0, "seconds": 0.0})
+            stage["count"] += 1
+            stage["seconds"] += record["duration"]
+            if record["stage"] == "llm_call":
+                agent = self.agents.setdefault(
+                    (record["agent"], record["model"]),
+                    {"calls": 0, "seconds": 0.0, "retries": 0, "prompt_tokens": 0, "response_tokens": 0},
+                )
+                agent["calls"] += 1
+                agent["seconds"] += record["duration"]
+                agent["retries"] += record.get("retries", 0)
+                agent["prompt_tokens"] += record.get("prompt_tokens") or 0
+                agent["response_tokens"] += record.get("response_tokens") or 0
+            if self.file is not None:
+                self.file.write(json.dumps(record, default=str) + "\n")
+                self.file.flush()
+
+    def print_summary(self):
+        if not self.stages:
+            return
+        print("\n=== Time per stage ===")
+        print(f"{'stage':<18}{'count':>8}{'total s':>12}{'mean s':>10}")
+        for name, stage in sorted(self.stages.items(), key=lambda item: -item[1]["seconds"]):
+            print(f"{name:<18}{stage['count']:>8}{stage['seconds']:>12.2f}{stage['seconds'] / stage['count']:>10.2f}")
+        if self.agents:
+            print("\n=== Time per agent ===")
+            print(f"{'agent':<10}{'model':<38}{'calls':>6}{'total s':>10}{'retries':>8}{'prompt tok':>12}{'output tok':>12}")
+            for (name, model), agent in sorted(self.agents.items()):
+                print(
+                    f"{name:<10}{model:<38}{agent['calls']:>6}{agent['seconds']:>10.2f}{agent['retries']:>8}"
+                    f"{agent['prompt_tokens']:>12}{agent['response_tokens']:>12}"
+                )
+
+tracer = Tracer()
+
+def traced(stage):
+    """Decorator recording every call of a function (sync or async) as a span."""
+    def decorator(function):
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                with tracer.span(stage):
+                    return await function(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with tracer.span(stage):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def configure_trace(settings=None):
+    """Applies the "trace" section of config.json: spans go to a JSONL file in settings["dir"]."""
+    if settings and settings.get("dir"):
+        path = tracer.open(settings["dir"])
+        print(f"--- Writing trace to {path} ---")
@@ -0,0 +1,365 @@
+"""The generate/validate/refine loop that the stable, alpha and beta pipelines share."""
+import asyncio
+import os
+
+from common.agents import create_agent, generation_config_normal, generation_config_structured
+from common.cascade import ModelRouter, hedged
+from common.checkpoint import Checkpoint
+from common.harness import find_entry_point, run_harness_shards
+from common.memo import code_key, duplicate_feedback, memoization
+from common.refinement import apply_diff, extract_diff, refinement_request
+from common.runstore import RunLog
+from common.samples import run_samples_async
+from common.speculation import candidate_request, first_passing
+from common.stages import Stage, StageFailed, run_stages
+from common.summary import summarize_samples
+from common.trace import tracer
+
+# Models of Agents 1-5 when a task does not name one per agent. Agents that used to run on the
+# thinking model start on the fast one and only move up once they have failed (see cascade).
+FAST_MODEL = "gemini-2.0-flash-exp"
+THINKING_MODEL = "gemini-2.0-flash-thinking-exp-01-21"
+DEFAULT_MODELS = [
+    [FAST_MODEL, THINKING_MODEL],
+    [FAST_MODEL, THINKING_MODEL],
+    FAST_MODEL,
+    [FAST_MODEL, THINKING_MODEL],
+    [FAST_MODEL, THINKING_MODEL],
+]
+FILE_EXTENSIONS = {"python": "py", "c": "c", "js": "js", "nvcc": "cu"}
+
+# The agent behind each stage, named when a stage fails for good
+STAGE_AGENTS = {"generate": "Agent 1", "validate": "Agent 2", "judge": "Agent 3", "samples": "Agent 4"}
+
+class Attempt:
+    """One candidate's pass through an iteration's stage graph, and how it ended.
+
+    Workflows may keep their own per-attempt state on it, such as beta's conversation log.
+    """
+
+    def __init__(self, iteration, c, agents, request, candidates, file_extension, previous_code="", workspace="."):
+        self.iteration = iteration
+        self.c = c
+        self.agents = agents
+        self.request = request
+        self.previous_code = previous_code  # the code Agent 1 was asked to fix, if any
+        # Candidates print under their number and write their programs to files of their own
+        self.label = f"Candidate {c + 1} " if candidates > 1 else ""
+        self.prefix = os.path.join(workspace, f"task_candidate_{c + 1}" if candidates > 1 else "task")
+        self.filename = f"{self.prefix}.{file_extension}"
+        self.results = {}
+        self.rejected = None
+        self.passed = False
+        self.code = ""
+        self.feedback = ""
+        self.error = None
+        self.entry_point = None  # the function the harness called with the samples, if it ran
+
+class Workflow:
+    """Generates, validates and refines code until it passes or the iterations run out.
+
+    Each iteration runs the stage graph a pipeline declares in iteration_stages(), which
+    must end in a "judge" stage returning (decision, explanation). With several candidates,
+    every candidate runs its own graph with its own agents at the same time; the first to
+    pass wins, the others are cancelled, and a failed candidate is asked to fix its own code
+    in the next iteration. Code that was already rejected, in an earlier iteration or by
+    another candidate, is stopped right after "generate" by repeat_stage() with its earlier
+    verdict.
+    """
+
+    agent_count = 3
+
+    def __init__(self, prompt, language, samples, agents=None, candidates=1, workspace="."):
+        self.prompt = prompt
+        self.language = language
+        self.samples = samples
+        self.candidates = candidates
+        self.workspace = workspace  # the directory the run's code and sample files go to
+        # A model or a cascade of models per agent, routed by observed latency and success
+        self.cascades = list(agents) if agents and len(agents) == self.agent_count else DEFAULT_MODELS[:self.agent_count]
+        self.router = ModelRouter(self.cascades)
+        self.file_extension = FILE_EXTENSIONS.get(language, "txt")
+        self.filename = os.path.join(workspace, f"task.{self.file_extension}")
+        # One set of Agents 1-3 per candidate, kept across iterations
+        self.slots = [self.create_agents() for _ in range(max(1, candidates))]
+        self.previous = [None] * len(self.slots)
+        self.verdicts = {}  # Why every rejected program failed, by code_key()
+        self.checkpoint = Checkpoint([type(self).__name__, prompt, language, samples, self.cascades, len(self.slots)])
+        self.run_log = RunLog(type(self).__name__, prompt, language, self.cascades)
+
+    @property
+    def models(self):
+        """The model every agent currently runs on, in agent order."""
+        return self.router.models()
+
+    def create_agents(self):
+        """Agents 1-3 of one candidate: the generator, the validator and the judge."""
+        return (
+            create_agent(self.models[0], generation_config_normal, "Agent 1"),
+            create_agent(self.models[1], generation_config_normal, "Agent 2"),
+            create_agent(self.models[2], generation_config_structured, "Agent 3"),
+        )
+
+    def request(self, c):
+        """Agent 1's request for candidate `c`, built on the candidate's previous attempt."""
+        code, feedback = self.previous_failure(c)
+        if len(self.slots) > 1:
+            return candidate_request(self.language, self.prompt, c, len(self.slots), code, feedback)
+        return refinement_request(self.language, self.prompt, code, feedback)
+
+    def previous_failure(self, c):
+        """The code of candidate `c`'s previous attempt and why it failed, or ("", "") if there is none to fix."""
+        previous = self.previous[c]
+        if previous is None or not previous.code:
+            return "", ""
+        return previous.code, previous.feedback
+
+    def iteration_stages(self, attempt):
+        """The stage graph of one attempt."""
+        raise NotImplementedError
+
+    def repeat_stage(self, attempt):
+        """A stage after "generate" that rejects code which was already rejected, with its earlier verdict."""
+
+        async def recall(results):
+            if not memoization["enabled"]:
+                return None
+            verdict = self.verdicts.get(code_key(self.language, results["generate"]))
+            if verdict is not None:
+                print(f"{attempt.label}Agent 1 repeated code that was already rejected")
+            return verdict
+
+        return Stage("repeat", recall, after=["generate"], accept=lambda verdict: verdict is None)
+
+    def rejection_feedback(self, attempt):
+        """What a rejected attempt is told about why it failed."""
+        result = attempt.results[attempt.rejected]
+        if attempt.rejected == "repeat":
+            return duplicate_feedback(result)
+        if attempt.rejected == "static_check":
+            return "Static checks failed:\n" + "\n".join(result)
+        if attempt.rejected == "validate":
+            return f"Agent 2 rejected the code: {result[:200]}"
+        return result[1]
+
+    async def refined_code(self, attempt, reply, parse_code, send):
+        """Agent 1's code from its `reply`.
+
+        When Agent 1 was asked to fix its previous code and answered with a diff, the diff is
+        applied to that code; a diff that does not apply costs one more request, made with the
+        coroutine function send(request), for the complete code. Other replies go through parse_code().
+        """
+        diff = extract_diff(reply) if attempt.previous_code else None
+        if diff is None:
+            return parse_code(reply)
+        try:
+            code = apply_diff(attempt.previous_code, diff)
+        except ValueError as e:
+            print(f"{attempt.label}Agent 1's diff did not apply: {e}")
+            response = await send(f"Your diff did not apply: {e}. Only return the complete corrected code.")
+            return parse_code(response.text.strip())
+        print(f"{attempt.label}Agent 1 sent a {len(diff.splitlines())}-line diff")
+        return code
+
+    def record(self, attempt):
+        """Called with every attempt that finished, before the next iteration starts."""
+
+    def events(self, attempt):
+        """The (agent, text) events of a finished attempt, in order, for the run store."""
+        if attempt.error:
+            return [("host", attempt.error)]
+        results = attempt.results
+        events = [("Agent 1", results["generate"])]
+        if results.get("static_check"):
+            events.append(("host", "Static checks failed:\n" + "\n".join(results["static_check"])))
+        if "validate" in results:
+            events.append(("Agent 2", results["validate"]))
+        if "judge" in results:
+            decision, explanation, *judge = results["judge"]
+            events.append((judge[0] if judge else "Agent 3", f"{decision}, {explanation}"))
+        if attempt.rejected:
+            events.append(("host", attempt.feedback))
+        return events
+
+    def slot_outcomes(self, attempt):
+        """Whether each agent that had a clear share in how `attempt` ended did its part, for the router.
+
+        A passed attempt counts for every agent. Otherwise Agent 1 is blamed for code that
+        failed the static checks, Agent 2 or the samples, except that a hedged Agent 2 verdict
+        is blamed on Agent 2 alone. An attempt that ended in an error blames no one.
+        """
+        if attempt.error:
+            return {}
+        outcomes = {name: True for name in self.router.cascades} if attempt.passed else {"Agent 1": False}
+        decision = attempt.results.get("validate")
+        if decision is not None and hedged(decision):
+            outcomes["Agent 2"] = False
+            if attempt.rejected == "validate":
+                del outcomes["Agent 1"]
+        return outcomes
+
+    def checkpoint_state(self, iteration, code):
+        """The loop state to resume at `iteration` from: every candidate's last attempt and agents' histories."""
+        return {
+            "iteration": iteration,
+            "code": code,
+            "previous": [
+                None if attempt is None else {
+                    "code": attempt.code, "feedback": attempt.feedback, "rejected": attempt.rejected,
+                    "results": attempt.results,
+                }
+                for attempt in self.previous
+            ],
+            "histories": [[agent.history_state() for agent in agents] for agents in self.slots],
+            "router": self.router.state(),
+            "run": self.run_log.run,
+            "verdicts": self.verdicts,
+        }
+
+    def restore(self, state):
+        """Puts back the loop state of a checkpoint; returns the iteration to resume at and the last code."""
+        self.router.restore(state["router"])
+        self.run_log.run = state.get("run")
+        self.verdicts = state.get("verdicts", {})
+        for agents, histories in zip(self.slots, state["histories"]):
+            for agent, history in zip(agents, histories):
+                agent.chat.history = history
+        for c, saved in enumerate(state["previous"]):
+            if saved is not None:
+                attempt = Attempt(
+                    state["iteration"] - 1, c, self.slots[c], "", len(self.slots), self.file_extension,
+                    workspace=self.workspace,
+                )
+                attempt.code, attempt.feedback = saved["code"], saved["feedback"]
+                attempt.rejected, attempt.results = saved["rejected"], saved["results"]
+                self.previous[c] = attempt
+        return state["iteration"], state["code"]
+
+    async def run_attempt(self, attempt):
+        """Runs an attempt's stage graph; returns (passed, attempt) for first_passing()."""
+        try:
+            attempt.results, attempt.rejected = await run_stages(self.iteration_stages(attempt))
+        except StageFailed as e:
+            # Rate limits were already retried by the agents, so this is final
+            agent = STAGE_AGENTS.get(e.stage, f"the {e.stage} stage")
+            print(f"Unexpected error when calling {agent}: {e.error}")
+            attempt.error = attempt.feedback = f"Error communicating with {agent}."
+            return False, attempt
+        attempt.code = attempt.results.get("generate", "")
+        if attempt.rejected:
+            attempt.feedback = self.rejection_feedback(attempt)
+            if attempt.rejected == "repeat":
+                print(f"\n=== {attempt.label}Agent 1 repeated rejected code. Retry with Agent 1 ===")
+            else:
+                self.verdicts.setdefault(code_key(self.language, attempt.code), attempt.feedback)
+            if attempt.rejected == "static_check":
+                print(f"\n=== {attempt.label}Static checks failed. Retry with Agent 1 ===\n", attempt.feedback)
+            elif attempt.rejected == "validate":
+                print(f"\n=== {attempt.label}Code validation failed. Retry with Agent 1 ===")
+        else:
+            attempt.passed = True
+            attempt.feedback = attempt.results["judge"][1]
+        return attempt.passed, attempt
+
+    async def run(self, max_iterations):
+        """Runs iterations until one passes; returns (status, code, explanation) like host()."""
+        iteration = 1
+        code = ""
+        state = self.checkpoint.load()
+        if state is not None:
+            iteration, code = self.restore(state)
+        while iteration <= max_iterations or max_iterations == -1:
+            tracer.context(iteration=iteration)
+            for agents in self.slots:
+                for agent in agents:
+                    if agent.model_name != self.router.model(agent.name):
+                        agent.switch_model(self.router.model(agent.name))
+            if len(self.slots) > 1:
+                print(f"\n=== Iteration {iteration}: {len(self.slots)} candidates are generated and tested in parallel ===")
+            else:
+                print(f"\n=== Iteration {iteration}: Agent 1 generates/refines a code snippet ===")
+            attempts = [
+                Attempt(
+                    iteration, c, agents, self.request(c), len(self.slots), self.file_extension,
+                    self.previous_failure(c)[0], self.workspace,
+                )
+                for c, agents in enumerate(self.slots)
+            ]
+            winner, finished = await first_passing(self.run_attempt(attempt) for attempt in attempts)
+            for _, attempt in finished:
+                self.previous[attempt.c] = attempt
+                self.record(attempt)
+                for agent, text in self.events(attempt):
+                    self.run_log.append(iteration, attempt.c, agent, text)
+                self.router.record(self.slot_outcomes(attempt))
+
+            if winner is not None:
+                attempt = winner[1]
+                with open(self.filename, "w") as code_file:
+                    code_file.write(attempt.code)
+                print("\n=== Workflow Complete: Code works as expected ===")
+                self.checkpoint.remove()
+                self.run_log.finish("yes", iteration, attempt.agents[0].model_name)
+                return "yes", attempt.code, attempt.feedback
+            last = finished[-1][1]
+            if len(self.slots) == 1 and last.error:
+                self.run_log.finish("error", iteration, last.agents[0].model_name)
+                return "no", "", last.error
+            code = last.code or code
+            iteration += 1
+            self.checkpoint.save(self.checkpoint_state(iteration, code))
+            print("\n--- Refining Code ---")
+
+        # Agent 1 ran on the model it was switched to at the start of the last iteration
+        self.run_log.finish("no", iteration - 1, self.slots[0][0].model_name)
+        return "no", code, "Maximum iterations reached without achieving success."
+
+class SampleWorkflow(Workflow):
+    """A workflow that tests the validated code on the task's samples before Agent 3 judges it.
+
+    With `harness`, Python code is called through its entry point, one harness process per
+    shard of samples; otherwise each sample gets its own program, run at most `concurrency` at
+    a time. Either way the samples may stop early after too many failures (see sample_execution).
+    """
+
+    agent_count = 4
+
+    def __init__(self, prompt, language, samples, agents=None, candidates=1, concurrency=1, harness=False,
+                 entry_point=None, workspace="."):
+        super().__init__(prompt, language, samples, agents, candidates, workspace)
+        self.concurrency = concurrency
+        self.harness = harness and language == "python" and bool(samples)
+        self.entry_point = entry_point
+
+    def samples_after(self):
+        """Where the samples stage goes: the harness imports the saved file, so it waits for
+        it; per-sample programs start while Agent 2 is still validating."""
+        if self.harness:
+            return {"after": ("save",)}
+        return {"after": ("static_check",), "guard": "validate"}
+
+    def rejection_feedback(self, attempt):
+        # Failed samples are summarized like for Agent 3, so Agent 1 sees the inputs it got wrong
+        if attempt.rejected == "judge":
+            summary = summarize_samples(self.samples, attempt.results["samples"])
+            return f"{summary}\nVerdict: {attempt.results['judge'][1]}"
+        return super().rejection_feedback(attempt)
+
+    async def run_samples(self, attempt, code, process):
+        """Runs the samples on `code`, through the harness when it has an entry point, otherwise
+        with the coroutine function process(i, sample)."""
+        entry_point = None
+        if self.harness:
+            try:
+                entry_point = self.entry_point or await asyncio.to_thread(
+                    find_entry_point, code, self.samples[0]["input"],
+                    create_agent(self.models[3], generation_config_normal, "Agent 4"),
+                )
+            except Exception as e:
+                print(f"Unexpected error when calling Agent 4: {e}")
+        attempt.entry_point = entry_point
+        if entry_point:
+            print(f"\n=== Iteration {attempt.iteration}: {attempt.label}Running samples through {entry_point}() ===")
+            return await run_harness_shards(attempt.filename, entry_point, self.samples, attempt.prefix)
+        print(f"\n=== Iteration {attempt.iteration}: {attempt.label}Agent 4 modifies code for testing ===")
+        return await run_samples_async(self.samples, process, self.concurrency)
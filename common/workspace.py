@@ -0,0 +1,55 @@
+"""Per-run workspace directories for the code and sample programs a run writes."""
+import functools
+import os
+import shutil
+import tempfile
+
+# Workspaces, set up from the "workspace" section of config.json by configure_workspace().
+# Every host() run writes its code into a directory of its own under `root`, by default
+# /dev/shm when it is writable so the files stay in memory, and every sample program and
+# harness shard runs in a subdirectory of its own. Runs started from the same working
+# directory therefore never overwrite each other's code or sample files. A run's directory
+# is removed when it ends unless `keep` is set.
+workspace_settings = {"root": "", "keep": False}
+
+def configure_workspace(settings=None):
+    """Applies the "workspace" section of config.json."""
+    if settings:
+        workspace_settings.update(settings)
+    # Batch and daemon tasks run in their own directories but share the root
+    if workspace_settings["root"]:
+        workspace_settings["root"] = os.path.abspath(workspace_settings["root"])
+
+def workspace_root():
+    """The directory run workspaces are created in."""
+    if workspace_settings["root"]:
+        os.makedirs(workspace_settings["root"], exist_ok=True)
+        return workspace_settings["root"]
+    if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK):
+        return "/dev/shm"
+    return tempfile.gettempdir()
+
+def in_workspace(function):
+    """Decorator passing a new run workspace to `function` as its `workspace` argument.
+
+    The workspace is removed when the call returns, unless `keep` is set. A caller that passes
+    its own `workspace` keeps it.
+    """
+    @functools.wraps(function)
+    def wrapper(*args, workspace=None, **kwargs):
+        if workspace is not None:
+            return function(*args, workspace=workspace, **kwargs)
+        workspace = tempfile.mkdtemp(prefix="run-", dir=workspace_root())
+        try:
+            return function(*args, workspace=workspace, **kwargs)
+        finally:
+            if workspace_settings["keep"]:
+                print(f"--- Run files kept in {workspace} ---")
+            else:
+                shutil.rmtree(workspace, ignore_errors=True)
+    return wrapper
+
+def workspace_file(directory, name):
+    """Path of file `name` in `directory`, which is created; a program written there runs in it."""
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, name)
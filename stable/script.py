@@ -1,50 +1,21 @@
-from datetime import datetime
-import subprocess
+import asyncio
 import json  # To help handle JSON responses
-import json
-import subprocess
-from datetime import datetime
-from typing_extensions import TypedDict
-import google.generativeai as genai
-import time
-class Agent3Response(TypedDict):
-    response: str  # "yes" or "no"
-    explanation: str  # Detailed explanation
-
-# Generation configurations
-generation_config_normal = {
-    "temperature": 0.7,
-    "top_p": 0.95,
-    "top_k": 64,
-    "max_output_tokens": 65536,
-    "response_mime_type": "text/plain",
-}
-generation_config_structured = {
-    "temperature": 0.7,
-    "top_p": 0.95,
-    "top_k": 64,
-    "max_output_tokens": 65536,
-    "response_mime_type": "application/json",
-    "response_schema": Agent3Response
-}
-
-def create_agent(model_name, config):
-    """Creates a chat session using the specified model and configuration."""
-    model = genai.GenerativeModel(
-        model_name=model_name,
-        generation_config=config,
-    )
-    return model.start_chat(history=[])
-# Helper function to get the current timestamp
-def get_timestamp():
-    """Returns the current time as a formatted string."""
-    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common import aio, cli
+from common.stages import Stage
+from common.static_checks import static_check
+from common.trace import traced
+from common.workflow import Workflow
+from common.workspace import in_workspace
 
 
 def parse_code(raw_code):
     """
     Parses the raw response and extracts valid code.
-    Removes markdown code block markers (```). 
+    Removes markdown code block markers (```).
     """
     if raw_code.startswith("```") and raw_code.endswith("```"):
         lines = raw_code.splitlines()
@@ -52,186 +23,97 @@ def parse_code(raw_code):
     return raw_code  # Return as-is if no markers
 
 
-def execute_code(language, filepath):
-    """
-    Executes the file based on the specified programming language.
-    Runs the compiled or interpreted code and returns output and errors.
-    """
-    if language == "python":
-        # Execute Python code file
-        command = ["python", filepath]
-    elif language == "c":
-        # Compile and run C code
-        binary = filepath.replace(".c", ".out")  # Replace extension for binary
-        compile_command = ["gcc", filepath, "-o", binary]  # Compile
-        subprocess.run(compile_command, text=True, capture_output=True, check=True)
-        command = [f"./{binary}"]
-    elif language == "js":
-        # Run JavaScript code using Node.js
-        command = ["node", filepath]
-    elif language == "nvcc":
-        # Compile CUDA code and run
-        binary = filepath.replace(".cu", ".out")  # Replace extension for binary
-        compile_command = ["nvcc", filepath, "-o", binary]  # Compile
-        subprocess.run(compile_command, text=True, capture_output=True, check=True)
-        command = [f"./{binary}"]
-    else:
-        raise ValueError(f"Unsupported language: {language}")
-
-    # Run the command and collect output
-    result = subprocess.run(command, text=True, capture_output=True, check=False)
-    return result.stdout, result.stderr
-def host(prompt, language, samples, max_iterations=3, agents=None):
-    if len(agents) == 3:
-        # Initialize agents
-        agent_1 = create_agent(agents[0], generation_config_normal)
-        agent_2 = create_agent(agents[1], generation_config_normal)
-        agent_3 = create_agent(agents[2], generation_config_structured)
-    else:
-        # Initialize agents with default models
-        agent_1 = create_agent("gemini-2.0-flash-thinking-exp-01-21", generation_config_normal)
-        agent_2 = create_agent("gemini-2.0-flash-thinking-exp-01-21", generation_config_normal)
-        agent_3 = create_agent("gemini-2.0-flash-exp", generation_config_structured)
-
-    """Manages the workflow: generates, validates, and refines code."""
-    conversation_log = []
-    iteration = 1
-    file_extension = {"python": "py", "c": "c", "js": "js", "nvcc": "cu"}.get(language, "txt")
-    filename = f"task.{file_extension}"
-
-    while iteration <= max_iterations or max_iterations == -1:
-        print(f"\n=== Iteration {iteration}: Agent 1 generates/refines a code snippet ===")
+class StableWorkflow(Workflow):
+    """Agent 1 writes the code, Agent 2 validates it and Agent 3 judges it; no samples are run."""
 
-        if iteration % 2 == 0:
-            print("\n--- Sleeping for rate limiting ---")
-            time.sleep(10)
-
-        timestamp = get_timestamp()
+    def iteration_stages(self, attempt):
+        agent_1, agent_2, agent_3 = attempt.agents
+        label = attempt.label
+        judged = {}
 
         # Step 1: Agent 1 generates/refines the code
-        while True:
-            try:
-                agent_1_response = agent_1.send_message(
-                    f"Write {language} code for the following task. Only return the code:\n{prompt}"
-                )
-                raw_code = agent_1_response.text.strip()
-                break
-            except Exception as e:
-                if '429' in str(e):  # Check for Too Many Requests directly in the error message
-                    print("Rate limit exceeded when calling Agent 1. Retrying...")
-                    time.sleep(30)  # Wait before retrying
-                    continue  # Retry this iteration
-                else:
-                    print(f"Unexpected error when calling Agent 1: {e}")
-                    return "no", "", "Error communicating with Agent 1."
-
-        refined_code = parse_code(raw_code)
-        print("Agent 1 Output (Refined Code):\n", refined_code)
-        conversation_log.append(f"{timestamp} | Iteration {iteration} | Agent 1 -> Host:\n{refined_code}")
+        async def generate(results):
+            agent_1_response = await agent_1.send_code_async(attempt.request)
+            refined_code = await self.refined_code(
+                attempt, agent_1_response.text.strip(), parse_code, agent_1.send_code_async
+            )
+            print(f"{label}Agent 1 Output (Refined Code):\n", refined_code)
+            return refined_code
+
+        # Local static checks reject broken code without spending an Agent 2 call
+        async def check(results):
+            return await asyncio.to_thread(static_check, self.language, results["generate"])
 
         # Step 2: Agent 2 validates the code
-        print(f"\n=== Iteration {iteration}: Agent 2 validates the refined code ===")
-        while True:
-            try:
-                agent_2_response = agent_2.send_message(
-                    f"Validate if the following {language} code is error-free and handles the task properly.\n"
-                    f"Respond 'Yes' or 'No'.\n\n{refined_code}"
-                )
-                break
-            except Exception as e:
-                if '429' in str(e):
-                    print("Rate limit exceeded when calling Agent 2. Retrying...")
-                    time.sleep(10)  # Wait before retrying
-                    continue  # Retry this iteration
-                else:
-                    print(f"Unexpected error when calling Agent 2: {e}")
-                    return "no", "", "Error communicating with Agent 2."
-
-        validation_decision = agent_2_response.text.strip().lower()
-        print("Agent 2 Decision:", validation_decision)
-
-        if "yes" not in validation_decision:
-            print("\n=== Code validation failed. Retry with Agent 1 ===")
-            conversation_log.append(f"{get_timestamp()} | Iteration {iteration} | Validation failed. Retrying...")
-            iteration += 1
-            continue
+        async def validate(results):
+            print(f"\n=== Iteration {attempt.iteration}: {label}Agent 2 validates the refined code ===")
+            agent_2_response = await agent_2.send_message_async(
+                f"Validate if the following {self.language} code is error-free and handles the task properly.\n"
+                f"Respond 'Yes' or 'No'.\n\n{results['generate']}"
+            )
+            validation_decision = agent_2_response.text.strip().lower()
+            print(f"{label}Agent 2 Decision:", validation_decision)
+            return validation_decision
 
         # Save the validated code
-        with open(filename, "w") as code_file:
-            code_file.write(refined_code)
-        print(f"\n=== Code saved to {filename} ===")
-        conversation_log.append(f"{timestamp} | Iteration {iteration} | Validated code saved to file.")
-
-        # Step 3: Agent 3 analyzes test results and decision-making
-        print("\n=== Iteration {iteration}: Agent 3 analyzes validation results ===")
-        test_summary = {
-            "validated_code": refined_code,
-        }
-        while True:
-            try:
-                agent_3_response = agent_3.send_message(
+        async def save(results):
+            with open(attempt.filename, "w") as code_file:
+                code_file.write(results["generate"])
+            print(f"\n=== Code saved to {attempt.filename} ===")
+
+        # Step 3: Agent 3 reviews the code, while Agent 2 is still validating it
+        async def judge(results):
+            print(f"\n=== Iteration {attempt.iteration}: {label}Agent 3 analyzes validation results ===")
+            judged["history"] = list(agent_3.history)
+            test_summary = {
+                "validated_code": results["generate"],
+            }
+            while True:
+                agent_3_response = await agent_3.send_message_async(
                     f"The following code has been validated:\n\n"
                     f"{json.dumps(test_summary, indent=2)}\n\n"
                     "Does the code achieve the desired task? Respond in JSON format with:\n"
                     "'response': 'yes' or 'no', and 'explanation': A detailed explanation."
                 )
+                try:
+                    agent_3_output = json.loads(agent_3_response.text.strip())
+                    break
+                except json.JSONDecodeError as e:
+                    print("Error decoding Agent 3 response:", e)
+                    print("Raw Agent 3 Response:", agent_3_response.text.strip())
+            decision = agent_3_output.get("response", "no").lower()
+            explanation = agent_3_output.get("explanation", "")
+            print(f"{label}Agent 3 Decision:", decision)
+            print(f"{label}Agent 3 Explanation:", explanation)
+            return decision, explanation
+
+        def forget_review(verdict):
+            # Agent 2 rejected the code, so Agent 3 forgets it reviewed it
+            agent_3.chat.history = judged["history"]
+
+        return [
+            Stage("generate", generate),
+            self.repeat_stage(attempt),
+            Stage("static_check", check, after=["repeat"], accept=lambda diagnostics: not diagnostics),
+            Stage("validate", validate, after=["static_check"], accept=lambda decision: "yes" in decision),
+            Stage("save", save, after=["validate"]),
+            Stage("judge", judge, after=["static_check"], guard="validate",
+                  accept=lambda verdict: "yes" in verdict[0], discard=forget_review),
+        ]
+
+@traced("run")
+@in_workspace
+def host(prompt, language, samples, max_iterations=3, agents=None, candidates=1, workspace=None):
+    """Manages the workflow: generates, validates, and refines code."""
+    workflow = StableWorkflow(prompt, language, samples, agents, candidates, workspace)
+    return aio.run(workflow.run(max_iterations))
 
-                agent_3_output = json.loads(agent_3_response.text.strip())
-                decision = agent_3_output.get("response", "no").lower()
-                explanation = agent_3_output.get("explanation", "")
-
-                print("Agent 3 Decision:", decision)
-                print("Agent 3 Explanation:", explanation)
-
-                if "yes" in decision:
-                    print("\n=== Workflow Complete: Code works as expected ===")
-                    return "yes", refined_code, explanation
-                break
-
-            except json.JSONDecodeError as e:
-                print("Error decoding Agent 3 response:", e)
-                print("Raw Agent 3 Response:", agent_3_response.text.strip())
-                explanation = "Failed to parse Agent 3 response."
-
-            except Exception as e:
-                if '429' in str(e):
-                    print("Rate limit exceeded when calling Agent 3. Retrying...")
-                    time.sleep(10)  # Wait before retrying
-                    continue  # Retry this agent
-                else:
-                    print(f"Unexpected error when calling Agent 3: {e}")
-                    return "no", "", "Error communicating with Agent 3.",
-
-        # Retry with new refinement
-        iteration += 1
-        print("\n--- Refining Code ---")
-
-    return "no", refined_code, "Maximum iterations reached without achieving success."
 
+# Config fields that make up a task, passed to host() by name
+TASK_FIELDS = ("prompt", "language", "samples", "max_iterations", "agents", "candidates")
 
 def main():
-    config_file = 'config.json'
-
-    # Load configuration from file
-    with open(config_file, 'r') as file:
-        config = json.load(file)
-
-    # Set the API key
-    genai.configure(api_key=config['apikey'])
-
-    final_status, final_code, final_explanation = host(
-        config['prompt'],
-        language=config['language'],
-        samples=config['samples'], 
-        max_iterations=config['max_iterations'],
-        agents=config['agents']
-    )
-
-    print("\n=== Final Status ===")
-    print("Status:", final_status)
-    print("Refined Code:\n", final_code)
-    print("Explanation:", final_explanation)
-
+    cli.main(host, TASK_FIELDS)
 
 if __name__ == "__main__":
     main()
@@ -1,2 +0,0 @@
-def sort_integers(nums):
-    return sorted(nums)
\ No newline at end of file
@@ -0,0 +1,60 @@
+"""Makes `common` importable and loads the stable, alpha and beta scripts as modules for the tests."""
+import importlib.util
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from common import backends, memo, ratelimit, state
+
+def load_variant(variant):
+    """Imports <variant>/script.py as a module without running main()."""
+    name = f"{variant}_script"
+    if name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, variant, "script.py"))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+    return sys.modules[name]
+
+@pytest.fixture(params=("stable", "alpha", "beta"))
+def script(request):
+    return load_variant(request.param)
+
+@pytest.fixture(params=("alpha", "beta"))
+def sample_script(request):
+    """The variants that run the samples."""
+    return load_variant(request.param)
+
+@pytest.fixture(autouse=True)
+def state_dir(tmp_path, monkeypatch):
+    """Keeps the files a test's runs leave behind, such as the sample history, in its scratch directory."""
+    monkeypatch.setitem(state.state, "dir", str(tmp_path / ".codegen"))
+
+@pytest.fixture(autouse=True)
+def execution_memo(monkeypatch):
+    """Gives every test an empty cache of sample results, so no test sees another's runs."""
+    monkeypatch.setattr(memo, "execution_memo", {})
+
+@pytest.fixture
+def fake_backend(tmp_path, monkeypatch):
+    """Runs the test in a scratch directory on the fake backend, with no rate limits or retry delays.
+
+    Returns a function that configures the backend further, e.g. with scripted `responses`.
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setitem(ratelimit.rate_limits, "default", {"requests_per_minute": 10 ** 6, "tokens_per_minute": 10 ** 9})
+    monkeypatch.setitem(ratelimit.retry_policy, "base_delay", 0)
+    monkeypatch.setitem(ratelimit.retry_policy, "max_delay", 0)
+    monkeypatch.setattr(ratelimit, "_rate_limiters", {})
+    for key, value in backends.model_backend.items():
+        monkeypatch.setitem(backends.model_backend, key, value)
+
+    def configure(**settings):
+        backends.configure_backend({"name": "fake", "responses": {}, **settings})
+
+    configure()
+    return configure
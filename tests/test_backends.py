@@ -0,0 +1,55 @@
+import pytest
+
+from common import aio, backends, stages
+from common.agents import create_agent, generation_config_normal
+from common.ratelimit import RateLimitExceeded
+
+SAMPLES = [{"input": "3", "expected_output": "3"}, {"input": "[1, 2]", "expected_output": "[1, 2]"}]
+AGENT_COUNTS = {"stable": 3, "alpha": 4, "beta": 5}
+
+def test_replies_follow_the_script_and_the_last_one_repeats(fake_backend):
+    fake_backend(responses={"Agent 2": ["No", "Yes"]})
+    agent = create_agent("fake", generation_config_normal, "Agent 2")
+    assert [agent.send_message(f"Validate {n}").text for n in range(3)] == ["No", "Yes", "Yes"]
+    assert len(agent.history) == 6
+    assert backends.fake_stats["calls"] == 3
+
+def test_the_sample_input_is_filled_in(fake_backend):
+    agent = create_agent("fake", generation_config_normal, "Agent 4")
+    response = aio.run(agent.send_message_async("Modify the code to use the sample input: 42\nCode:"))
+    assert "print(solve(42))" in response.text
+
+def test_injected_failures_are_retried_by_the_agent(fake_backend):
+    fake_backend(failure_rate=0.5, seed=1)
+    agent = create_agent("fake", generation_config_normal, "Agent 1")
+    for _ in range(5):
+        assert "def solve" in agent.send_message("Write code").text
+    assert backends.fake_stats["failures"] > 0
+    assert backends.fake_stats["calls"] == 5 + backends.fake_stats["failures"]
+
+def test_a_backend_that_always_fails_runs_out_of_retries(fake_backend):
+    fake_backend(failure_rate=1.0)
+    with pytest.raises(RateLimitExceeded):
+        create_agent("fake", generation_config_normal, "Agent 1").send_message("Write code")
+
+def test_unknown_backends_are_rejected():
+    with pytest.raises(ValueError):
+        backends.configure_backend({"name": "nope"})
+
+def test_every_variant_completes_a_task_offline(script, fake_backend):
+    variant = script.__name__.split("_")[0]
+    status, code, _ = script.host(
+        "Return the input unchanged.", "python", SAMPLES, max_iterations=2, agents=["fake"] * AGENT_COUNTS[variant]
+    )
+    assert status == "yes" and "def solve" in code
+
+def test_a_rejected_iteration_is_refined(sample_script, fake_backend, monkeypatch):
+    fake_backend(responses={"Agent 2": ["No", "Yes"]})
+    # Speculative samples would also rewrite the samples of the rejected code
+    monkeypatch.setitem(stages.pipeline, "speculative", False)
+    status, _, _ = sample_script.host("Return the input unchanged.", "python", SAMPLES, max_iterations=2, agents=[])
+    assert status == "yes"
+    # Agents 1 and 2 twice, then Agent 4 (and in beta Agent 5) once per sample; every sample
+    # passes, so the result is decided without Agent 3
+    variant = sample_script.__name__.split("_")[0]
+    assert backends.fake_stats["calls"] == 4 + len(SAMPLES) * (AGENT_COUNTS[variant] - 3)
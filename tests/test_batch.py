@@ -0,0 +1,56 @@
+import json
+import os
+
+from common.batch import run_batch, task_arguments
+
+FIELDS = ("prompt", "language", "samples", "max_iterations", "agents")
+
+def fake_host(prompt, language, samples, max_iterations, agents):
+    """Passes tasks that mention "pass", after writing a file into the task's working directory."""
+    with open("task.txt", "w") as file:
+        file.write(prompt)
+    if "crash" in prompt:
+        raise RuntimeError("host crashed")
+    return ("yes" if "pass" in prompt else "no"), f"# {language}", f"{len(samples)} samples"
+
+def write_tasks(path, tasks):
+    with open(path, "w") as file:
+        for task in tasks:
+            file.write(json.dumps(task) + "\n")
+
+def read_results(path):
+    with open(path) as file:
+        return {result["id"]: result for result in map(json.loads, file)}
+
+def test_missing_task_fields_come_from_the_config():
+    config = {"prompt": "Sort", "language": "python", "samples": [], "max_iterations": 3, "agents": [], "apikey": ""}
+    arguments = task_arguments({"language": "c"}, config, FIELDS)
+    assert arguments == {"prompt": "Sort", "language": "c", "samples": [], "max_iterations": 3, "agents": []}
+
+def test_batch_writes_every_result_and_resumes_unfinished_tasks(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    config = {
+        "apikey": "", "prompt": "pass", "language": "python", "samples": [{"input": "1", "expected_output": "1"}],
+        "max_iterations": 1, "agents": [],
+    }
+    write_tasks("tasks.jsonl", [
+        {"id": "a", "prompt": "pass"},
+        {"id": "b/1", "prompt": "fail", "language": "c"},
+        {"prompt": "crash"},
+        {"id": "d"},
+    ])
+    run_batch(fake_host, FIELDS, config, "tasks.jsonl", "results.jsonl", "runs", 2)
+    results = read_results("results.jsonl")
+    assert {task: result["status"] for task, result in results.items()} == {
+        "a": "yes", "b/1": "no", "line-3": "error", "d": "yes",
+    }
+    assert results["b/1"]["code"] == "# c" and results["a"]["explanation"] == "1 samples"
+    # Every task ran in a directory of its own, with its output in host.log
+    with open(os.path.join("runs", "b_1", "task.txt")) as file:
+        assert file.read() == "fail"
+    assert os.path.exists(os.path.join("runs", "a", "host.log"))
+
+    # Only the task that ended in an error runs again
+    run_batch(fake_host, FIELDS, config, "tasks.jsonl", "results.jsonl", "runs", 2)
+    with open("results.jsonl") as file:
+        assert [json.loads(line)["id"] for line in file][4:] == ["line-3"]
@@ -0,0 +1,78 @@
+import types
+
+import pytest
+
+from common import agents, cache, state
+from common.cache import CacheMiss, ResponseCache, configure_cache
+
+class Chat:
+    """Answers every message with how many calls it has had."""
+
+    def __init__(self):
+        self.history = []
+        self.calls = 0
+
+    def send_message(self, content):
+        self.calls += 1
+        self.history = self.history + [
+            {"role": "user", "parts": [content]}, {"role": "model", "parts": [f"reply {self.calls}"]},
+        ]
+        return types.SimpleNamespace(text=f"reply {self.calls}", usage_metadata=None)
+
+@pytest.fixture
+def cached(tmp_path):
+    configure_cache({"mode": "readwrite", "path": str(tmp_path / "responses.sqlite")})
+    yield cache.response_cache
+    configure_cache({"mode": "off"})
+
+def test_a_repeated_request_is_served_from_the_cache(cached):
+    chat = Chat()
+    assert agents.Agent(chat, "model", {"temperature": 0}).send_message("Write code").text == "reply 1"
+    assert (cached.hits, cached.misses) == (0, 1)
+
+    replayed = Chat()
+    agent = agents.Agent(replayed, "model", {"temperature": 0})
+    assert agent.send_message("Write code").text == "reply 1"
+    assert replayed.calls == 0 and (cached.hits, cached.misses) == (1, 1)
+    # The history looks as if the call had been made, so the next request is keyed the same way
+    assert [turn["parts"] for turn in replayed.history] == [["Write code"], ["reply 1"]]
+
+def test_model_config_and_history_are_part_of_the_key(cached):
+    agents.Agent(Chat(), "model", {"temperature": 0}).send_message("Write code")
+    for model, config in [("other-model", {"temperature": 0}), ("model", {"temperature": 1})]:
+        chat = Chat()
+        agents.Agent(chat, model, config).send_message("Write code")
+        assert chat.calls == 1
+    chat = Chat()
+    chat.history = [{"role": "user", "parts": ["Earlier"]}, {"role": "model", "parts": ["Answer"]}]
+    agents.Agent(chat, "model", {"temperature": 0}).send_message("Write code")
+    assert chat.calls == 1
+
+def test_replay_mode_fails_on_a_miss(tmp_path):
+    configure_cache({"mode": "replay", "path": str(tmp_path / "responses.sqlite")})
+    try:
+        with pytest.raises(CacheMiss):
+            agents.Agent(Chat(), "model").send_message("Write code")
+    finally:
+        configure_cache({"mode": "off"})
+
+def test_least_recently_used_entries_are_evicted_beyond_max_bytes(tmp_path):
+    responses = ResponseCache(str(tmp_path / "responses.sqlite"), max_bytes=10)
+    responses.put("a", "12345")
+    responses.put("b", "12345")
+    assert responses.get("a") == "12345"  # now more recently used than "b"
+    responses.put("c", "12345")
+    assert responses.get("b") is None
+    assert responses.get("a") == responses.get("c") == "12345"
+
+def test_the_cache_is_off_by_default():
+    configure_cache(None)
+    assert cache.response_cache is None
+
+def test_a_relative_path_is_kept_in_the_state_directory(tmp_path, monkeypatch):
+    monkeypatch.setitem(state.state, "dir", str(tmp_path / "state"))
+    configure_cache({"mode": "readwrite"})
+    try:
+        assert cache.response_cache.path == str(tmp_path / "state" / "responses.sqlite")
+    finally:
+        configure_cache({"mode": "off"})
@@ -0,0 +1,76 @@
+import json
+import threading
+
+from common import aio, cascade
+from common.cascade import ModelRouter
+from conftest import load_variant
+
+WRONG = "```python\ndef solve(value):\n    return value + 1\n```"
+RIGHT = "```python\ndef solve(value):\n    return value\n```"
+SAMPLES = [{"input": "3", "expected_output": "3"}]
+
+def stats_file(tmp_path):
+    with open(tmp_path / ".codegen" / ".model_stats.json") as file:
+        return json.load(file)
+
+def test_sample_failures_escalate_only_the_generator(fake_backend, tmp_path):
+    fake_backend(responses={"Agent 1@fast": [WRONG], "Agent 1@strong": [RIGHT]})
+    alpha = load_variant("alpha")
+    models = [["fast", "strong"], ["fast", "strong"], "fast", "fast"]
+    workflow = alpha.AlphaWorkflow("Return the input.", "python", SAMPLES, models, harness=True, entry_point="solve")
+    status, code, _ = aio.run(workflow.run(3))
+    assert status == "yes" and "return value\n" in code + "\n"
+    agent_1, agent_2, _ = workflow.slots[0]
+    # Two failed iterations on the fast model moved Agent 1 up; Agent 2 did its part and stayed
+    assert (agent_1.model_name, agent_2.model_name) == ("strong", "fast")
+    slots = stats_file(tmp_path)["slots"]
+    assert slots["Agent 1"] == {"fast": {"attempts": 2, "passed": 0}, "strong": {"attempts": 1, "passed": 1}}
+    assert slots["Agent 2"] == {"fast": {"attempts": 1, "passed": 1}}
+
+def test_hedged_verdicts_escalate_only_the_validator(fake_backend):
+    fake_backend(responses={"Agent 2@fast": ["Probably fine"], "Agent 2@strong": ["Yes"]})
+    stable = load_variant("stable")
+    workflow = stable.StableWorkflow("Return the input.", "python", [], [["fast", "strong"], ["fast", "strong"], "fast"])
+    status, _, _ = aio.run(workflow.run(3))
+    assert status == "yes"
+    agent_1, agent_2, _ = workflow.slots[0]
+    assert (agent_1.model_name, agent_2.model_name) == ("fast", "strong")
+    # Agent 2 keeps its conversation on the stronger model
+    assert len(agent_2.history) == 6
+
+def test_a_single_failure_does_not_escalate(fake_backend):
+    fake_backend(responses={"Agent 2": ["No", "Yes"]})
+    stable = load_variant("stable")
+    workflow = stable.StableWorkflow("Return the input.", "python", [], [["fast", "strong"], ["fast", "strong"], "fast"])
+    assert aio.run(workflow.run(3))[0] == "yes"
+    assert workflow.models == ["fast", "fast", "fast"]
+
+def test_a_run_starts_on_the_fastest_proven_model(tmp_path, monkeypatch):
+    monkeypatch.setitem(cascade.cascade_settings, "stats", str(tmp_path / "stats.json"))
+    (tmp_path / "stats.json").write_text(json.dumps({
+        "models": {"fast": {"calls": 10, "seconds": 5.0}, "strong": {"calls": 10, "seconds": 30.0}},
+        "slots": {
+            "Agent 1": {"fast": {"attempts": 10, "passed": 2}, "strong": {"attempts": 10, "passed": 9}},
+            "Agent 2": {"fast": {"attempts": 10, "passed": 9}, "strong": {"attempts": 10, "passed": 9}},
+            "Agent 3": {"fast": {"attempts": 1, "passed": 0}},
+        },
+    }))
+    router = ModelRouter([["fast", "strong"], ["fast", "strong"], ["fast", "strong"]])
+    # Agent 1's fast model proved unreliable, Agent 2's did not and is faster, Agent 3 has too little history
+    assert router.models() == ["strong", "fast", "fast"]
+
+def test_concurrent_routers_add_up_their_statistics(tmp_path, monkeypatch):
+    monkeypatch.setitem(cascade.cascade_settings, "stats", str(tmp_path / "stats.json"))
+
+    def record():
+        router = ModelRouter([["fast", "strong"]])
+        for _ in range(20):
+            router.record({"Agent 1": True})
+
+    threads = [threading.Thread(target=record) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with open(tmp_path / "stats.json") as file:
+        assert json.load(file)["slots"]["Agent 1"]["fast"] == {"attempts": 80, "passed": 80}
@@ -0,0 +1,90 @@
+import json
+import os
+import threading
+
+from common import backends, checkpoint
+from common.checkpoint import Checkpoint
+
+SAMPLES = [{"input": "3", "expected_output": "3"}]
+AGENT_COUNTS = {"stable": 3, "alpha": 4, "beta": 5}
+
+def checkpoint_files(directory):
+    path = directory / ".codegen" / "checkpoints"
+    return sorted(os.listdir(path)) if path.exists() else []
+
+def run(script, max_iterations):
+    variant = script.__name__.split("_")[0]
+    return script.host(
+        "Return the input unchanged.", "python", SAMPLES, max_iterations=max_iterations,
+        agents=["fake"] * AGENT_COUNTS[variant],
+    )
+
+def test_checkpoints_are_off_by_default(script, fake_backend, tmp_path):
+    fake_backend(responses={"Agent 2": ["No"]})
+    assert run(script, 2)[0] == "no"
+    assert checkpoint_files(tmp_path) == []
+
+def test_an_interrupted_run_resumes_at_the_next_iteration(script, fake_backend, tmp_path, monkeypatch, capsys):
+    monkeypatch.setitem(checkpoint.checkpointing, "enabled", True)
+    fake_backend(responses={"Agent 2": ["No"]})
+    assert run(script, 1)[0] == "no"
+    [saved] = checkpoint_files(tmp_path)
+    with open(tmp_path / ".codegen" / "checkpoints" / saved) as file:
+        state = json.load(file)
+    assert state["iteration"] == 2 and state["previous"][0]["rejected"] == "validate"
+    capsys.readouterr()
+
+    monkeypatch.setitem(checkpoint.checkpointing, "resume", True)
+    # The resumed agents start their scripts over, so Agent 1 is scripted to fix its code
+    fake_backend(responses={"Agent 1": [backends.FAKE_RESPONSES["Agent 1"][1]], "Agent 2": ["Yes"]})
+    assert run(script, 2)[0] == "yes"
+    output = capsys.readouterr().out
+    assert "Resuming from" in output
+    assert "=== Iteration 2:" in output and "=== Iteration 1:" not in output
+    # The run succeeded, so its checkpoint is gone
+    assert checkpoint_files(tmp_path) == []
+
+def test_agent_histories_and_the_beta_log_are_restored(fake_backend, tmp_path, monkeypatch):
+    from conftest import load_variant
+
+    beta = load_variant("beta")
+    monkeypatch.setitem(checkpoint.checkpointing, "enabled", True)
+    fake_backend(responses={"Agent 2": ["No"]})
+    first = beta.BetaWorkflow("Return the input unchanged.", "python", SAMPLES, ["fake"] * 5)
+    beta.aio.run(first.run(1))
+
+    monkeypatch.setitem(checkpoint.checkpointing, "resume", True)
+    second = beta.BetaWorkflow("Return the input unchanged.", "python", SAMPLES, ["fake"] * 5)
+    assert second.restore(second.checkpoint.load()) == (2, first.previous[0].code)
+    assert [agent.history_state() for agent in second.slots[0]] == [agent.history_state() for agent in first.slots[0]]
+    assert second.conversation_log.entries == first.conversation_log.entries
+    assert second.conversation_log.summaries == first.conversation_log.summaries
+    assert second.previous[0].feedback == first.previous[0].feedback
+
+def test_a_checkpoint_of_another_task_is_ignored(tmp_path, monkeypatch):
+    monkeypatch.setitem(checkpoint.checkpointing, "path", str(tmp_path / "checkpoint.json"))
+    monkeypatch.setitem(checkpoint.checkpointing, "resume", True)
+    Checkpoint(["first task"]).save({"iteration": 3})
+    assert Checkpoint(["second task"]).load() is None
+    assert Checkpoint(["first task"]).load()["iteration"] == 3
+
+def test_concurrent_saves_of_one_task(tmp_path, monkeypatch):
+    monkeypatch.setitem(checkpoint.checkpointing, "enabled", True)
+    monkeypatch.setitem(checkpoint.checkpointing, "path", str(tmp_path / "{key}.json"))
+    checkpoints = [Checkpoint(["task"]) for _ in range(4)]
+    errors = []
+
+    def save(saved):
+        try:
+            for iteration in range(50):
+                saved.save({"iteration": iteration})
+        except OSError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=save, args=(saved,)) for saved in checkpoints]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert [path.name for path in tmp_path.iterdir()] == [f"{checkpoints[0].key[:12]}.json"]
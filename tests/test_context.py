@@ -0,0 +1,64 @@
+from types import SimpleNamespace
+
+from common import context
+from common.agents import Agent
+from common.context import ConversationLog
+from common.ratelimit import estimate_tokens
+
+def entry(number):
+    """A 38-character entry, which estimate_tokens() counts as 11 tokens."""
+    return f"entry {number:02d} ".ljust(38, ".")
+
+def test_agents_get_their_own_and_their_samples_entries():
+    log = ConversationLog(1000)
+    log.append(entry(1), 1, {1, 2})
+    log.append(entry(2), 1, {3})
+    log.append(entry(3), 1, {4}, sample=1)
+    log.append(entry(4), 1, {4}, sample=2)
+    assert log.for_agent(2) == [entry(1)]
+    assert log.for_agent(4, sample=2) == [entry(4)]
+    assert log.for_agent(5) == []
+
+def test_newest_entries_fill_the_budget():
+    log = ConversationLog(25)
+    for number in range(1, 5):
+        log.append(entry(number), 1, {1})
+    assert log.for_agent(1) == [entry(3), entry(4)]
+
+def test_newest_entry_is_sent_even_over_budget():
+    log = ConversationLog(5)
+    log.append(entry(1), 1, {1})
+    log.append(entry(2), 1, {1})
+    assert log.for_agent(1) == [entry(2)]
+
+def test_older_iterations_are_replaced_by_summaries():
+    log = ConversationLog(30)
+    for iteration in range(1, 4):
+        log.append(entry(iteration), iteration, {1})
+        log.summarize(iteration, f"s{iteration}")
+    log.append(entry(4), 3, {1})
+    # Summaries of 7 tokens each; only the newest fits in a quarter of the budget
+    assert log.for_agent(1) == ["Iteration 2 summary: s2", entry(3), entry(4)]
+
+def test_summaries_take_at_most_a_quarter_of_the_budget():
+    log = ConversationLog(100)
+    for iteration in range(1, 11):
+        log.summarize(iteration, "x" * 30)
+    log.append(entry(11), 11, {1})
+    sent = log.for_agent(1)
+    summaries = sent[:-1]
+    assert sent[-1] == entry(11)
+    assert sum(estimate_tokens(summary) for summary in summaries) <= 25
+    assert summaries == [f"Iteration {iteration} summary: {'x' * 30}" for iteration in range(10 - len(summaries) + 1, 11)]
+
+def test_oldest_exchanges_are_dropped_from_the_chat_history(monkeypatch):
+    monkeypatch.setitem(context.context_budget, "history_tokens", 25)
+    turns = [SimpleNamespace(role=role, parts=[SimpleNamespace(text=entry(n))]) for n, role in enumerate(["user", "model"] * 3)]
+    agent = Agent(SimpleNamespace(history=turns), "history-test")
+    agent.trim_history()
+    # Six 11-token turns: whole exchanges go until what is left fits
+    assert agent.history == turns[4:]
+    monkeypatch.setitem(context.context_budget, "history_tokens", 0)
+    agent.chat.history = list(turns)
+    agent.trim_history()
+    assert agent.history == turns
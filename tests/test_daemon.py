@@ -0,0 +1,76 @@
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from common.daemon import TaskQueue, make_server, send_request, settings_for
+from conftest import ROOT
+
+FIELDS = ("prompt", "language", "samples", "max_iterations", "agents")
+CONFIG = {"apikey": "", "language": "python", "samples": [], "max_iterations": 1, "agents": []}
+
+def fake_host(prompt, language, samples, max_iterations, agents):
+    """Passes tasks that mention "pass" and reports the worker process it ran in."""
+    return ("yes" if "pass" in prompt else "no"), f"# {language}", str(os.getpid())
+
+@pytest.fixture
+def daemon(tmp_path, monkeypatch):
+    """A daemon with one warm worker, serving on a socket in the test's scratch directory."""
+    monkeypatch.chdir(tmp_path)
+    tasks = TaskQueue(fake_host, FIELDS, CONFIG, 1, str(tmp_path / "runs"))
+    path = str(tmp_path / "codegen.sock")
+    server = make_server(path, tasks)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield path
+    server.shutdown()
+    server.server_close()
+    tasks.close()
+
+def test_submitted_tasks_run_in_order_on_the_same_warm_worker(daemon, tmp_path):
+    first = send_request(daemon, {"action": "submit", "task": {**CONFIG, "prompt": "pass"}})
+    second = send_request(daemon, {"action": "submit", "task": {**CONFIG, "id": "b", "prompt": "fail"}})
+    assert (first["id"], second["id"]) == ("task-1", "b")
+    assert first["workdir"] == str(tmp_path / "runs" / "task-1")
+
+    done = send_request(daemon, {"action": "wait", "id": "task-1"})
+    assert done["status"] == "done" and done["result"]["status"] == "yes"
+    assert os.path.exists(tmp_path / "runs" / "task-1" / "host.log")
+    other = send_request(daemon, {"action": "wait", "id": "b"})["result"]
+    assert other["status"] == "no" and other["explanation"] == done["result"]["explanation"]
+    assert send_request(daemon, {"action": "status", "id": "b"})["status"] == "done"
+
+def test_bad_requests_get_an_error_reply(daemon):
+    with pytest.raises(SystemExit, match="Unknown task"):
+        send_request(daemon, {"action": "status", "id": "nope"})
+    with pytest.raises(SystemExit, match="Unknown action"):
+        send_request(daemon, {"action": "delete"})
+    send_request(daemon, {"action": "submit", "task": {"id": "a", "prompt": "pass"}})
+    with pytest.raises(SystemExit, match="already exists"):
+        send_request(daemon, {"action": "submit", "task": {"id": "a", "prompt": "pass"}})
+
+def test_a_second_daemon_does_not_take_over_the_socket(daemon):
+    with pytest.raises(SystemExit, match="already listening"):
+        make_server(daemon, None)
+
+def test_the_socket_lives_in_the_state_directory(tmp_path):
+    settings = settings_for({"state_dir": str(tmp_path), "daemon": {"workers": 2}})
+    assert settings["socket"] == str(tmp_path / "codegen.sock")
+    assert settings["workdir"] == str(tmp_path / "daemon_runs") and settings["workers"] == 2
+
+def test_the_client_does_not_load_the_gemini_libraries(tmp_path):
+    config = tmp_path / "config.json"
+    config.write_text('{"apikey": "", "state_dir": "%s"}' % tmp_path)
+    check = (
+        "import runpy, sys\n"
+        f"sys.argv = ['script.py', '--config', {str(config)!r}, '--status', 'task-1']\n"
+        "try:\n"
+        f"    runpy.run_path({os.path.join(ROOT, 'alpha', 'script.py')!r}, run_name='__main__')\n"
+        "except SystemExit as exit:\n"
+        "    print(exit)\n"
+        "print(sorted(name for name in sys.modules if name.startswith(('google.generativeai', 'google.api_core'))))\n"
+    )
+    output = subprocess.run([sys.executable, "-c", check], capture_output=True, text=True).stdout
+    assert "No daemon is listening" in output
+    assert output.strip().endswith("[]")
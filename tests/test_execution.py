@@ -0,0 +1,110 @@
+import asyncio
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from common import aio, execution, state
+from common.execution import InterpreterPool, compile_cached, execute_code, execute_code_async
+
+PROGRAM = """
+import sys
+counter = globals().get("counter", 0) + 1
+print(counter, "leftover" in sys.modules, __name__)
+sys.modules["leftover"] = sys
+print("warning", file=sys.stderr)
+"""
+
+@pytest.fixture
+def program(tmp_path):
+    path = tmp_path / "task_sample_1.py"
+    path.write_text(PROGRAM)
+    return str(path)
+
+def test_pooled_run_matches_a_fresh_process(program, monkeypatch):
+    fresh = aio.run(execute_code_async("python", program))
+    monkeypatch.setattr(execution, "interpreter_pool_size", 2)
+    try:
+        pooled = [aio.run(execute_code_async("python", program)) for _ in range(3)]
+    finally:
+        execution.close_interpreter_pools()
+        execution.interpreter_pools.clear()
+    # Every job gets a fresh interpreter: no state is left over from the one before
+    assert fresh == ("1 False __main__", "warning")
+    assert pooled == [fresh] * 3
+
+def test_pool_passes_stdin_and_the_exit_status(tmp_path):
+    path = tmp_path / "echo.py"
+    path.write_text("import sys\ndata = sys.stdin.read()\nprint(data.upper())\nsys.exit(3)\n")
+    pool = InterpreterPool("python", 1)
+    try:
+        assert pool.run(str(path), "hello") == ("HELLO\n", "", 3)
+    finally:
+        pool.close()
+
+def test_pool_runs_javascript(tmp_path):
+    if shutil.which("node") is None:
+        pytest.skip("node is not installed")
+    path = tmp_path / "task.js"
+    path.write_text("console.log(require.main === module, typeof seen);\nglobal.seen = 1;\n")
+    pool = InterpreterPool("js", 1)
+    try:
+        assert [pool.run(str(path))[0] for _ in range(2)] == ["true undefined\n"] * 2
+    finally:
+        pool.close()
+
+@pytest.fixture
+def builds(tmp_path, monkeypatch):
+    """Counts the compilations run against a build cache in a temporary state directory."""
+    if shutil.which("gcc") is None:
+        pytest.skip("gcc is not installed")
+    monkeypatch.setitem(state.state, "dir", str(tmp_path / "state"))
+    compilations = []
+    run = subprocess.run
+
+    def counting_run(command, *args, **kwargs):
+        if "-o" in command:
+            compilations.append(command)
+        return run(command, *args, **kwargs)
+
+    monkeypatch.setattr(execution.subprocess, "run", counting_run)
+    return compilations
+
+def write_program(path, text):
+    path.write_text(f'#include <stdio.h>\nint main(void) {{ puts("{text}"); return 0; }}\n')
+    return str(path)
+
+def test_an_unchanged_program_is_not_recompiled(tmp_path, builds):
+    first = write_program(tmp_path / "a.c", "one")
+    # The same source under another name hits the same binary
+    second = write_program(tmp_path / "b.c", "one")
+    assert compile_cached("c", first) == compile_cached("c", second)
+    assert len(builds) == 1
+    assert execute_code("c", second) == ("one", "")
+
+def test_distinct_programs_get_their_own_binaries(tmp_path, builds):
+    programs = [write_program(tmp_path / f"task_sample_{n}.c", str(n)) for n in range(3)]
+
+    async def run_all():
+        return await asyncio.gather(*(execute_code_async("c", program) for program in programs))
+
+    assert aio.run(run_all()) == [("0", ""), ("1", ""), ("2", "")]
+    assert len({compile_cached("c", program) for program in programs}) == 3
+    assert len(builds) == 3
+
+def test_least_recently_used_binaries_are_evicted(tmp_path, builds, monkeypatch):
+    monkeypatch.setitem(execution.build_cache, "max_entries", 2)
+    first, second, third = (write_program(tmp_path / f"{n}.c", str(n)) for n in range(3))
+    oldest = compile_cached("c", first)
+    os.utime(oldest, (0, 0))
+    compile_cached("c", second)
+    compile_cached("c", third)
+    assert not os.path.exists(oldest)
+    assert len(os.listdir(os.path.dirname(oldest))) == 2
+
+def test_compile_errors_are_reported(tmp_path, builds):
+    path = tmp_path / "broken.c"
+    path.write_text("int main(void) { return }\n")
+    output, error = execute_code("c", str(path))
+    assert output == "" and error.startswith("Compilation Error:") and "error" in error
@@ -0,0 +1,81 @@
+from types import SimpleNamespace
+
+from common import aio, samples
+from common.harness import find_entry_point, run_harness, run_harness_shards
+
+TASK = """
+print("loading")
+
+def add(a, b):
+    return a + b
+
+def shout(text):
+    print(text.upper())
+"""
+
+SAMPLES = [
+    {"input": "1, 2", "expected_output": "3"},
+    {"input": "'a', 'b'", "expected_output": "ab"},
+    {"input": "1, 'b'", "expected_output": "1b"},
+]
+
+class FakeAgent:
+    def __init__(self, reply):
+        self.reply = reply
+        self.messages = []
+
+    def send_message(self, message):
+        self.messages.append(message)
+        return SimpleNamespace(text=self.reply)
+
+def test_every_sample_runs_in_one_process(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "task.py").write_text(TASK)
+    results = aio.run(run_harness("task.py", "add", SAMPLES))
+    assert [result["passed"] for result in results] == [True, True, False]
+    assert results[1]["actual_output"] == "ab"
+    # The failing sample keeps its own traceback and doesn't stop the others
+    assert "TypeError" in results[2]["error"] and not results[0]["error"]
+
+def test_printed_output_is_used_when_nothing_is_returned(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "task.py").write_text(TASK)
+    results = aio.run(run_harness("task.py", "shout", [{"input": "'hi'", "expected_output": "HI"}]))
+    assert results[0]["passed"]
+
+def test_a_task_that_fails_to_load_fails_every_sample(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "task.py").write_text("raise ImportError('broken')\n")
+    results = aio.run(run_harness("task.py", "add", SAMPLES))
+    assert not any(result["passed"] for result in results)
+    assert all("broken" in result["error"] for result in results)
+
+def test_a_single_public_function_is_the_entry_point():
+    agent = FakeAgent("unused")
+    assert find_entry_point("def _helper(): pass\ndef main(): pass\ndef solve(x): pass\n", "1", agent) == "solve"
+    assert find_entry_point("x = 1\n", "1", agent) is None
+    assert not agent.messages
+
+def test_the_agent_picks_between_several_functions():
+    code = "def add(a, b): pass\ndef sub(a, b): pass\n"
+    assert find_entry_point(code, "1, 2", FakeAgent("`sub(a, b)`")) == "sub"
+    # A name that isn't defined in the code is not used
+    assert find_entry_point(code, "1, 2", FakeAgent("mul")) is None
+
+def test_shards_run_in_processes_of_their_own(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setitem(samples.sample_execution, "shard_size", 1)
+    (tmp_path / "task.py").write_text(TASK + "\nimport os\ndef pid(*args):\n    return os.getpid()\n")
+    results = aio.run(run_harness_shards("task.py", "pid", SAMPLES))
+    assert [result["sample_index"] for result in results] == [1, 2, 3]
+    assert len({result["actual_output"] for result in results}) == 3
+    # Every shard runs in a directory of its own
+    assert sorted(str(path.relative_to(tmp_path)) for path in tmp_path.glob("task_harness_*/task_harness.py")) == [
+        "task_harness_1/task_harness.py", "task_harness_2/task_harness.py", "task_harness_3/task_harness.py",
+    ]
+
+def test_a_shard_keeps_the_sample_numbers_of_the_whole_suite(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "task.py").write_text(TASK)
+    results = aio.run(run_harness("task.py", "add", SAMPLES, indices=[2, 0]))
+    assert [(result["sample_index"], result["passed"]) for result in results] == [(3, False), (1, True)]
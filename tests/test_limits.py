@@ -0,0 +1,89 @@
+import subprocess
+import time
+
+import pytest
+
+from common import aio, limits, results
+from common.execution import InterpreterPool, execute_code_async
+from common.harness import run_harness
+from common.limits import limited, output_diverged
+
+def run(tmp_path, source, expected_output=None, **settings):
+    """Runs a Python program under the given execution limits; returns (stdout, stderr, seconds)."""
+    path = tmp_path / "program.py"
+    path.write_text(source)
+    saved = dict(limits.execution_limits)
+    limits.execution_limits.update(settings)
+    try:
+        started = time.monotonic()
+        stdout, stderr = aio.run(execute_code_async("python", str(path), expected_output))
+        return stdout, stderr, time.monotonic() - started
+    finally:
+        limits.execution_limits.update(saved)
+
+def test_the_wrapper_sets_the_rlimits_and_execs_the_program():
+    command = limited(["sh", "-c", "ulimit -t; ulimit -d; echo $$"], {"cpu_seconds": 7, "memory_mb": 64})
+    assert command[:2] == ["/bin/sh", "-c"]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    cpu, data, pid = process.communicate()[0].split()
+    assert (cpu, data) == ("7", str(64 * 1024))
+    # The program replaced the wrapper, so killing the process kills the program
+    assert int(pid) == process.pid
+    assert limited(["python"], {"cpu_seconds": 0, "memory_mb": 0}) == ["python"]
+
+def test_a_program_is_killed_at_the_timeout(tmp_path):
+    stdout, stderr, seconds = run(tmp_path, "import time\ntime.sleep(30)\n", timeout=0.5)
+    assert stdout == "" and stderr.endswith("Execution stopped: timed out after 0.5s.")
+    assert seconds < 5
+
+def test_a_program_is_killed_at_the_cpu_limit(tmp_path):
+    _, _, seconds = run(tmp_path, "while True:\n    pass\n", timeout=0, cpu_seconds=1)
+    assert seconds < 10
+
+def test_runaway_output_is_capped(tmp_path):
+    stdout, stderr, seconds = run(tmp_path, "while True:\n    print('x' * 1000)\n", max_output_bytes=10000)
+    assert stdout == ""  # A killed program's exit status is non-zero
+    assert stderr.endswith("Execution stopped: stdout exceeded 10000 bytes.")
+
+def test_a_sample_is_killed_once_its_output_diverges(tmp_path, monkeypatch):
+    monkeypatch.setitem(results.comparison, "normalizers", ["whitespace"])
+    source = "import time\nprint('wrong')\ntime.sleep(30)\n"
+    _, stderr, seconds = run(tmp_path, source, expected_output="right")
+    assert stderr.endswith("Execution stopped: output can no longer match the expected output.")
+    assert seconds < 5
+    _, stderr, _ = run(tmp_path, source, expected_output="right", kill_on_divergence=False, timeout=0.5)
+    assert "timed out" in stderr
+
+@pytest.mark.parametrize("output, expected, normalizers, diverged", [
+    ("[1, 2", "[1, 2, 3]", ["whitespace"], False),
+    ("[1,\n 2", "[1, 2, 3]", ["whitespace"], False),
+    ("[1, 3", "[1, 2, 3]", ["whitespace"], True),
+    # Structural normalizers may still match output that differs in form, such as (1, 2, 3)
+    ("(1, 2, 3)", "[1, 2, 3]", ["literal"], False),
+    ("x" * 200, "[1, 2, 3]", ["literal"], True),
+])
+def test_output_diverged(monkeypatch, output, expected, normalizers, diverged):
+    monkeypatch.setitem(results.comparison, "normalizers", normalizers)
+    assert output_diverged(output, expected) is diverged
+
+def test_pooled_programs_run_under_the_limits(tmp_path, monkeypatch):
+    monkeypatch.setitem(results.comparison, "normalizers", ["whitespace"])
+    monkeypatch.setitem(limits.execution_limits, "timeout", 5)
+    path = tmp_path / "loop.py"
+    path.write_text("print('wrong', flush=True)\nwhile True:\n    pass\n")
+    pool = InterpreterPool("python", 1)
+    try:
+        stdout, stderr, returncode = pool.run(str(path), expected_output="right")
+    finally:
+        pool.close()
+    assert returncode != 0
+    assert stderr.endswith("Execution stopped: output can no longer match the expected output.")
+
+def test_each_harness_sample_has_its_own_timeout(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setitem(limits.execution_limits, "timeout", 0.5)
+    (tmp_path / "task.py").write_text("import time\n\ndef wait(seconds):\n    time.sleep(seconds)\n    return seconds\n")
+    samples = [{"input": "30", "expected_output": "30"}, {"input": "0", "expected_output": "0"}]
+    slow, fast = aio.run(run_harness("task.py", "wait", samples))
+    assert slow["error"] == "Execution stopped: Sample timed out after 0.5s." and not slow["passed"]
+    assert fast["passed"]
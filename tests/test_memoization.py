@@ -0,0 +1,88 @@
+"""Recognizing code that was already judged, and reusing sample results."""
+from common import memo, stages
+from common.memo import code_key, execution_key, recall_execution, remember_execution
+
+SAMPLES = [{"input": "3", "expected_output": "3"}]
+AGENT_COUNTS = {"stable": 3, "alpha": 4, "beta": 5}
+CODE = "```python\ndef solve(value):\n    return value\n```"
+
+def run(script, max_iterations, samples=SAMPLES, **options):
+    variant = script.__name__.split("_")[0]
+    return script.host(
+        "Return the input unchanged.", "python", samples, max_iterations=max_iterations,
+        agents=["fake"] * AGENT_COUNTS[variant], **options,
+    )
+
+def test_python_key_ignores_comments_and_layout():
+    code = "def solve(value):\n    return value + 1\n"
+    reformatted = "# Adds one\ndef solve( value ):\n\n    return (value + 1)  # done\n"
+    assert code_key("python", code) == code_key("python", reformatted)
+
+def test_python_key_changes_with_the_program():
+    code = "def solve(value):\n    return value + 1\n"
+    assert code_key("python", code) != code_key("python", code.replace("+ 1", "+ 2"))
+    assert code_key("python", code) != code_key("python", code.replace("value", "x"))
+
+def test_other_languages_ignore_trailing_whitespace_and_blank_lines():
+    code = "int main() {\n  return 0;\n}"
+    assert code_key("c", code) == code_key("c", "\nint main() {   \n\n  return 0;\n}\n\n")
+    assert code_key("c", code) != code_key("c", code.replace("  return", "return"))
+    assert code_key("c", "x") != code_key("js", "x")
+
+def test_python_that_does_not_parse_is_compared_as_text():
+    broken = "def solve(value:\n    return value"
+    assert code_key("python", broken) == code_key("python", broken + "  \n\n")
+    assert code_key("python", broken) != code_key("python", broken.replace("    ", "  "))
+
+def test_repeated_code_gets_its_earlier_verdict(script, fake_backend, capsys):
+    fake_backend(responses={"Agent 1": [CODE], "Agent 2": ["No, it is wrong"]})
+    assert run(script, 3)[0] == "no"
+    output = capsys.readouterr().out
+    # Agent 2 only saw the program once; the repeats were rejected without it
+    assert output.count("Agent 2 Decision:") == 1
+    assert output.count("Agent 1 repeated code that was already rejected") == 2
+
+def test_agent_1_is_told_it_sent_a_duplicate(fake_backend, monkeypatch):
+    from conftest import load_variant
+
+    stable = load_variant("stable")
+    fake_backend(responses={"Agent 1": [CODE], "Agent 2": ["No, it is wrong"]})
+    workflow = stable.StableWorkflow("Return the input unchanged.", "python", SAMPLES, ["fake"] * 3)
+    stable.aio.run(workflow.run(2))
+    assert workflow.previous[0].rejected == "repeat"
+    assert workflow.request(0).count("Your code is a duplicate") == 1
+    assert "Agent 2 rejected the code: no, it is wrong" in workflow.request(0)
+
+def test_memoization_can_be_turned_off(script, fake_backend, monkeypatch, capsys):
+    monkeypatch.setitem(memo.memoization, "enabled", False)
+    fake_backend(responses={"Agent 1": [CODE], "Agent 2": ["No", "Yes"]})
+    assert run(script, 2)[0] == "yes"
+    assert "repeated code" not in capsys.readouterr().out
+
+def test_samples_run_on_the_same_code_are_not_run_again(sample_script, fake_backend, monkeypatch, capsys):
+    fake_backend(responses={"Agent 1": [CODE]})
+    monkeypatch.setitem(stages.pipeline, "speculative", False)
+    samples = [{"input": "3", "expected_output": "3"}, {"input": "4", "expected_output": "4"}]
+    assert run(sample_script, 1, samples)[0] == "yes"
+    capsys.readouterr()
+    # The same task again, as a repeated daemon task would be: the code comes back unchanged
+    assert run(sample_script, 1, samples)[0] == "yes"
+    output = capsys.readouterr().out
+    assert output.count("was already run on the same code") == 2
+    assert "Modified Code for Sample" not in output
+
+def test_harness_results_are_reused(sample_script, fake_backend, capsys):
+    fake_backend(responses={"Agent 3": ['{"response": "no", "explanation": "Try again."}']})
+    samples = [{"input": "3", "expected_output": "3"}, {"input": "4", "expected_output": "4"}]
+    run(sample_script, 1, samples, harness=True, entry_point="solve")
+    results = list(memo.execution_memo.values())
+    assert [result["passed"] for result in results] == [True, True]
+    key = execution_key("python", "def solve(value):\n    return value", samples[1], "solve")
+    assert recall_execution(key, 1)["sample_index"] == 2
+
+def test_the_execution_cache_is_bounded(monkeypatch):
+    monkeypatch.setitem(memo.memoization, "max_executions", 2)
+    for n in range(3):
+        remember_execution(("code", str(n), str(n), None), {"sample_index": 1, "passed": True})
+    assert recall_execution(("code", "0", "0", None), 0) is None
+    assert recall_execution(("code", "2", "2", None), 4)["sample_index"] == 5
@@ -0,0 +1,74 @@
+import types
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from common import agents, ratelimit
+from common.ratelimit import RateLimiter, RateLimitExceeded, retry_delay
+
+@pytest.fixture
+def retry_policy(monkeypatch):
+    monkeypatch.setitem(ratelimit.retry_policy, "max_retries", 2)
+    monkeypatch.setitem(ratelimit.retry_policy, "base_delay", 2)
+    monkeypatch.setitem(ratelimit.retry_policy, "max_delay", 10)
+    return ratelimit.retry_policy
+
+def test_bucket_waits_only_once_the_quota_is_used_up():
+    limiter = RateLimiter(requests_per_minute=2, tokens_per_minute=1000)
+    assert limiter.reserve(100) == 0
+    assert limiter.reserve(100) == 0
+    # The third request goes one request into debt, which takes half a minute to refill
+    assert limiter.reserve(100) == pytest.approx(30, abs=0.1)
+
+def test_token_debt_is_waited_off_and_settled_with_real_usage():
+    limiter = RateLimiter(requests_per_minute=100, tokens_per_minute=600)
+    assert limiter.reserve(600) == 0
+    assert limiter.reserve(60) == pytest.approx(6, abs=0.1)
+    # The first call used only 300 tokens, which pays the debt back
+    limiter.settle(600, 300)
+    assert limiter.reserve(60) == 0
+
+def test_retry_delay_prefers_the_server_hint(retry_policy):
+    hint = types.SimpleNamespace(retry_delay=types.SimpleNamespace(seconds=7, nanos=500_000_000))
+    error = google_exceptions.TooManyRequests("quota", details=[hint])
+    assert 7.5 <= retry_delay(error, 0) <= 8.5
+
+def test_retry_delay_backs_off_exponentially_up_to_the_cap(retry_policy):
+    error = google_exceptions.TooManyRequests("quota")
+    for attempt, cap in [(0, 2), (1, 4), (2, 8), (5, 10)]:
+        delays = [retry_delay(error, attempt) for _ in range(20)]
+        assert all(cap / 2 <= delay <= cap for delay in delays)
+
+class Chat:
+    def __init__(self, failures):
+        self.failures = failures
+        self.history = []
+        self.calls = 0
+
+    def send_message(self, content):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise google_exceptions.ResourceExhausted("quota")
+        return types.SimpleNamespace(text="ok", usage_metadata=None)
+
+def test_agent_retries_quota_errors_within_the_budget(retry_policy, monkeypatch):
+    monkeypatch.setattr(agents, "retry_delay", lambda error, attempt: 0)
+    chat = Chat(failures=2)
+    assert agents.Agent(chat, "test-model").send_message("hi").text == "ok"
+    assert chat.calls == 3
+
+    chat = Chat(failures=3)
+    with pytest.raises(RateLimitExceeded):
+        agents.Agent(chat, "test-model").send_message("hi")
+    assert chat.calls == 3
+
+def test_other_errors_are_not_retried(retry_policy):
+    class Broken(Chat):
+        def send_message(self, content):
+            self.calls += 1
+            raise google_exceptions.InvalidArgument("bad request")
+
+    chat = Broken(failures=0)
+    with pytest.raises(google_exceptions.InvalidArgument):
+        agents.Agent(chat, "test-model").send_message("hi")
+    assert chat.calls == 1
@@ -0,0 +1,86 @@
+import pytest
+
+from common import backends
+from common.refinement import apply_diff, refinement, refinement_request
+
+CODE = "a\nb\nc"
+FIRST = "```python\ndef solve(value):\n    return value + 1\n```"
+DIFF = "```diff\n--- a/task.py\n+++ b/task.py\n@@ -1,2 +1,2 @@\n def solve(value):\n-    return value + 1\n+    return value\n```"
+AGENT_COUNTS = {"stable": 3, "alpha": 4, "beta": 5}
+
+def test_applies_a_hunk_with_file_headers():
+    diff = "diff --git a/task.py b/task.py\nindex 1..2\n--- a/task.py\n+++ b/task.py\n@@ -1,3 +1,3 @@\n a\n-b\n+x\n c"
+    assert apply_diff(CODE, diff) == "a\nx\nc"
+
+def test_header_prefixes_inside_a_hunk_are_changes():
+    assert apply_diff(CODE, "@@ -1,3 +1,3 @@\n a\n-b\n+++b\n c") == "a\n++b\nc"
+    assert apply_diff("a\n--b\nc", "@@ -1,3 +1,3 @@\n a\n---b\n+b\n c") == "a\nb\nc"
+    assert apply_diff(CODE, "@@ -1,3 +1,4 @@\n a\n b\n+index = 0\n c") == "a\nb\nindex = 0\nc"
+
+def test_headers_of_a_second_file_start_a_new_section():
+    diff = "--- a/f\n+++ b/f\n@@ -1,2 +1,2 @@\n-a\n+x\n b\n--- a/f\n+++ b/f\n@@ -3 +3 @@\n-c\n+y"
+    assert apply_diff(CODE, diff) == "x\nb\ny"
+
+def test_stale_line_numbers_still_apply():
+    assert apply_diff(CODE, "@@ -10,2 +10,2 @@\n b\n-c\n+z") == "a\nb\nz"
+
+def test_mismatched_or_empty_diffs_are_rejected():
+    with pytest.raises(ValueError, match="does not match"):
+        apply_diff(CODE, "@@ -1 +1 @@\n-q\n+r")
+    with pytest.raises(ValueError, match="no hunks"):
+        apply_diff(CODE, "--- a/f\n+++ b/f")
+    with pytest.raises(ValueError, match="before the first hunk"):
+        apply_diff(CODE, " a\n-b\n+++b\n c")
+
+def test_the_request_carries_the_previous_code_and_its_failures(monkeypatch):
+    assert refinement_request("python", "Add one.") == "Write python code for the following task. Only return the code:\nAdd one."
+    request = refinement_request("python", "Add one.", "x = 1", "Static checks failed:\nboom" + "!" * 5000)
+    assert "x = 1" in request and "Static checks failed:\nboom" in request and "unified diff" in request
+    assert len(request) < 2200
+    monkeypatch.setitem(refinement, "diffs", False)
+    assert "complete corrected code" in refinement_request("python", "Add one.", "x = 1", "boom")
+
+def recorded_requests(monkeypatch):
+    """Records every request sent to Agent 1 of the fake backend."""
+    requests = []
+    reply = backends.FakeChat.reply
+
+    def recording_reply(chat, content):
+        if chat.name == "Agent 1":
+            requests.append("\n".join(str(part) for part in (content if isinstance(content, list) else [content])))
+        return reply(chat, content)
+
+    monkeypatch.setattr(backends.FakeChat, "reply", recording_reply)
+    return requests
+
+def test_agent_1_fixes_rejected_code_with_a_diff(script, fake_backend, monkeypatch):
+    fake_backend(responses={"Agent 1": [FIRST, DIFF], "Agent 2": ["No", "Yes"]})
+    requests = recorded_requests(monkeypatch)
+    variant = script.__name__.split("_")[0]
+    status, code, _ = script.host("Return the input.", "python", [], max_iterations=2, agents=["fake"] * AGENT_COUNTS[variant])
+    assert status == "yes"
+    assert code == "def solve(value):\n    return value"
+    assert "Agent 2 rejected the code: no" in requests[1] and "return value + 1" in requests[1]
+
+def test_a_diff_that_does_not_apply_is_replaced_by_complete_code(script, fake_backend, monkeypatch, capsys):
+    stale = "```diff\n@@ -1 +1 @@\n-def other():\n+def solve(value):\n```"
+    fixed = "```python\ndef solve(value):\n    return value\n```"
+    fake_backend(responses={"Agent 1": [FIRST, stale, fixed], "Agent 2": ["No", "Yes"]})
+    requests = recorded_requests(monkeypatch)
+    variant = script.__name__.split("_")[0]
+    status, code, _ = script.host("Return the input.", "python", [], max_iterations=2, agents=["fake"] * AGENT_COUNTS[variant])
+    assert (status, code) == ("yes", "def solve(value):\n    return value")
+    assert "diff did not apply" in capsys.readouterr().out
+    assert "Your diff did not apply" in requests[2]
+
+def test_failed_samples_are_described_to_agent_1(sample_script, fake_backend, monkeypatch):
+    fake_backend(responses={"Agent 1": [FIRST, DIFF]})
+    requests = recorded_requests(monkeypatch)
+    variant = sample_script.__name__.split("_")[0]
+    status, _, _ = sample_script.host(
+        "Return the input.", "python", [{"input": "3", "expected_output": "3"}], max_iterations=2,
+        agents=["fake"] * AGENT_COUNTS[variant], harness=True, entry_point="solve",
+    )
+    assert status == "yes"
+    assert "Failed: sample 1 input 3\nexpected '3', got '4'" in requests[1]
+    assert "Verdict: 1 of 1 samples failed" in requests[1]
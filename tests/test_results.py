@@ -0,0 +1,130 @@
+"""Comparing sample outputs, deciding clear results and summarizing them for Agent 3."""
+import pytest
+
+from common import backends, results, samples, summary
+from common.summary import summarize_samples
+
+def result(index, passed, actual="", expected="", error="", sample_input="1"):
+    return {
+        "sample_index": index, "input": sample_input, "expected_output": expected,
+        "actual_output": actual, "passed": passed, "error": error,
+    }
+
+@pytest.mark.parametrize("actual, expected", [
+    ("1 2\n3", "1  2 3"),
+    ("(1, 2)", "[1, 2]"),
+    ("{'a': 1}", '{"a": 1}'),
+    ("0.30000000000000004", "0.3"),
+    ("[1.0000000001, 2]", "[1, 2]"),
+    ("{3, 1, 2}", "{1, 2, 3}"),
+])
+def test_equivalent_outputs_match(actual, expected):
+    assert results.outputs_match(actual, expected)
+
+@pytest.mark.parametrize("actual, expected", [
+    ("[2, 1]", "[1, 2]"),
+    ("0.31", "0.3"),
+    ("True", "1"),
+    ("[1, 2", "[1, 2]"),
+    ("", "0"),
+])
+def test_different_outputs_do_not_match(actual, expected):
+    assert not results.outputs_match(actual, expected)
+
+def test_unordered_normalizer_is_opt_in(monkeypatch):
+    monkeypatch.setitem(results.comparison, "normalizers", ["unordered"])
+    assert results.outputs_match("[2, 1]", "[1, 2]")
+    assert not results.outputs_match("1 2", "1  2")
+
+def test_unknown_normalizers_are_rejected():
+    with pytest.raises(ValueError, match="bogus"):
+        results.configure_compare({"normalizers": ["bogus"]})
+
+def test_clear_results_are_decided_without_agent_3():
+    assert results.deterministic_verdict([result(1, True, "1", "1"), result(2, True, "2", "2")]) == (
+        "yes", "All 2 samples produced the expected output."
+    )
+    decision, explanation = results.deterministic_verdict([
+        result(1, True, "1", "1"), result(2, False, "3", "2", error="Traceback\nValueError"),
+    ])
+    assert decision == "no"
+    assert explanation.startswith("1 of 2 samples failed. sample 2: expected '2', got '3' (error: ")
+
+def test_unclear_results_go_to_agent_3(monkeypatch):
+    assert results.deterministic_verdict([]) is None
+    # A failed sample that printed nothing and raised nothing may be waiting on input
+    assert results.deterministic_verdict([result(1, False, "", "2")]) is None
+    monkeypatch.setitem(results.comparison, "skip_agent_3", False)
+    assert results.deterministic_verdict([result(1, True, "1", "1")]) is None
+
+def test_ambiguous_results_still_ask_agent_3(sample_script, fake_backend):
+    # Agent 4 writes a program that prints nothing, so the failure needs Agent 3's judgment
+    fake_backend(responses={"Agent 4": ["```python\npass\n```"], "Agent 3": ['{"response": "no", "explanation": "silent"}']})
+    status, _, explanation = sample_script.host(
+        "Return the input unchanged.", "python", [{"input": "3", "expected_output": "3"}], max_iterations=1, agents=[]
+    )
+    assert status == "no"
+    # Every agent, Agent 3 included, was called once
+    assert backends.fake_stats["calls"] == {"alpha_script": 4, "beta_script": 5}[sample_script.__name__]
+
+def samples_of(sample_results):
+    return [{"input": result["input"], "expected_output": result["expected_output"]} for result in sample_results]
+
+def test_summary_groups_identical_failures():
+    sample_results = [result(1, True, "1", "1")] + [
+        result(index, False, "0", "1", sample_input=str(index)) for index in range(2, 7)
+    ]
+    text = summarize_samples(samples_of(sample_results), sample_results)
+    assert text.startswith("1 of 6 samples passed. Passed: 1.")
+    assert text.count("expected '1', got '0'") == 1
+    assert "sample 2 input 2; sample 3 input 3; sample 4 input 4 and 2 more samples" in text
+
+def test_summary_reduces_outputs_and_errors(monkeypatch):
+    monkeypatch.setitem(summary.summaries, "error_lines", 2)
+    expected = "\n".join(map(str, range(50)))
+    actual = expected.replace("\n25\n", "\n-25\n")
+    error = "\n".join(["Traceback", "  File x"] + ["RecursionError"] * 100)
+    sample_results = [result(1, False, actual, expected, error=error)]
+    text = summarize_samples(samples_of(sample_results), sample_results)
+    assert "-25\n+-25" in text
+    assert "RecursionError  [x100]" in text
+    assert "[1 lines omitted]" in text
+    assert len(text) < 1000
+
+def test_summary_stays_within_its_token_budget(monkeypatch):
+    monkeypatch.setitem(summary.summaries, "max_tokens", 100)
+    sample_results = [result(index, False, f"wrong {index}" * 20, "right") for index in range(1, 41)]
+    text = summarize_samples(samples_of(sample_results), sample_results)
+    assert len(text) <= 100 * 4
+    assert "more failure groups omitted]" in text
+
+def test_summaries_count_the_bytes_they_save(monkeypatch):
+    monkeypatch.setattr(summary, "summary_stats", {"summaries": 0, "json_bytes": 0, "summary_bytes": 0})
+    sample_results = [result(index, False, "x" * 1000, "y", error="boom") for index in range(1, 11)]
+    summarize_samples(samples_of(sample_results), sample_results)
+    stats = summary.summary_stats
+    assert stats["summaries"] == 1 and stats["summary_bytes"] * 10 < stats["json_bytes"]
+
+def test_a_stopped_run_is_judged_against_every_sample():
+    sample_results = [result(1, False, "0", "1"), result(2, False, "0", "2")]
+    decision, explanation = results.deterministic_verdict(sample_results, total=10)
+    assert decision == "no"
+    assert explanation.startswith("2 of 10 samples failed. 8 samples were skipped after the failure limit was reached.")
+    suite = samples_of(sample_results) + [{"input": "x", "expected_output": "x"}] * 8
+    text = summarize_samples(suite, sample_results)
+    assert text.startswith("0 of 10 samples passed. 8 samples were skipped")
+
+def test_the_judge_gets_the_partial_results_of_a_stopped_run(sample_script, fake_backend, monkeypatch, capsys):
+    monkeypatch.setitem(samples.sample_execution, "max_failures", 1)
+    monkeypatch.setitem(samples.sample_execution, "workers", 1)
+    monkeypatch.setitem(samples.sample_execution, "shard_size", 1)
+    fake_backend(responses={"Agent 1": ["```python\ndef solve(value):\n    return value + 1\n```"]})
+    many = [{"input": str(n), "expected_output": str(n)} for n in range(20)]
+    status, _, _ = sample_script.host(
+        "Return the input.", "python", many, max_iterations=1, agents=[], harness=True, entry_point="solve",
+    )
+    assert status == "no"
+    output = capsys.readouterr().out
+    assert "Explanation: 1 of 20 samples failed. 19 samples were skipped" in output
+    # The shard that started as the first one failed was killed, and the rest never started
+    assert "task_harness_2/" in output and "task_harness_3/" not in output
@@ -0,0 +1,84 @@
+import sqlite3
+import threading
+
+from common import runstore
+from common.runstore import RunStore
+
+SAMPLES = [{"input": "3", "expected_output": "3"}]
+AGENT_COUNTS = {"stable": 3, "alpha": 4, "beta": 5}
+
+def open_store(tmp_path, monkeypatch, **settings):
+    for key, value in settings.items():
+        monkeypatch.setitem(runstore.run_store_settings, key, value)
+    monkeypatch.setattr(runstore, "run_store", RunStore(str(tmp_path / "runs.sqlite")))
+    return runstore.run_store
+
+def run(script, max_iterations):
+    variant = script.__name__.split("_")[0]
+    return script.host(
+        "Return the input unchanged.", "python", SAMPLES, max_iterations=max_iterations,
+        agents=["fake"] * AGENT_COUNTS[variant],
+    )
+
+def test_runs_their_events_and_results_are_stored(script, fake_backend, tmp_path, monkeypatch):
+    store = open_store(tmp_path, monkeypatch)
+    fake_backend(responses={"Agent 2": ["No", "Yes"]})
+    assert run(script, 3)[0] == "yes"
+    connection = sqlite3.connect(store.path)
+    assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    [(run_id, prompt)] = connection.execute("SELECT id, prompt FROM runs").fetchall()
+    assert prompt == "Return the input unchanged."
+    iterations = {iteration for (iteration,) in connection.execute("SELECT iteration FROM events WHERE run = ?", (run_id,))}
+    assert iterations == {1, 2}
+    assert connection.execute("SELECT status, iterations, model FROM results").fetchall() == [("yes", 2, "fake")]
+    assert store.median_iterations() == {"fake": (1, 2)}
+
+def test_failed_runs_are_not_counted_as_successes(script, fake_backend, tmp_path, monkeypatch):
+    store = open_store(tmp_path, monkeypatch)
+    fake_backend(responses={"Agent 2": ["No"]})
+    assert run(script, 2)[0] == "no"
+    connection = sqlite3.connect(store.path)
+    assert connection.execute("SELECT status, iterations FROM results").fetchall() == [("no", 2)]
+    assert store.median_iterations() == {}
+
+def test_beta_keeps_only_the_last_iterations_in_memory(fake_backend, tmp_path, monkeypatch):
+    from conftest import load_variant
+
+    beta = load_variant("beta")
+    store = open_store(tmp_path, monkeypatch, memory_iterations=2)
+    fake_backend(responses={"Agent 2": ["No"]})
+    workflow = beta.BetaWorkflow("Return the input unchanged.", "python", SAMPLES, ["fake"] * 5)
+    beta.aio.run(workflow.run(4))
+    assert {entry["iteration"] for entry in workflow.conversation_log.entries} == {3, 4}
+    # Older iterations are still in the store, and their summaries stand in for them in prompts
+    connection = sqlite3.connect(store.path)
+    assert {iteration for (iteration,) in connection.execute("SELECT DISTINCT iteration FROM events")} == {1, 2, 3, 4}
+    assert connection.execute("SELECT COUNT(*) FROM events WHERE agent LIKE '%Agent 2%'").fetchone()[0] >= 4
+    assert workflow.conversation_log.for_agent(1)[0].startswith("Iteration 1 summary:")
+
+def test_the_store_can_be_turned_off(script, fake_backend, monkeypatch):
+    monkeypatch.setattr(runstore, "run_store", None)
+    fake_backend(responses={"Agent 2": ["Yes"]})
+    assert run(script, 1)[0] == "yes"
+
+def test_concurrent_writers(tmp_path):
+    path = str(tmp_path / "runs.sqlite")
+    errors = []
+
+    def write():
+        try:
+            store = RunStore(path)
+            for _ in range(20):
+                run_id = store.start_run("Workflow", "prompt", "python", ["fake"])
+                store.append(run_id, 1, 0, "Agent 1", "code")
+                store.finish_run(run_id, "yes", 1, "fake")
+        except sqlite3.Error as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert RunStore(path).median_iterations() == {"fake": (80, 1)}
@@ -0,0 +1,86 @@
+import asyncio
+import threading
+import time
+
+from common import aio, samples
+from common.samples import failure_order, record_sample_history, run_samples_async, sample_result
+
+SAMPLES = [{"input": str(n), "expected_output": str(n)} for n in range(6)]
+
+def test_results_keep_sample_order_under_the_concurrency_cap():
+    running = 0
+    peak = 0
+
+    async def process(i, sample):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        # Later samples finish first
+        await asyncio.sleep(0.01 * (len(SAMPLES) - i))
+        running -= 1
+        return sample_result(i, sample, sample["input"] + "\n")
+
+    results = aio.run(run_samples_async(SAMPLES, process, 2))
+    assert [result["sample_index"] for result in results] == [1, 2, 3, 4, 5, 6]
+    assert all(result["passed"] for result in results)
+    assert peak == 2
+
+def test_failed_samples_count_in_the_summary():
+    results = [
+        sample_result(0, SAMPLES[0], "0"),
+        sample_result(1, SAMPLES[1], "2"),
+        sample_result(2, SAMPLES[2], error="Quota exhausted", passed=False),
+    ]
+    summary = samples.test_summary(SAMPLES[:3], results)
+    assert (summary["total_samples"], summary["passed_tests"], summary["failed_tests"]) == (3, 1, 2)
+
+def test_every_run_uses_the_same_event_loop():
+    async def current_loop():
+        return asyncio.get_running_loop()
+
+    first = aio.run(current_loop())
+    second = aio.run(current_loop())
+    assert first is second and first.is_running()
+    # Other threads share it too
+    loops = []
+    thread = threading.Thread(target=lambda: loops.append(aio.run(current_loop())))
+    thread.start()
+    thread.join()
+    assert loops == [first]
+
+def test_samples_that_failed_before_run_first():
+    record_sample_history([sample_result(4, SAMPLES[4], "wrong"), sample_result(1, SAMPLES[1], "1")])
+    record_sample_history([sample_result(4, SAMPLES[4], "wrong"), sample_result(2, SAMPLES[2], "wrong")])
+    assert failure_order(SAMPLES)[:2] == [4, 2]
+    started = []
+
+    async def process(i, sample):
+        started.append(i)
+        return sample_result(i, sample, sample["input"])
+
+    aio.run(run_samples_async(SAMPLES, process, 1))
+    assert started == [4, 2, 0, 1, 3, 5]
+
+def test_samples_stop_once_the_failure_budget_is_spent(monkeypatch):
+    monkeypatch.setitem(samples.sample_execution, "max_failures", 2)
+    cancelled = []
+
+    async def process(i, sample):
+        # Samples 0 and 1 fail at once; the others would take a while
+        if i < 2:
+            return sample_result(i, sample, "wrong")
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(i)
+            raise
+        return sample_result(i, sample, sample["input"])
+
+    started = time.perf_counter()
+    results = aio.run(run_samples_async(SAMPLES, process, 3))
+    assert time.perf_counter() - started < 1
+    assert [result["sample_index"] for result in results] == [1, 2]
+    # Sample 2 was running and got killed; the others were never waited for
+    assert 2 in cancelled
+    summary = samples.test_summary(SAMPLES, results)
+    assert (summary["total_samples"], summary["failed_tests"], summary["skipped_tests"]) == (6, 2, 4)
@@ -0,0 +1,81 @@
+import asyncio
+import os
+
+import pytest
+
+from common import aio, workflow
+from common.execution import execute_code_async
+from common.speculation import candidate_request, first_passing
+
+SAMPLES = [{"input": "3", "expected_output": "3"}]
+AGENT_COUNTS = {"stable": 3, "alpha": 4, "beta": 5}
+
+def test_the_first_candidate_to_pass_wins_and_the_rest_are_cancelled():
+    cancelled = []
+
+    async def candidate(name, delay, passed):
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            cancelled.append(name)
+            raise
+        return passed, name
+
+    winner, finished = aio.run(first_passing([
+        candidate("slow", 5, True), candidate("failing", 0, False), candidate("fast", 0.05, True),
+    ]))
+    assert winner == (True, "fast")
+    assert finished == [(False, "failing"), (True, "fast")]
+    assert cancelled == ["slow"]
+
+def test_without_a_passing_candidate_every_result_is_returned():
+    async def candidate(name):
+        return False, name
+
+    winner, finished = aio.run(first_passing([candidate("a"), candidate("b")]))
+    assert winner is None
+    assert sorted(finished) == [(False, "a"), (False, "b")]
+
+def test_a_failed_candidate_is_asked_to_fix_its_own_code():
+    assert "Candidate 2 of 3" in candidate_request("python", "Sort a list.", 1, 3)
+    request = candidate_request("python", "Sort a list.", 1, 3, "def f(): pass", "2/3 samples failed")
+    assert "Sort a list." in request
+    assert "Failures:\n2/3 samples failed" in request
+    assert "def f(): pass" in request
+
+def test_a_cancelled_execution_kills_its_program(tmp_path):
+    program = tmp_path / "sleeper.py"
+    pid_file = tmp_path / "pid"
+    program.write_text(f"import os, time\nopen({str(pid_file)!r}, 'w').write(str(os.getpid()))\ntime.sleep(30)\n")
+
+    async def cancel_while_running():
+        task = asyncio.ensure_future(execute_code_async("python", str(program)))
+        while not pid_file.exists() or not pid_file.read_text():
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    aio.run(cancel_while_running())
+    with pytest.raises(ProcessLookupError):
+        os.kill(int(pid_file.read_text()), 0)
+
+def test_candidates_are_refined_with_their_own_feedback(script, fake_backend, monkeypatch):
+    fake_backend(responses={"Agent 2": ["No", "Yes"]})
+    requests = []
+
+    def recording_request(language, prompt, c, candidates, previous_code="", feedback=""):
+        requests.append((c, previous_code, feedback))
+        return candidate_request(language, prompt, c, candidates, previous_code, feedback)
+
+    monkeypatch.setattr(workflow, "candidate_request", recording_request)
+    variant = script.__name__.split("_")[0]
+    status, code, _ = script.host(
+        "Return the input unchanged.", "python", SAMPLES, max_iterations=2,
+        agents=["fake"] * AGENT_COUNTS[variant], candidates=2,
+    )
+    assert status == "yes" and "def solve" in code
+    # Every candidate's Agent 2 rejects its first attempt, so both are asked to fix their code
+    assert sorted(c for c, previous_code, _ in requests if not previous_code) == [0, 1]
+    retries = [(c, feedback) for c, previous_code, feedback in requests if previous_code]
+    assert retries and all(feedback.startswith("Agent 2 rejected the code") for _, feedback in retries)
@@ -0,0 +1,126 @@
+import asyncio
+import time
+
+import pytest
+
+from common import aio, backends, stages
+from common.agents import create_agent, generation_config_structured
+from common.stages import Stage, StageFailed, run_stages
+from conftest import load_variant
+
+SAMPLES = [{"input": "3", "expected_output": "3"}, {"input": "[1, 2]", "expected_output": "[1, 2]"}]
+
+def test_independent_stages_run_concurrently():
+    async def wait(results):
+        await asyncio.sleep(0.2)
+        return "yes"
+
+    started = time.perf_counter()
+    results, rejected = aio.run(run_stages([Stage("a", wait), Stage("b", wait), Stage("c", wait, after=["a", "b"])]))
+    assert rejected is None and results == {"a": "yes", "b": "yes", "c": "yes"}
+    assert time.perf_counter() - started < 0.55
+
+def test_a_rejection_cancels_speculative_stages_without_waiting():
+    cancelled = []
+
+    async def validate(results):
+        await asyncio.sleep(0.05)
+        return "no"
+
+    async def samples(results):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append("samples")
+            raise
+
+    started = time.perf_counter()
+    results, rejected = aio.run(run_stages([
+        Stage("validate", validate, accept=lambda decision: decision == "yes"),
+        Stage("samples", samples, guard="validate"),
+    ]))
+    assert rejected == "validate" and "samples" not in results
+    assert cancelled == ["samples"]
+    assert time.perf_counter() - started < 1
+
+def test_a_finished_speculative_result_is_discarded_when_its_guard_rejects():
+    discarded = []
+
+    async def validate(results):
+        await asyncio.sleep(0.05)
+        return "no"
+
+    async def judge(results):
+        return "judged"
+
+    _, rejected = aio.run(run_stages([
+        Stage("validate", validate, accept=lambda decision: decision == "yes"),
+        Stage("judge", judge, guard="validate", discard=discarded.append),
+    ]))
+    assert rejected == "validate" and discarded == ["judged"]
+
+def test_without_speculation_a_guarded_stage_waits_for_its_verdict(monkeypatch):
+    monkeypatch.setitem(stages.pipeline, "speculative", False)
+    started = []
+
+    async def validate(results):
+        return "no"
+
+    async def samples(results):
+        started.append("samples")
+
+    _, rejected = aio.run(run_stages([
+        Stage("validate", validate, accept=lambda decision: decision == "yes"),
+        Stage("samples", samples, guard="validate"),
+    ]))
+    assert rejected == "validate" and started == []
+
+def test_a_stage_that_raises_fails_the_graph():
+    async def broken(results):
+        raise RuntimeError("boom")
+
+    with pytest.raises(StageFailed) as failure:
+        aio.run(run_stages([Stage("generate", broken)]))
+    assert failure.value.stage == "generate"
+
+def test_a_cancelled_agent_call_leaves_its_history_unchanged(fake_backend):
+    fake_backend(latency=0.5)
+    agent = create_agent("fake", generation_config_structured, "Agent 3")
+
+    async def cancel_call():
+        task = asyncio.ensure_future(agent.send_message_async("Does the code work?"))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    aio.run(cancel_call())
+    assert list(agent.history) == []
+
+def test_samples_run_while_agent_2_validates(sample_script, fake_backend, monkeypatch):
+    fake_backend(latency=0.2)
+    calls = []
+    send_message_async = backends.FakeChat.send_message_async
+
+    async def recording_send(chat, content, **kwargs):
+        started = time.perf_counter()
+        response = await send_message_async(chat, content, **kwargs)
+        calls.append((chat.name, started, time.perf_counter(), asyncio.get_running_loop()))
+        return response
+
+    monkeypatch.setattr(backends.FakeChat, "send_message_async", recording_send)
+    status, _, _ = sample_script.host("Return the input unchanged.", "python", SAMPLES, max_iterations=1, agents=[])
+    assert status == "yes"
+    validated = next(finished for name, _, finished, _ in calls if name == "Agent 2")
+    assert any(name == "Agent 4" and started < validated for name, started, _, _ in calls)
+    # Every call of the run went through the one shared event loop
+    assert {loop for *_, loop in calls} == {aio.loop()}
+
+def test_stable_takes_back_agent_3s_review_of_rejected_code(fake_backend):
+    fake_backend(responses={"Agent 2": ["No", "Yes"]})
+    stable = load_variant("stable")
+    workflow = stable.StableWorkflow("Return the input unchanged.", "python", [], agents=[])
+    status, _, _ = aio.run(workflow.run(2))
+    assert status == "yes"
+    # Agent 3 reviewed both attempts, but only remembers the one Agent 2 accepted
+    assert len(workflow.slots[0][2].history) == 2
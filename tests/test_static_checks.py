@@ -0,0 +1,64 @@
+import ast
+import shutil
+
+import pytest
+
+from common import backends, static_checks
+from common.static_checks import check_c, check_python, static_check, undefined_names
+
+def names(code):
+    return [name for _, name in undefined_names(ast.parse(code))]
+
+def test_module_dunders_are_defined():
+    code = (
+        "print(__name__, __doc__, __file__, __annotations__, __spec__, __loader__, __package__)\n"
+        "class Task:\n"
+        "    def run(self):\n"
+        "        return __class__\n"
+    )
+    assert names(code) == []
+
+def test_typos_and_missing_imports_are_reported():
+    code = "def solve(value):\n    return math.sqrt(vlaue)\n"
+    assert names(code) == ["math", "vlaue"]
+
+def test_names_bound_anywhere_are_defined():
+    code = (
+        "import os.path as p\n"
+        "def solve(items, *rest, **options):\n"
+        "    global total\n"
+        "    try:\n"
+        "        total = [item for item in items]\n"
+        "    except ValueError as error:\n"
+        "        raise error\n"
+        "    return p, rest, options, total\n"
+    )
+    assert names(code) == []
+
+def test_star_imports_are_not_checked():
+    assert names("from math import *\nprint(sqrt(unknown))\n") == []
+
+def test_check_python_reports_syntax_errors():
+    assert check_python("def solve(:\n    pass\n")[0].startswith("task.py:1:")
+
+@pytest.mark.skipif(shutil.which("gcc") is None, reason="gcc is not installed")
+def test_c_code_needs_to_compile_and_have_a_main():
+    assert check_c("int main(void) { return 0; }\n") == []
+    assert check_c("int solve(int value) { return value; }\n") == ["task.c: no main() function"]
+    assert any("task.c" in line for line in check_c("int main(void) { return }\n"))
+
+def test_rejections_are_counted_and_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(static_checks, "static_check_stats", {"checked": 0, "rejected": 0, "calls_saved": 0})
+    assert static_check("python", "print(missing)\n") == ["task.py:1: undefined name 'missing'"]
+    assert static_check("python", "print(1)\n") == []
+    assert static_check("rust", "fn main() {}") == []
+    assert static_checks.static_check_stats == {"checked": 2, "rejected": 1, "calls_saved": 1}
+    monkeypatch.setitem(static_checks.static_checks, "enabled", False)
+    assert static_check("python", "print(missing)\n") == []
+
+def test_rejected_code_goes_back_to_agent_1_without_agent_2(script, fake_backend):
+    fake_backend(responses={"Agent 1": ["```python\nprint(undefined_value)\n```", "```python\nprint(1)\n```"]})
+    status, _, _ = script.host("Print 1.", "python", [], max_iterations=2, agents=[])
+    assert status == "yes"
+    # Agent 1 twice, Agents 2 and 3 once: the first attempt never reached Agent 2
+    assert backends.fake_stats["calls"] == 2 + 1 + 1
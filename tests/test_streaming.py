@@ -0,0 +1,77 @@
+import types
+
+import pytest
+
+from common import aio, streaming
+from common.agents import Agent
+
+REPLY = "```python\nprint(1)\n```\nThis program prints one. " + "More prose. " * 20
+BLOCK = "```python\nprint(1)\n```"
+
+class StreamingChat:
+    """A chat whose streamed replies record how many chunks were read and whether they were stopped."""
+
+    def __init__(self, text):
+        self.pieces = [text[start:start + 8] for start in range(0, len(text), 8)]
+        self.read = 0
+        self.closed = False
+        self.history = []
+
+    def chunks(self):
+        try:
+            for piece in self.pieces:
+                self.read += 1
+                yield types.SimpleNamespace(text=piece)
+        except GeneratorExit:
+            self.closed = True
+            raise
+
+    async def chunks_async(self):
+        try:
+            for piece in self.pieces:
+                self.read += 1
+                yield types.SimpleNamespace(text=piece)
+        except GeneratorExit:
+            self.closed = True
+            raise
+
+    def send_message(self, content, stream=False):
+        return self.chunks()
+
+    async def send_message_async(self, content, stream=False):
+        return self.chunks_async()
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setitem(streaming.streaming, "enabled", True)
+
+def test_reading_stops_at_the_end_of_the_first_code_block(enabled):
+    chat = StreamingChat(REPLY)
+    response = Agent(chat, "stream-test").send_code("Write code")
+    assert response.text == BLOCK
+    assert chat.closed and chat.read < len(chat.pieces)
+    # Only the code block is kept as the model's turn
+    assert chat.history[-1] == {"role": "model", "parts": [BLOCK]}
+
+def test_async_streams_are_stopped_too(enabled):
+    chat = StreamingChat(REPLY)
+    response = aio.run(Agent(chat, "stream-test").send_code_async("Write code"))
+    assert response.text == BLOCK
+    assert chat.closed and chat.read < len(chat.pieces)
+
+def test_a_reply_without_a_code_block_is_read_in_full(enabled):
+    chat = StreamingChat("print(1)\n" * 10)
+    response = Agent(chat, "stream-test").send_code("Write code")
+    assert response.text == "print(1)\n" * 10
+    assert chat.read == len(chat.pieces)
+
+def test_streaming_is_off_by_default():
+    chat = StreamingChat(REPLY)
+    chat.send_message = lambda content: types.SimpleNamespace(text=REPLY)
+    assert Agent(chat, "stream-test").send_code("Write code").text == REPLY
+
+def test_variants_run_on_streamed_replies(sample_script, fake_backend, enabled):
+    fake_backend(responses={"Agent 1": ["```python\ndef solve(value):\n    return value\n```\nExplanation follows."]})
+    samples = [{"input": "3", "expected_output": "3"}]
+    status, code, _ = sample_script.host("Return the input.", "python", samples, max_iterations=1, agents=[])
+    assert status == "yes" and code == "def solve(value):\n    return value"
@@ -0,0 +1,61 @@
+import asyncio
+import io
+import json
+
+import pytest
+
+from common import aio, state
+from common.trace import Tracer, configure_trace, traced, tracer
+
+@pytest.fixture
+def fresh_tracer():
+    """A tracer with the context of the test that made it."""
+    return Tracer()
+
+def test_spans_are_written_to_a_trace_in_the_state_directory(fresh_tracer, tmp_path, monkeypatch):
+    monkeypatch.setitem(state.state, "dir", str(tmp_path / "state"))
+    path = fresh_tracer.open("traces")
+    assert path.startswith(str(tmp_path / "state" / "traces"))
+    fresh_tracer.context(iteration=2)
+    with fresh_tracer.span("execute", sample=1):
+        fresh_tracer.annotate(exit_code=3)
+    fresh_tracer.file.close()
+    with open(path) as trace:
+        (record,) = [json.loads(line) for line in trace]
+    assert record["stage"] == "execute" and record["iteration"] == 2
+    assert record["sample"] == 1 and record["exit_code"] == 3 and record["duration"] >= 0
+
+def test_calls_are_totalled_per_stage_and_agent(fresh_tracer):
+    for tokens in (10, 20):
+        with fresh_tracer.span("llm_call", agent="Agent 1", model="m") as span:
+            span.update(prompt_tokens=tokens, response_tokens=1, retries=1)
+    assert fresh_tracer.stages["llm_call"]["count"] == 2
+    assert fresh_tracer.agents[("Agent 1", "m")] == {
+        "calls": 2, "seconds": pytest.approx(fresh_tracer.stages["llm_call"]["seconds"]),
+        "retries": 2, "prompt_tokens": 30, "response_tokens": 2,
+    }
+
+def test_coroutines_on_the_shared_loop_see_the_iteration(monkeypatch):
+    records = []
+    monkeypatch.setattr(tracer, "finish", records.append)
+
+    @traced("execute")
+    async def step():
+        await asyncio.sleep(0)
+
+    tracer.context(iteration=5)
+    aio.run(step())
+    assert records[0]["stage"] == "execute" and records[0]["iteration"] == 5
+
+def test_failed_spans_record_the_error(fresh_tracer):
+    fresh_tracer.file = io.StringIO()
+    with pytest.raises(ValueError):
+        with fresh_tracer.span("compile"):
+            raise ValueError("no compiler")
+    assert json.loads(fresh_tracer.file.getvalue())["error"] == "ValueError('no compiler')"
+    assert fresh_tracer.stages["compile"]["count"] == 1
+
+def test_no_trace_file_without_a_directory(monkeypatch):
+    monkeypatch.setattr(tracer, "file", None)
+    configure_trace({"dir": None})
+    assert tracer.file is None
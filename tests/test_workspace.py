@@ -0,0 +1,76 @@
+import os
+import tempfile
+import threading
+
+from common import workspace
+from common.workspace import in_workspace, workspace_root
+
+SAMPLES = [{"input": "3", "expected_output": "3"}]
+AGENT_COUNTS = {"stable": 3, "alpha": 4, "beta": 5}
+
+def run(script, **options):
+    variant = script.__name__.split("_")[0]
+    return script.host(
+        "Return the input unchanged.", "python", SAMPLES, max_iterations=1,
+        agents=["fake"] * AGENT_COUNTS[variant], **options,
+    )
+
+def test_a_run_leaves_no_files_behind(script, fake_backend, tmp_path, monkeypatch):
+    monkeypatch.setitem(workspace.workspace_settings, "root", str(tmp_path / "runs"))
+    assert run(script)[0] == "yes"
+    assert os.listdir(tmp_path / "runs") == []
+    assert not (tmp_path / "task.py").exists()
+
+def test_kept_workspaces_hold_the_code_and_a_directory_per_sample(sample_script, fake_backend, tmp_path, monkeypatch, capsys):
+    monkeypatch.setitem(workspace.workspace_settings, "root", str(tmp_path / "runs"))
+    monkeypatch.setitem(workspace.workspace_settings, "keep", True)
+    # The sample program writes a file into its working directory
+    fake_backend(responses={"Agent 4": [
+        "```python\nopen('out.txt', 'w').write('x')\nprint({input})\n```"
+    ]})
+    assert run(sample_script)[0] == "yes"
+    [kept] = os.listdir(tmp_path / "runs")
+    assert f"Run files kept in {tmp_path / 'runs' / kept}" in capsys.readouterr().out
+    directory = tmp_path / "runs" / kept
+    assert (directory / "task.py").read_text().startswith("def solve")
+    assert sorted(os.listdir(directory / "task_sample_1")) == ["out.txt", "sample.py"]
+    assert not (tmp_path / "out.txt").exists()
+
+def test_harness_shards_run_in_the_workspace(sample_script, fake_backend, tmp_path, monkeypatch):
+    monkeypatch.setitem(workspace.workspace_settings, "root", str(tmp_path / "runs"))
+    monkeypatch.setitem(workspace.workspace_settings, "keep", True)
+    assert run(sample_script, harness=True, entry_point="solve")[0] == "yes"
+    [kept] = os.listdir(tmp_path / "runs")
+    assert (tmp_path / "runs" / kept / "task_harness_1" / "task_harness.py").exists()
+
+def test_concurrent_runs_get_workspaces_of_their_own(tmp_path, monkeypatch):
+    monkeypatch.setitem(workspace.workspace_settings, "root", str(tmp_path))
+    seen = []
+    barrier = threading.Barrier(4)
+
+    @in_workspace
+    def task(workspace=None):
+        seen.append(workspace)
+        barrier.wait()
+        return os.path.isdir(workspace)
+
+    threads = [threading.Thread(target=task) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(seen)) == 4
+    assert os.listdir(tmp_path) == []
+
+def test_a_workspace_passed_in_is_kept(tmp_path):
+    @in_workspace
+    def task(workspace=None):
+        return workspace
+
+    assert task(workspace=str(tmp_path)) == str(tmp_path)
+    assert tmp_path.exists()
+
+def test_the_default_root_is_in_memory_when_possible(monkeypatch):
+    monkeypatch.setitem(workspace.workspace_settings, "root", "")
+    expected = "/dev/shm" if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK) else tempfile.gettempdir()
+    assert workspace_root() == expected